@@ -17,6 +17,13 @@ class Settings(BaseSettings):
 
     require_auth: bool = Field(default=False, alias="HURL_REQUIRE_AUTH")
     persist: bool = Field(default=False, alias="HURL_PERSIST")
+    # SQLite database file used when persist is on
+    sqlite_path: str = Field(default="hurl.db", alias="HURL_SQLITE_PATH")
+    # In-memory post window: max posts, and max approximate bytes (0 for no byte limit)
+    store_max_posts: int = Field(default=10000, alias="HURL_STORE_MAX_POSTS")
+    store_max_bytes: int = Field(default=0, alias="HURL_STORE_MAX_BYTES")
+    # Directory for posts evicted from the in-memory window (empty drops them)
+    cold_store_dir: str = Field(default="", alias="HURL_COLD_STORE_DIR")
 
     # LLM configuration
     llm_provider: Literal["none", "openai", "ollama", "local"] = Field(
@@ -41,17 +48,29 @@ class Settings(BaseSettings):
     # Rate limiting (requests per minute per token)
     rate_limit_rpm: int = Field(default=1000, alias="HURL_RATE_LIMIT_RPM")
 
-    # Trend engine
+    # Trend engine (max age in seconds of trend state served before it is advanced)
     trend_tick_interval: float = Field(default=5.0, alias="HURL_TREND_TICK_INTERVAL")
+    # Shared-memory segment for trend state across worker processes (empty keeps it per process)
+    trend_shm_name: str = Field(default="", alias="HURL_TREND_SHM_NAME")
+    # Active shocks the shared segment has room for
+    trend_shock_capacity: int = Field(default=65536, alias="HURL_TREND_SHOCK_CAPACITY")
+    # Per-persona adoption logits cached per trend epoch (entries; 0 disables)
+    adoption_cache_size: int = Field(default=1024, alias="HURL_ADOPTION_CACHE_SIZE")
 
     # Generation defaults
     default_seed: int | None = Field(default=None, alias="HURL_DEFAULT_SEED")
     max_batch_size: int = Field(default=1000, alias="HURL_MAX_BATCH_SIZE")
 
-    @field_validator('allow_origins', mode='before')
+    # Pretrained Markov model file (see scripts/hurltrain.py); empty trains the built-in corpus
+    markov_model: str = Field(default="", alias="HURL_MARKOV_MODEL")
+
+    # Extra template packs (comma-separated JSON file paths)
+    template_packs: str | list[str] = Field(default=[], alias="HURL_TEMPLATE_PACKS")
+
+    @field_validator('allow_origins', 'template_packs', mode='before')
     @classmethod
-    def parse_cors_origins(cls, v):
-        """Parse comma-separated CORS origins from environment variable."""
+    def parse_comma_separated(cls, v):
+        """Parse comma-separated lists (CORS origins, template packs) from env."""
         if isinstance(v, str):
             # Handle empty string
             if not v.strip():
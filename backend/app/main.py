@@ -12,7 +12,9 @@ from starlette.responses import Response
 
 from app.config import settings
 from app.routers import admin, health, personas, posts, topics
-from app.services.trends import trend_engine
+from app.services.topics import topic_graph
+from app.store.memory import memory_store
+from app.store.sqlite import get_sqlite_store
 
 # Prometheus metrics
 request_count = Counter(
@@ -35,11 +37,17 @@ posts_generated = Counter(
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Lifespan context manager for startup/shutdown."""
-    # Startup
-    await trend_engine.start()
+    # Trend state advances lazily on read, on the topic graph's worker thread
+    if settings.persist:
+        # Every stored post is also written behind to SQLite
+        store = get_sqlite_store()
+        memory_store.subscribe(store.add_post)
     yield
-    # Shutdown
-    await trend_engine.stop()
+    topic_graph.shutdown()
+    if settings.persist:
+        memory_store.unsubscribe(store.add_post)
+        store.close()
+    memory_store.close()
 
 
 # Create FastAPI app
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""JSON responses serialized straight from model field values."""
+
+from typing import Any
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+# Whether each class seen is a pydantic model; isinstance() on models goes
+# through ABCMeta and would otherwise dominate the cost of dumps()
+_is_model: dict[type, bool] = {}
+
+
+def _fields(obj: object) -> dict[str, Any]:
+    """orjson fallback: a model's field values (nested models recurse back here)."""
+    cls = type(obj)
+    is_model = _is_model.get(cls)
+    if is_model is None:
+        is_model = _is_model[cls] = issubclass(cls, BaseModel)
+    if is_model:
+        return obj.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize models (or dicts and lists of them) to JSON.
+
+    orjson walks each model's __dict__ directly, skipping pydantic's
+    serializer. The output matches model_dump_json() for the API schemas:
+    fields in declaration order, UTC datetimes ending in "Z".
+
+    Args:
+        content: model, or JSON-compatible value containing models
+
+    Returns:
+        UTF-8 JSON bytes
+    """
+    return orjson.dumps(content, default=_fields, option=orjson.OPT_UTC_Z)
+
+
+class ModelResponse(Response):
+    """
+    application/json response rendered with dumps().
+
+    Returning one from a route bypasses FastAPI's response_model
+    validation and serialization, so only pass models the server built
+    itself; keep response_model on the route for the OpenAPI schema.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -2,8 +2,16 @@
 """Admin router for trend shocks and seed management."""
 
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
-from app.schemas import SeedRequest, SeedResponse, ShockRequest, TrendSnapshot
+from app.schemas import (
+    BulkShockRequest,
+    BulkShockResponse,
+    SeedRequest,
+    SeedResponse,
+    ShockRequest,
+    TrendSnapshot,
+)
 from app.services.rng import rng_manager
 from app.services.topics import topic_graph
 
@@ -13,9 +21,13 @@ router = APIRouter(prefix="/v1/admin", tags=["admin"])
 @router.post("/shock", status_code=201)
 async def inject_shock(request: ShockRequest) -> dict[str, str]:
     """Inject a trend shock to a topic."""
-    success = topic_graph.inject_shock(
-        request.topic_id, request.magnitude, request.half_life_s
-    )
+    # Injecting advances trend state first, which is too slow for the event loop
+    try:
+        success = await run_in_threadpool(
+            topic_graph.inject_shock, request.topic_id, request.magnitude, request.half_life_s
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
     if not success:
         raise HTTPException(status_code=404, detail="Topic not found")
@@ -28,6 +40,30 @@ async def inject_shock(request: ShockRequest) -> dict[str, str]:
     }
 
 
+@router.post("/shocks", response_model=BulkShockResponse, status_code=201)
+async def inject_shocks(request: BulkShockRequest) -> BulkShockResponse:
+    """Inject many trend shocks at once (all or nothing)."""
+    try:
+        missing = await run_in_threadpool(
+            topic_graph.inject_shocks,
+            [shock.topic_id for shock in request.shocks],
+            [shock.magnitude for shock in request.shocks],
+            [shock.half_life_s for shock in request.shocks],
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Topics not found: {', '.join(sorted(set(missing)))}"
+        )
+
+    return BulkShockResponse(
+        injected=len(request.shocks),
+        message=f"Injected {len(request.shocks)} shocks",
+    )
+
+
 @router.get("/trends", response_model=list[TrendSnapshot])
 async def get_trends() -> list[TrendSnapshot]:
     """Get current trend scores and velocities."""
@@ -12,8 +12,7 @@ router = APIRouter(prefix="/v1/personas", tags=["personas"])
 @router.get("", response_model=list[Persona])
 async def list_personas(limit: int = 100, offset: int = 0) -> list[Persona]:
     """List all personas."""
-    all_personas = persona_registry.get_all_personas()
-    return all_personas[offset : offset + limit]
+    return persona_registry.list_personas(limit=limit, offset=offset)
 
 
 @router.get("/{persona_id}", response_model=Persona)
@@ -3,20 +3,39 @@
 
 import asyncio
 import time
+from collections import deque
+from collections.abc import Sequence
 from datetime import datetime, timezone
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Literal
 
-from fastapi import APIRouter, Query
-from ulid import ULID
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
 
 from app.config import settings
-from app.schemas import GenerateRequest, GenerateResponse, Post, PostLineage
+from app.responses import ModelResponse
+from app.schemas import (
+    GenerateRequest,
+    GenerateResponse,
+    Post,
+    PostLineage,
+    PostPageResponse,
+    ThreadResponse,
+    trusted,
+)
+from app.services.generator.batch import (
+    THREAD_WINDOW,
+    batch_generator,
+    reply_targets,
+    reply_text,
+)
 from app.services.generator.core import text_generator
 from app.services.generator.llm import llm_adapter
 from app.services.generator.metrics import metrics_simulator
 from app.services.generator.styles import style_decorator
+from app.services.ids import post_ids
 from app.services.personas import persona_registry
 from app.services.rng import rng_manager
+from app.services.scheduler import SCHEDULE_STREAM, PostingScheduler
 from app.services.topics import topic_graph
 from app.services.trends import trend_engine
 from app.sse import SSEResponse, format_sse
@@ -24,6 +43,9 @@ from app.store.memory import memory_store
 
 router = APIRouter(prefix="/v1", tags=["posts"])
 
+# A ULID: 26 Crockford base32 characters (any case), at most 7ZZZ... (128 bits)
+ULID_PATTERN = r"^[0-7][0-9A-HJKMNP-TV-Za-hjkmnp-tv-z]{25}$"
+
 
 async def generate_single_post(
     persona_id: str | None,
@@ -32,91 +54,118 @@ async def generate_single_post(
     language_filter: list[str],
     toxicity_max: float,
     seed: int | None,
+    index: int = 0,
+    rng: np.random.Generator | None = None,
+    thread: Sequence[Post] = (),
 ) -> Post:
-    """Generate a single post."""
+    """
+    Generate a single post.
+
+    All draws for the post come from one RNG stream keyed on (seed, index),
+    so a seeded post is reproducible and builds a single generator.
+
+    Args:
+        thread: earlier posts of the same stream it may reply to or quote.
+            Unseeded posts pick from recent stored posts instead.
+    """
+    if rng is None:
+        rng = rng_manager.stream(seed, index)
+
     # Select persona
     if persona_id:
         persona = persona_registry.get_persona(persona_id)
         if not persona:
             # Fall back to random
-            persona = persona_registry.get_random_personas(1, seed=seed)[0]
+            persona = persona_registry.get_random_personas(1, rng=rng)[0]
     else:
-        persona = persona_registry.get_random_personas(1, seed=seed)[0]
-
-    # Select topics based on mode
-    if mode == "emergent":
+        persona = persona_registry.get_random_personas(1, rng=rng)[0]
+
+    # Reply to or quote a recent post
+    kind, parent = "post", None
+    targets = reply_targets(topic_filter) if seed is None else list(thread)
+    if targets:
+        u = rng.random()
+        if u < persona.behavior.reply_propensity:
+            kind = "reply"
+        elif u < persona.behavior.reply_propensity + persona.behavior.quote_propensity:
+            kind = "quote"
+        if kind != "post":
+            parent = targets[int(rng.integers(0, len(targets)))]
+
+    # Select topics based on mode (replies and quotes stay on their parent's topics)
+    if parent is not None:
+        topics = list(parent.topics)
+    elif mode == "emergent":
         # Use trend engine to compute adoption probabilities
         recent_posts = memory_store.get_posts_by_persona(persona.id, limit=10)
         recent_topics = [topic for post in recent_posts for topic in post.topics]
+        topic_ids = topic_graph.topic_ids
 
-        # Compute peer influence (simplified: assume small random influence)
-        peer_influence = {
-            topic_id: rng_manager.random(seed=seed) * 0.3
-            for topic_id in topic_graph.graph.nodes
-        }
-
-        adoption_probs = trend_engine.compute_topic_adoption_prob(
-            persona.interests, peer_influence, recent_topics, seed=seed
-        )
+        # Candidates (filtered by topic_filter) and cached trend/interest logits
+        candidates, base_logit = trend_engine.adoption_base(persona, topic_filter)
 
-        # Filter by topic_filter if provided
-        if topic_filter:
-            adoption_probs = {
-                k: v for k, v in adoption_probs.items() if k in topic_filter
-            }
+        # Peer influence from what the persona's followees have posted
+        row = persona_registry.table.row_of[persona.id]
+        peer_influence = persona_registry.peer_influence(row)[candidates]
 
-        if not adoption_probs:
+        count = int(rng.integers(1, 3))
+        if len(candidates):
+            adoption_probs = trend_engine.compute_candidate_adoption(
+                candidates, base_logit, peer_influence, recent_topics
+            )
+            picks = trend_engine.sample_topic_indices(adoption_probs, count, rng=rng)
+            topics = [topic_ids[i] for i in candidates[picks]]
+        else:
             # Fallback to interests
-            adoption_probs = persona.interests
-
-        topics = trend_engine.sample_topics(adoption_probs, count=rng_manager.randint(1, 3, seed=seed), seed=seed)
+            topics = trend_engine.sample_topics(persona.interests, count=count, rng=rng)
     else:
         # Pure random mode
-        all_topics = list(topic_graph.graph.nodes)
+        topic_ids = topic_graph.topic_ids
         if topic_filter:
-            all_topics = [t for t in all_topics if t in topic_filter]
+            candidates = np.flatnonzero(topic_graph.mask(topic_filter))
+        else:
+            candidates = np.arange(len(topic_ids))
 
-        num_topics = rng_manager.randint(1, 3, seed=seed)
-        topics = rng_manager.choice(all_topics, size=min(num_topics, len(all_topics)), seed=seed)
-        topics = topics.tolist() if hasattr(topics, 'tolist') else list(topics)
+        num_topics = int(rng.integers(1, 3))
+        picks = rng.integers(0, len(candidates), size=min(num_topics, len(candidates)))
+        topics = [topic_ids[i] for i in candidates[picks]]
 
     # Select language
     if language_filter:
-        language = rng_manager.choice(language_filter, seed=seed)
+        language = str(rng.choice(language_filter))
     else:
         # Use persona's language distribution
-        langs = list(persona.behavior.language_distribution.keys())
-        probs = list(persona.behavior.language_distribution.values())
-        total = sum(probs)
-        probs = [p / total for p in probs]
-        language = rng_manager.choice(langs, p=probs, seed=seed)
+        language = persona_registry.language_table(persona).sample_label(rng)
 
     # Generate base text
-    base_text, template_name = text_generator.generate(persona, topics, seed=seed)
+    base_text, template_name = text_generator.generate(persona, topics, rng=rng)
 
     # Optionally enhance with LLM
-    if llm_adapter.is_enabled() and rng_manager.random(seed=seed) < 0.2:  # 20% chance
+    if llm_adapter.is_enabled() and rng.random() < 0.2:  # 20% chance
         persona_context = f"cynicism={persona.style.cynicism}, reading_level={persona.style.reading_level}"
         base_text = await llm_adapter.enhance_text(base_text, persona_context, seed=seed)
 
     # Apply style decorations
-    final_text, style_metrics = style_decorator.decorate(base_text, persona, topics, seed=seed)
+    final_text, style_metrics = style_decorator.decorate(base_text, persona, topics, rng=rng)
+    if parent is not None and kind == "reply":
+        final_text = reply_text(final_text, parent.persona_id)
 
     # Simulate metrics
-    post_metrics = metrics_simulator.simulate_metrics(persona, topics, final_text, mode, seed=seed)
+    post_metrics = metrics_simulator.simulate_metrics(
+        persona, topics, final_text, mode, rng=rng
+    )
 
     # Compute toxicity (simplified: use persona's base toxicity + small noise)
     toxicity = min(
-        persona.toxicity + rng_manager.random(seed=seed) * 0.1,
+        persona.toxicity + rng.random() * 0.1,
         1.0,
     )
 
     # Filter by toxicity
     if toxicity > toxicity_max:
-        # Regenerate with different seed (simple retry)
-        seed_retry = seed + 1 if seed is not None else None
+        # Regenerate with fresh draws from the same stream (simple retry)
         return await generate_single_post(
-            persona_id, mode, topic_filter, language_filter, toxicity_max, seed_retry
+            persona_id, mode, topic_filter, language_filter, toxicity_max, seed, index, rng, thread
         )
 
     # Find influences (recent posts from similar personas or topics)
@@ -124,16 +173,17 @@ async def generate_single_post(
     recent_all = memory_store.get_recent_posts(limit=50)
     if recent_all:
         # Sample up to 3 influences
-        num_influences = min(rng_manager.randint(0, 4, seed=seed), len(recent_all))
+        num_influences = min(int(rng.integers(0, 4)), len(recent_all))
         if num_influences > 0:
-            sampled = rng_manager.choice(recent_all, size=num_influences, seed=seed)
-            influences = [p.id for p in (sampled if hasattr(sampled, '__iter__') else [sampled])]
+            sampled = rng.integers(0, len(recent_all), size=num_influences)
+            influences = [recent_all[i].id for i in sampled]
 
-    lineage = PostLineage(template=template_name, influences=influences)
+    lineage = trusted(PostLineage, template=template_name, influences=influences)
 
     # Create post
-    post = Post(
-        id=str(ULID()),
+    post = trusted(
+        Post,
+        id=post_ids.new_id(),
         text=final_text,
         persona_id=persona.id,
         created_at=datetime.now(timezone.utc),
@@ -144,6 +194,8 @@ async def generate_single_post(
         lineage=lineage,
         metrics=post_metrics,
         toxicity=toxicity,
+        kind=kind,
+        parent_id=parent.id if parent is not None else None,
     )
 
     # Store post
@@ -153,40 +205,71 @@ async def generate_single_post(
 
 
 @router.post("/generate", response_model=GenerateResponse)
-async def generate_posts(request: GenerateRequest) -> GenerateResponse:
-    """Generate a batch of posts synchronously."""
+async def generate_posts(request: GenerateRequest) -> ModelResponse:
+    """
+    Generate a batch of posts synchronously.
+
+    Posts that cannot be brought under toxicity_max (e.g. every requested
+    persona is too toxic) are left out, so the response count can be
+    below the requested count.
+
+    The generator builds posts with trusted() and the body is serialized
+    straight from them, bypassing response_model validation: posts the
+    server made itself are never validated.
+    """
     count = min(request.count, settings.max_batch_size)
     seed = request.seed or rng_manager.get_global_seed()
 
-    posts = []
-    for i in range(count):
-        # Increment seed per post for determinism
-        post_seed = (seed + i) if seed is not None else None
-
-        # Select persona if specified
-        persona_id = None
-        if request.persona_ids:
-            persona_id = rng_manager.choice(request.persona_ids, seed=post_seed)
-
-        post = await generate_single_post(
-            persona_id=persona_id,
-            mode=request.mode,
-            topic_filter=request.topics,
-            language_filter=request.language,
-            toxicity_max=request.toxicity_max,
-            seed=post_seed,
+    posts = await batch_generator.generate(
+        count=count,
+        mode=request.mode,
+        topic_filter=request.topics,
+        persona_ids=request.persona_ids,
+        language_filter=request.language,
+        toxicity_max=request.toxicity_max,
+        seed=seed,
+    )
+
+    response = GenerateResponse.model_construct(posts=posts, count=len(posts), seed=seed)
+    return ModelResponse(response)
+
+
+@router.get("/posts", response_model=PostPageResponse)
+async def list_posts(
+    before: str | None = Query(default=None, pattern=ULID_PATTERN),  # exclusive ULID cursor
+    limit: int = Query(default=50, ge=1, le=1000),
+) -> ModelResponse:
+    """Page backwards through stored posts by ULID cursor, newest first."""
+    records = memory_store.get_posts_before(before.upper() if before else None, limit)
+    next_before = None
+    if records and memory_store.has_posts_before(records[-1].id):
+        next_before = records[-1].id
+    posts = [record.to_post() for record in records]
+    return ModelResponse(
+        PostPageResponse.model_construct(
+            posts=posts, count=len(posts), next_before=next_before
         )
-        posts.append(post)
+    )
+
 
-    return GenerateResponse(posts=posts, count=len(posts), seed=seed)
+@router.get("/posts/{post_id}/thread", response_model=ThreadResponse)
+async def get_thread(post_id: str) -> ModelResponse:
+    """Get the reply/quote thread a stored post belongs to, from its root down."""
+    records = memory_store.get_thread(post_id)
+    if records is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    posts = [record.to_post() for record in records]
+    return ModelResponse(
+        ThreadResponse.model_construct(root_id=posts[0].id, posts=posts, count=len(posts))
+    )
 
 
 @router.get("/sample", response_model=GenerateResponse)
 async def sample_posts(
     count: int = Query(default=10, ge=1, le=100),
-    mode: str = Query(default="emergent"),
+    mode: Literal["emergent", "pure_random"] = Query(default="emergent"),
     seed: int | None = None,
-) -> GenerateResponse:
+) -> ModelResponse:
     """Convenience endpoint to sample posts."""
     request = GenerateRequest(count=count, mode=mode, seed=seed)
     return await generate_posts(request)
@@ -204,6 +287,10 @@ async def stream_posts_generator(
     """
     Generate SSE stream of posts.
 
+    Unless personas are pinned, posters come from a PostingScheduler in
+    simulated time order, so each persona appears at its own posting rate
+    and burstiness; interval only paces delivery.
+
     Args:
         interval: Time between posts in seconds
     """
@@ -212,15 +299,24 @@ async def stream_posts_generator(
 
     counter = 0
     base_seed = seed or int(time.time())
+    thread: deque[Post] = deque(maxlen=THREAD_WINDOW)
+    table = persona_registry.table
+    scheduler = PostingScheduler.for_table(
+        table, rng=rng_manager.stream(base_seed, SCHEDULE_STREAM)
+    )
+    eligible = table.column("toxicity") <= toxicity_max
+    scheduled = (eligible & (scheduler.base_rate > 0)).any()
 
     try:
         while True:
-            post_seed = base_seed + counter
+            rng = rng_manager.stream(base_seed, counter)
 
-            # Select persona if specified
+            # Select persona if specified, otherwise the next scheduled poster
             persona_id = None
             if persona_ids:
-                persona_id = rng_manager.choice(persona_ids, seed=post_seed)
+                persona_id = str(rng.choice(persona_ids))
+            elif scheduled:
+                persona_id = table.ids[int(scheduler.take(1, eligible)[1][0])]
 
             post = await generate_single_post(
                 persona_id=persona_id,
@@ -228,11 +324,15 @@ async def stream_posts_generator(
                 topic_filter=topics,
                 language_filter=language,
                 toxicity_max=toxicity_max,
-                seed=post_seed,
+                seed=base_seed,
+                index=counter,
+                rng=rng,
+                thread=thread,
             )
+            thread.append(post)
 
             # Send post as SSE event
-            yield format_sse(post.model_dump(mode="json"), event="post")
+            yield format_sse(post, event="post")
 
             counter += 1
 
@@ -246,7 +346,7 @@ async def stream_posts_generator(
 
 @router.get("/stream")
 async def stream_posts(
-    mode: str = Query(default="emergent"),
+    mode: Literal["emergent", "pure_random"] = Query(default="emergent"),
     topics: str = Query(default=""),  # comma-separated
     persona_ids: str = Query(default=""),  # comma-separated
     language: str = Query(default="en"),  # comma-separated
@@ -2,6 +2,7 @@
 """Topics router."""
 
 from fastapi import APIRouter, HTTPException
+from starlette.responses import Response
 
 from app.schemas import Topic, TopicListResponse
 from app.services.topics import topic_graph
@@ -10,16 +11,17 @@ router = APIRouter(prefix="/v1/topics", tags=["topics"])
 
 
 @router.get("", response_model=TopicListResponse)
-async def list_topics() -> TopicListResponse:
-    """List all topics."""
-    topics = topic_graph.get_all_topics()
-    return TopicListResponse(topics=topics, count=len(topics))
+async def list_topics() -> Response:
+    """List all topics (body serialized once per snapshot version)."""
+    return Response(
+        content=topic_graph.snapshot().list_json(), media_type="application/json"
+    )
 
 
 @router.get("/{topic_id}", response_model=Topic)
 async def get_topic(topic_id: str) -> Topic:
     """Get a specific topic."""
-    topic = topic_graph.get_topic(topic_id)
+    topic = topic_graph.snapshot().topic(topic_id)
     if not topic:
         raise HTTPException(status_code=404, detail="Topic not found")
     return topic
@@ -2,10 +2,39 @@
 """Pydantic schemas for Hurl API."""
 
 from datetime import datetime
-from typing import Literal
+from typing import Literal, TypeVar
 
 from pydantic import BaseModel, Field
 
+M = TypeVar("M", bound=BaseModel)
+
+_set = object.__setattr__
+
+
+def trusted(model: type[M], **values) -> M:
+    """
+    Build a model from values the server produced itself, without validation.
+
+    Sets the instance state directly, as model_construct does, but without
+    its per-field pass for defaults and aliases: about twice as fast as
+    validating, where model_construct is slower than validating. Pass every
+    field, in declaration order (serialized key order follows it), with
+    exactly the declared types; nested models must be trusted() too.
+
+    Args:
+        model: model class
+        **values: all field values
+
+    Returns:
+        model instance
+    """
+    obj = model.__new__(model)
+    _set(obj, "__dict__", values)
+    _set(obj, "__pydantic_fields_set__", set(values))
+    _set(obj, "__pydantic_extra__", None)
+    _set(obj, "__pydantic_private__", None)
+    return obj
+
 
 # ============================================================================
 # Post schemas
@@ -51,6 +80,8 @@ class Post(BaseModel):
     lineage: PostLineage = Field(default_factory=PostLineage)
     metrics: PostMetrics = Field(default_factory=PostMetrics)
     toxicity: float = 0.0
+    kind: Literal["post", "reply", "quote"] = "post"
+    parent_id: str | None = None  # post replied to or quoted
 
 
 class GenerateRequest(BaseModel):
@@ -74,6 +105,22 @@ class GenerateResponse(BaseModel):
     seed: int | None = None
 
 
+class PostPageResponse(BaseModel):
+    """A page of stored posts, newest first."""
+
+    posts: list[Post]
+    count: int
+    next_before: str | None = None  # cursor for the next (older) page, if any
+
+
+class ThreadResponse(BaseModel):
+    """A reply/quote thread, depth-first from its root (parents before children)."""
+
+    root_id: str
+    posts: list[Post]
+    count: int
+
+
 # ============================================================================
 # Persona schemas
 # ============================================================================
@@ -180,6 +227,19 @@ class ShockRequest(BaseModel):
     half_life_s: float = Field(default=300.0, ge=1.0)
 
 
+class BulkShockRequest(BaseModel):
+    """Request to inject many trend shocks in one call."""
+
+    shocks: list[ShockRequest] = Field(min_length=1, max_length=10000)
+
+
+class BulkShockResponse(BaseModel):
+    """Response after injecting shocks in bulk."""
+
+    injected: int
+    message: str
+
+
 class TrendSnapshot(BaseModel):
     """Snapshot of current trend scores."""
 
@@ -0,0 +1,531 @@
+#!/usr/bin/env python
+"""Vectorized batch generation engine."""
+
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.schemas import Persona, Post, PostLineage, PostMetrics, StyleMetrics, trusted
+from app.services.generator.core import SLOT_VOCABULARY, TEMPLATES, text_generator
+from app.services.generator.llm import llm_adapter
+from app.services.generator.metrics import metrics_simulator
+from app.services.generator.styles import SAMPLE_URLS, style_decorator
+from app.services.ids import post_ids
+from app.services.personas import persona_registry
+from app.services.rng import rng_manager
+from app.services.sampling import gumbel_top_k
+from app.services.scheduler import PostingScheduler
+from app.services.topics import topic_graph
+from app.services.trends import trend_engine
+from app.store.memory import memory_store
+from app.store.records import StoredPost
+
+# Upper bounds used to size per-post draw matrices (see StyleDecorator)
+MAX_EMOJIS = 5
+MAX_HASHTAGS = 4
+MAX_INFLUENCES = 3
+
+# Recent posts that replies and quotes can target
+THREAD_WINDOW = 50
+
+# Attempts to redraw a post whose toxicity exceeds the limit before dropping it
+MAX_TOXICITY_RETRIES = 10
+
+CATEGORIES = list(TEMPLATES)
+
+
+def _categorical(rng: np.random.Generator, weights: np.ndarray) -> np.ndarray:
+    """Draw one column index per row of an unnormalized (rows, k) weight matrix."""
+    cumulative = np.cumsum(weights, axis=1)
+    target = rng.random(len(weights)) * cumulative[:, -1]
+    below = (cumulative <= target[:, None]).sum(axis=1)
+    columns: np.ndarray = np.minimum(below, weights.shape[1] - 1)
+    return columns
+
+
+def _scaled_index(u: np.ndarray, sizes: np.ndarray | int) -> np.ndarray:
+    """Map uniforms in [0, 1) to integer indices in [0, sizes)."""
+    return np.minimum((u * sizes).astype(np.int64), np.maximum(np.asarray(sizes) - 1, 0))
+
+
+def reply_targets(topic_filter: list[str]) -> list[StoredPost]:
+    """
+    Recent stored posts a new post may reply to or quote (only on-filter posts if filtered).
+
+    Only unseeded generation reads these: what the store holds is not a
+    function of the seed, so seeded posts reply within their own batch or stream.
+    """
+    recent = memory_store.get_recent_posts(limit=THREAD_WINDOW)
+    if topic_filter:
+        allowed = set(topic_filter)
+        recent = [post for post in recent if post.topics and allowed.issuperset(post.topics)]
+    return recent
+
+
+def reply_text(text: str, parent_persona_id: str) -> str:
+    """Address a reply to the parent's author."""
+    author = persona_registry.get_persona(parent_persona_id)
+    return f"@{author.handle} {text}" if author else text
+
+
+class BatchGenerator:
+    """
+    Generates N posts in one pass.
+
+    Every random decision for the batch (personas, topics, templates, vocabulary
+    slots, decorations, metrics) is drawn as a NumPy array up front; strings are
+    then assembled in a single loop. Mirrors generate_single_post, except that
+    emergent recency and influences are read from the store as of batch start.
+    Replies and quotes target earlier posts of the same batch, plus recent
+    stored posts when no seed is given.
+    Personas that are not pinned are the next posters of a PostingScheduler,
+    so they appear at their own posting rates and burstiness.
+    """
+
+    async def generate(
+        self,
+        count: int,
+        mode: str,
+        topic_filter: list[str],
+        persona_ids: list[str],
+        language_filter: list[str],
+        toxicity_max: float,
+        seed: int | None,
+        scheduler: PostingScheduler | None = None,
+    ) -> list[Post]:
+        """
+        Generate a batch of posts and add them to the store.
+
+        Posts whose toxicity cannot be brought under toxicity_max within
+        MAX_TOXICITY_RETRIES redraws are dropped, so fewer than count posts
+        may be returned.
+
+        Args:
+            scheduler: simulation to continue (offline runs). Posts are then
+                stamped with their simulated times (seconds since the epoch)
+                instead of now. By default each batch schedules afresh.
+        """
+        rng = rng_manager.stream(seed)
+        table = persona_registry.table
+        simulated = scheduler is not None
+        if scheduler is None:
+            scheduler = PostingScheduler.for_table(table, rng=rng)
+
+        # Personas and toxicity (rejection-sampled before anything else is drawn)
+        fixed = self._draw_fixed_personas(rng, count, persona_ids)
+        rows, toxicity, times = self._draw_personas(rng, fixed, toxicity_max, scheduler)
+        keep = toxicity <= toxicity_max
+        rows, toxicity, times = rows[keep], toxicity[keep], times[keep]
+        chosen = persona_registry.get_personas_at(rows)
+        n = len(chosen)
+        if n == 0:
+            return []
+
+        # Replies and quotes stay on their parent's topics (parents come first)
+        targets = reply_targets(topic_filter) if seed is None else []
+        kinds, parents = self._draw_parents(rng, rows, len(targets))
+        topics = self._draw_topics(rng, rows, mode, topic_filter)
+        authors = [target.persona_id for target in targets] + [p.id for p in chosen]
+        for i, parent in enumerate(parents):
+            if parent >= len(targets):
+                topics[i] = list(topics[parent - len(targets)])
+            elif parent >= 0:
+                topics[i] = list(targets[parent].topics)
+        languages = self._draw_languages(rng, chosen, language_filter)
+        texts, template_names = self._draw_base_texts(rng, rows, topics)
+
+        # Optionally enhance with LLM
+        if llm_adapter.is_enabled():
+            enhance = rng.random(n) < 0.2  # 20% chance
+            for i in np.flatnonzero(enhance):
+                persona = chosen[i]
+                persona_context = (
+                    f"cynicism={persona.style.cynicism}, reading_level={persona.style.reading_level}"
+                )
+                texts[i] = await llm_adapter.enhance_text(texts[i], persona_context, seed=seed)
+
+        texts, styles = self._decorate(rng, rows, chosen, topics, texts)
+        for i, parent in enumerate(parents):
+            if kinds[i] == "reply":
+                texts[i] = reply_text(texts[i], authors[parent])
+
+        word_counts = np.fromiter((len(t.split()) for t in texts), dtype=np.float64, count=n)
+        influence = table.column("influence_score")[rows].astype(np.float64)
+        has_topics = np.fromiter((bool(t) for t in topics), dtype=bool, count=n)
+        metrics = metrics_simulator.simulate_batch(influence, word_counts, has_topics, rng)
+
+        influences = self._draw_influences(rng, n)
+
+        posts: list[Post] = []
+        for i in range(n):
+            parent = int(parents[i])
+            parent_id: str | None = None
+            if parent >= len(targets):
+                parent_id = posts[parent - len(targets)].id
+            elif parent >= 0:
+                parent_id = targets[parent].id
+            post = trusted(
+                Post,
+                id=post_ids.new_id(),
+                text=texts[i],
+                persona_id=chosen[i].id,
+                created_at=(
+                    datetime.fromtimestamp(times[i], timezone.utc)
+                    if simulated
+                    else datetime.now(timezone.utc)
+                ),
+                mode=mode,
+                topics=topics[i],
+                language=languages[i],
+                style=styles[i],
+                lineage=trusted(PostLineage, template=template_names[i], influences=influences[i]),
+                metrics=trusted(
+                    PostMetrics,
+                    likes=int(metrics["likes"][i]),
+                    replies=int(metrics["replies"][i]),
+                    quotes=int(metrics["quotes"][i]),
+                    impressions=int(metrics["impressions"][i]),
+                ),
+                toxicity=float(toxicity[i]),
+                kind=kinds[i],
+                parent_id=parent_id,
+            )
+            memory_store.add_post(post)
+            posts.append(post)
+
+        return posts
+
+    def _draw_fixed_personas(
+        self, rng: np.random.Generator, count: int, persona_ids: list[str]
+    ) -> np.ndarray:
+        """Pick requested persona rows per post (-1, also for unknown ids, means random)."""
+        if not persona_ids:
+            return np.full(count, -1, dtype=np.int64)
+
+        row_of = persona_registry.table.row_of
+        requested = np.array([row_of.get(pid, -1) for pid in persona_ids], dtype=np.int64)
+        rows: np.ndarray = requested[rng.integers(0, len(requested), size=count)]
+        return rows
+
+    def _draw_personas(
+        self,
+        rng: np.random.Generator,
+        fixed: np.ndarray,
+        toxicity_max: float,
+        scheduler: PostingScheduler,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Draw persona table rows, toxicity and post time per post.
+
+        Rows over toxicity_max are redrawn (persona too, unless fixed). Random
+        picks are the scheduler's next posters among personas whose base
+        toxicity is within the limit; the others could never be accepted, so
+        this leaves the accepted distribution unchanged while saving retries.
+        Fixed personas post at the scheduler's current time. Slots that no
+        persona can fill keep infinite toxicity and are dropped.
+        """
+        table = persona_registry.table
+        base_toxicity = table.column("toxicity").astype(np.float64)
+        eligible = np.zeros(len(scheduler), dtype=bool)
+        # Personas added after a persistent scheduler was built are not scheduled
+        allowed = table.eligible(toxicity_max)
+        eligible[allowed[allowed < len(scheduler)]] = True
+        if not eligible.any():
+            eligible[:] = True
+        can_post = (eligible & (scheduler.base_rate > 0)).any()
+
+        count = len(fixed)
+        rows = np.full(count, -1, dtype=np.int64)
+        toxicity = np.full(count, np.inf)
+        times = np.full(count, scheduler.now)
+        pending = np.arange(count)
+
+        for _ in range(MAX_TOXICITY_RETRIES):
+            is_fixed = fixed[pending] >= 0
+            drawn = pending[~is_fixed] if can_post else pending[:0]
+            rows[pending[is_fixed]] = fixed[pending[is_fixed]]
+            times[drawn], rows[drawn] = scheduler.take(len(drawn), eligible)
+
+            filled = pending[rows[pending] >= 0]
+            toxicity[filled] = np.minimum(
+                base_toxicity[rows[filled]] + rng.random(len(filled)) * 0.1, 1.0
+            )
+            pending = filled[toxicity[filled] > toxicity_max]
+            if len(pending) == 0:
+                break
+
+        return rows, toxicity, times
+
+    def _draw_parents(
+        self, rng: np.random.Generator, rows: np.ndarray, num_targets: int
+    ) -> tuple[list[str], np.ndarray]:
+        """
+        Decide per post whether it replies to or quotes an earlier post.
+
+        Each persona replies with probability reply_propensity and otherwise
+        quotes with probability quote_propensity. The parent is a uniform pick
+        from the num_targets stored targets and the THREAD_WINDOW posts before
+        it in the batch; the first post has nothing to reply to when there
+        are no targets.
+
+        Returns:
+            (kind per post, parent per post: index into the targets, or
+            num_targets + batch position, or -1 for none)
+        """
+        n = len(rows)
+        table = persona_registry.table
+        reply = table.column("reply_propensity")[rows]
+        quote = table.column("quote_propensity")[rows]
+        u = rng.random(n)
+        position = np.arange(n)
+        candidates = num_targets + np.minimum(position, THREAD_WINDOW)
+        picks = (rng.random(n) * candidates).astype(np.int64)
+        # Batch picks count back from the post just before this one
+        back = picks - num_targets
+        parents = np.where(back < 0, picks, num_targets + position - 1 - back)
+        kinds = np.where(u < reply, "reply", np.where(u < reply + quote, "quote", "post"))
+        kinds[candidates == 0] = "post"
+        parents[kinds == "post"] = -1
+        return kinds.tolist(), parents
+
+    def _draw_topics(
+        self,
+        rng: np.random.Generator,
+        rows: np.ndarray,
+        mode: str,
+        topic_filter: list[str],
+    ) -> list[list[str]]:
+        """Draw one or two topics per post."""
+        n = len(rows)
+        all_topics = topic_graph.topic_ids
+        num_topics = rng.integers(1, 3, size=n)
+
+        if mode != "emergent":
+            if topic_filter:
+                candidates = np.flatnonzero(topic_graph.mask(topic_filter))
+            else:
+                candidates = np.arange(len(all_topics))
+            if not len(candidates):
+                return [[] for _ in range(n)]
+
+            picks = candidates[rng.integers(0, len(candidates), size=(n, 2))]
+            return [
+                [all_topics[j] for j in picks[i, : num_topics[i]]] for i in range(n)
+            ]
+
+        # Emergent: adoption probabilities for all posts at once
+        unique_rows, inverse = np.unique(rows, return_inverse=True)
+        table = persona_registry.table
+
+        interests = table.interest_matrix(unique_rows, all_topics)
+        recency = np.zeros_like(interests)
+        for row, table_row in enumerate(unique_rows):
+            recent_posts = memory_store.get_posts_by_persona(table.ids[table_row], limit=10)
+            recent_topics = [topic for post in recent_posts for topic in post.topics]
+            recency[row] = trend_engine.recency_vector(recent_topics)
+
+        interests = interests[inverse]
+        peer_influence = persona_registry.peer_influence(unique_rows)[inverse]
+        weights = trend_engine.compute_adoption_vector(interests, peer_influence, recency[inverse])
+
+        # Filter by topic_filter if provided, falling back to interests
+        if topic_filter:
+            mask = topic_graph.mask(topic_filter)
+            if mask.any():
+                weights = np.where(mask, weights, 0.0)
+            else:
+                weights = interests
+
+        # Weighted sampling without replacement
+        top, valid = gumbel_top_k(weights, 2, rng)
+        return [
+            [all_topics[top[i, j]] for j in range(min(num_topics[i], top.shape[1])) if valid[i, j]]
+            for i in range(n)
+        ]
+
+    def _draw_languages(
+        self, rng: np.random.Generator, chosen: list[Persona], language_filter: list[str]
+    ) -> list[str]:
+        """Draw a language per post from the filter or persona distributions."""
+        n = len(chosen)
+        if language_filter:
+            picks = rng.integers(0, len(language_filter), size=n)
+            return [language_filter[i] for i in picks]
+
+        languages = sorted(
+            {lang for p in chosen for lang in p.behavior.language_distribution}
+        )
+        column = {lang: j for j, lang in enumerate(languages)}
+        weights = np.zeros((n, len(languages)))
+        for i, persona in enumerate(chosen):
+            for lang, weight in persona.behavior.language_distribution.items():
+                weights[i, column[lang]] = weight
+
+        picks = _categorical(rng, weights)
+        return [languages[j] for j in picks]
+
+    def _draw_base_texts(
+        self, rng: np.random.Generator, rows: np.ndarray, topics: list[list[str]]
+    ) -> tuple[list[str], list[str]]:
+        """Draw templates and vocabulary for every post and render them."""
+        n = len(rows)
+        table = persona_registry.table
+        hot_take = table.column("hot_take_factor")[rows].astype(np.float64)
+        emoji_pref = table.column("emoji_preference")[rows].astype(np.float64)
+
+        weights = text_generator.category_weights(hot_take, emoji_pref)
+        category_idx = _categorical(
+            rng, np.column_stack(np.broadcast_arrays(*weights.values()))
+        )
+        templates = text_generator.templates
+        template_sizes = np.array([len(templates[c]) for c in CATEGORIES])
+        template_idx = _scaled_index(rng.random(n), template_sizes[category_idx])
+
+        topic_counts = np.array([len(t) for t in topics])
+        topic_pick = _scaled_index(rng.random(n), np.maximum(topic_counts, 1))
+        # One uniform per placeholder position; only the template's own slots are used
+        slot_u = rng.random((n, text_generator.max_fields))
+        extend = rng.random(n) < 0.3  # 30% chance of Markov extension
+
+        snapshot = topic_graph.snapshot()
+        texts = []
+        template_names = []
+        for i in range(n):
+            category = CATEGORIES[category_idx[i]]
+            if topics[i]:
+                topic_id = topics[i][topic_pick[i]]
+                topic_name = snapshot.name(topic_id)
+            else:
+                topic_name = "everything"
+
+            template = templates[category][template_idx[i]]
+            values = {"topic": topic_name}
+            for j, field in enumerate(template.fields):
+                if field != "topic":
+                    words = SLOT_VOCABULARY[field]
+                    values[field] = words[int(slot_u[i, j] * len(words))]
+
+            text = template.render(values)
+            if extend[i]:
+                text = text_generator.extend_with_markov(text, rng)
+
+            texts.append(text)
+            template_names.append(f"{category}_v1")
+
+        return texts, template_names
+
+    def _decorate(
+        self,
+        rng: np.random.Generator,
+        rows: np.ndarray,
+        chosen: list[Persona],
+        topics: list[list[str]],
+        texts: list[str],
+    ) -> tuple[list[str], list[StyleMetrics]]:
+        """Vectorized StyleDecorator.decorate for the batch."""
+        n = len(chosen)
+        table = persona_registry.table
+        emoji_pref = table.column("emoji_preference")[rows].astype(np.float64)
+        hashtag_pref = table.column("hashtag_propensity")[rows].astype(np.float64)
+        link_pref = table.column("link_propensity")[rows].astype(np.float64)
+        max_quirks = max((len(p.style.punctuation_quirks) for p in chosen), default=0)
+
+        num_emojis = np.where(
+            emoji_pref < 0.1,
+            0,
+            _scaled_index(rng.random(n), (emoji_pref * MAX_EMOJIS).astype(np.int64) + 1),
+        )
+        emoji_u = rng.random((n, MAX_EMOJIS))
+        emoji_append = rng.random(n) < 0.5
+        emoji_pos_u = rng.random((n, MAX_EMOJIS))
+
+        num_hashtags = np.where(
+            hashtag_pref < 0.1,
+            0,
+            _scaled_index(rng.random(n), (hashtag_pref * MAX_HASHTAGS).astype(np.int64) + 1),
+        )
+        hashtag_u = rng.random((n, MAX_HASHTAGS))
+
+        add_link = rng.random(n) <= link_pref
+        url_idx = _scaled_index(rng.random(n), len(SAMPLE_URLS))
+
+        # High emoji users tend to use more caps
+        apply_caps = rng.random(n) <= emoji_pref * 0.3
+        quirk_u = rng.random((n, max_quirks))
+
+        out_texts = []
+        styles = []
+        for i in range(n):
+            text = texts[i]
+            persona = chosen[i]
+
+            emoji_count = int(num_emojis[i])
+            if emoji_count:
+                pool = style_decorator.emoji_pool(text)
+                selected = [pool[int(u * len(pool))] for u in emoji_u[i, :emoji_count]]
+                if emoji_append[i]:
+                    text = text + " " + " ".join(selected)
+                else:
+                    words = text.split()
+                    for j, emoji in enumerate(selected):
+                        if words:
+                            words.insert(int(emoji_pos_u[i, j] * len(words)), emoji)
+                    text = " ".join(words)
+
+            hashtag_count = int(num_hashtags[i])
+            if hashtag_count:
+                pool = style_decorator.hashtag_pool(topics[i])
+                picks = [int(u * len(pool)) for u in hashtag_u[i, :hashtag_count]]
+                text = text + " " + " ".join(f"#{pool[j]}" for j in picks)
+
+            link_count = int(add_link[i])
+            if link_count:
+                text = text + f" {SAMPLE_URLS[url_idx[i]]}"
+
+            caps_ratio = 0.0
+            if apply_caps[i]:
+                words = text.split()
+                upper = rng.random(len(words)) < 0.3  # 30% of words
+                caps_count = 0
+                for j, word in enumerate(words):
+                    # Don't cap hashtags or URLs
+                    if upper[j] and not (word.startswith("#") or word.startswith("http")):
+                        words[j] = word.upper()
+                        caps_count += 1
+                caps_ratio = caps_count / len(words) if words else 0.0
+                text = " ".join(words)
+
+            for j, quirk in enumerate(persona.style.punctuation_quirks):
+                if quirk_u[i, j] < 0.4:  # 40% chance
+                    text = text + quirk
+
+            text = style_decorator.sanitize_toxicity(text, persona)
+
+            out_texts.append(text)
+            styles.append(
+                trusted(
+                    StyleMetrics,
+                    emojis=emoji_count,
+                    hashtags=hashtag_count,
+                    links=link_count,
+                    caps=caps_ratio,
+                )
+            )
+
+        return out_texts, styles
+
+    def _draw_influences(self, rng: np.random.Generator, n: int) -> list[list[str]]:
+        """Sample up to three recent posts per post as influences."""
+        recent_all = memory_store.get_recent_posts(limit=50)
+        if not recent_all:
+            return [[] for _ in range(n)]
+
+        num_influences = np.minimum(rng.integers(0, MAX_INFLUENCES + 1, size=n), len(recent_all))
+        picks = rng.integers(0, len(recent_all), size=(n, MAX_INFLUENCES))
+        return [
+            [recent_all[j].id for j in picks[i, : num_influences[i]]] for i in range(n)
+        ]
+
+
+# Global batch generator instance
+batch_generator = BatchGenerator()
@@ -3,10 +3,16 @@
 
 import random
 import re
-from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
 from typing import Any
 
+import numpy as np
+import orjson
+
+from app.config import settings
 from app.schemas import Persona
+from app.services.generator.markov import MarkovChain
 from app.services.rng import rng_manager
 from app.services.topics import topic_graph
 
@@ -98,45 +104,69 @@ STATUS_WORDS = [
     "live", "dead", "back", "canceled", "revived", "trending", "fading"
 ]
 
+# Placeholder -> vocabulary used to fill it ({topic} is supplied by the caller)
+SLOT_VOCABULARY = {
+    "adjective": ADJECTIVES,
+    "verb": VERBS,
+    "trend_verb": TREND_VERBS,
+    "emotion": EMOTIONS,
+    "action": ACTIONS,
+    "complaint": COMPLAINTS,
+    "negative_prefix": ["not-", "un-", "anti-"],
+    "event": NEWS_EVENTS,
+    "news": STATUS_WORDS,
+    "status": STATUS_WORDS,
+    "other_topic": ["everything", "the rest", "alternatives"],
+}
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)\}")
+
 
-class MarkovChain:
-    """Simple Markov chain for text generation."""
+class CompiledTemplate:
+    """A template parsed once into literal segments and placeholder slots."""
 
-    def __init__(self, order: int = 2):
-        self.order = order
-        self.chain: dict[tuple[str, ...], list[str]] = defaultdict(list)
+    __slots__ = ("source", "segments", "slots", "fields")
 
-    def train(self, texts: list[str]) -> None:
-        """Train on a corpus of texts."""
-        for text in texts:
-            words = text.split()
-            if len(words) < self.order + 1:
-                continue
+    def __init__(self, source: str):
+        parts = PLACEHOLDER_PATTERN.split(source)
+        self.source = source
+        self.segments = tuple(parts[0::2])  # literals around the slots
+        self.slots = tuple(parts[1::2])  # placeholder name per slot (may repeat)
+        self.fields = tuple(dict.fromkeys(self.slots))  # unique placeholders, in order
 
-            for i in range(len(words) - self.order):
-                key = tuple(words[i : i + self.order])
-                next_word = words[i + self.order]
-                self.chain[key].append(next_word)
+        unknown = [f for f in self.fields if f != "topic" and f not in SLOT_VOCABULARY]
+        if unknown:
+            raise ValueError(f"Unknown template placeholder(s) {unknown} in {source!r}")
 
-    def generate(self, seed_words: list[str], max_length: int = 20, rng_seed: int | None = None) -> str:
-        """Generate text starting from seed words."""
-        if len(seed_words) < self.order:
-            return " ".join(seed_words)
+    def render(self, values: dict[str, Any]) -> str:
+        """Assemble the text from literals and placeholder values in one join."""
+        parts = [self.segments[0]]
+        for slot, literal in zip(self.slots, self.segments[1:]):
+            parts.append(str(values[slot]))
+            parts.append(literal)
+        return "".join(parts)
 
-        current = tuple(seed_words[-self.order :])
-        output = list(seed_words)
 
-        for _ in range(max_length - len(seed_words)):
-            if current not in self.chain:
-                break
+@lru_cache(maxsize=1024)
+def compile_template(source: str) -> CompiledTemplate:
+    """Compile a template string (cached for ad-hoc callers)."""
+    return CompiledTemplate(source)
 
-            candidates = self.chain[current]
-            next_word = rng_manager.choice(candidates, seed=rng_seed)
-            output.append(next_word)
 
-            current = tuple(output[-self.order :])
+def compile_templates(templates: dict[str, list[str]]) -> dict[str, list[CompiledTemplate]]:
+    """Compile a category -> templates mapping."""
+    return {
+        category: [CompiledTemplate(source) for source in sources]
+        for category, sources in templates.items()
+    }
 
-        return " ".join(output)
+
+def max_fields(templates: dict[str, list[CompiledTemplate]]) -> int:
+    """Largest number of distinct placeholders in any of the templates."""
+    return max(
+        (len(t.fields) for compiled in templates.values() for t in compiled),
+        default=0,
+    )
 
 
 # Simple corpus for Markov training
@@ -163,57 +193,106 @@ class TextGenerator:
     """Rule-based text generator with templates and Markov chains."""
 
     def __init__(self):
-        self.markov = MarkovChain(order=2)
-        self.markov.train(MARKOV_CORPUS)
-
-    def fill_template(self, template: str, topic_name: str, seed: int | None = None) -> str:
-        """Fill a template with random vocabulary."""
-        replacements = {
-            "topic": topic_name,
-            "adjective": rng_manager.choice(ADJECTIVES, seed=seed),
-            "verb": rng_manager.choice(VERBS, seed=seed),
-            "trend_verb": rng_manager.choice(TREND_VERBS, seed=seed),
-            "emotion": rng_manager.choice(EMOTIONS, seed=seed),
-            "action": rng_manager.choice(ACTIONS, seed=seed),
-            "complaint": rng_manager.choice(COMPLAINTS, seed=seed),
-            "negative_prefix": rng_manager.choice(["not-", "un-", "anti-"], seed=seed),
-            "event": rng_manager.choice(NEWS_EVENTS, seed=seed),
-            "news": rng_manager.choice(STATUS_WORDS, seed=seed),
-            "status": rng_manager.choice(STATUS_WORDS, seed=seed),
-            "other_topic": rng_manager.choice(["everything", "the rest", "alternatives"], seed=seed),
-        }
+        if settings.markov_model:
+            # Pretrained model, memory-mapped and shared between workers
+            self.markov = MarkovChain.load(settings.markov_model)
+        else:
+            self.markov = MarkovChain(order=4, min_order=1)
+            self.markov.train(MARKOV_CORPUS)
+
+        self.templates = compile_templates(TEMPLATES)
+        # Largest number of distinct placeholders in any loaded template
+        self.max_fields = max_fields(self.templates)
+        for path in settings.template_packs:
+            self.load_template_pack(path)
+
+    def load_template_pack(self, path: str | Path) -> int:
+        """
+        Load an external template pack.
 
-        # Replace placeholders
-        result = template
-        for key, value in replacements.items():
-            result = result.replace(f"{{{key}}}", str(value))
+        The pack is a JSON object mapping existing template categories to lists
+        of template strings. Templates are compiled at load time, so pack size
+        adds no per-post cost.
 
-        return result
+        Returns:
+            number of templates added
+        """
+        pack = orjson.loads(Path(path).read_bytes())
 
-    def select_template_category(self, persona: Persona, seed: int | None = None) -> str:
-        """Select a template category based on persona traits."""
-        # Weight by persona style
-        weights = {
-            "hot_take": persona.style.hot_take_factor,
+        unknown = [category for category in pack if category not in self.templates]
+        if unknown:
+            raise ValueError(f"Unknown template categories {unknown} in pack {path}")
+
+        compiled = compile_templates(pack)
+        for category, templates in compiled.items():
+            self.templates[category].extend(templates)
+        self.max_fields = max(self.max_fields, max_fields(compiled))
+
+        return sum(len(templates) for templates in compiled.values())
+
+    def fill_template(
+        self,
+        template: str | CompiledTemplate,
+        topic_name: str,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> str:
+        """Fill a template, drawing vocabulary only for the placeholders it uses."""
+        if isinstance(template, str):
+            template = compile_template(template)
+
+        rng = rng_manager.resolve(rng, seed)
+        values = {"topic": topic_name}
+        for field in template.fields:
+            if field != "topic":
+                words = SLOT_VOCABULARY[field]
+                values[field] = words[rng.integers(len(words))]
+
+        return template.render(values)
+
+    @staticmethod
+    def category_weights(hot_take_factor: Any, emoji_preference: Any) -> dict[str, Any]:
+        """
+        Unnormalized template category weights.
+
+        Accepts scalars or NumPy arrays (one entry per persona).
+        """
+        return {
+            "hot_take": hot_take_factor,
             "observation": 0.3,
             "question": 0.2,
             "statement": 0.3,
-            "reaction": persona.style.emoji_preference * 0.4,
+            "reaction": emoji_preference * 0.4,
             "announcement": 0.1,
         }
 
+    def select_template_category(
+        self,
+        persona: Persona,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> str:
+        """Select a template category based on persona traits."""
+        rng = rng_manager.resolve(rng, seed)
+
+        # Weight by persona style
+        weights = self.category_weights(
+            persona.style.hot_take_factor, persona.style.emoji_preference
+        )
+
         categories = list(weights.keys())
         probs = [weights[c] for c in categories]
         total = sum(probs)
         probs = [p / total for p in probs]
 
-        return rng_manager.choice(categories, p=probs, seed=seed)
+        return str(rng.choice(categories, p=probs))
 
     def generate_base_text(
         self,
         persona: Persona,
         topics: list[str],
         seed: int | None = None,
+        rng: np.random.Generator | None = None,
     ) -> tuple[str, str]:
         """
         Generate base text from templates.
@@ -221,39 +300,46 @@ class TextGenerator:
         Returns:
             (text, template_name)
         """
+        rng = rng_manager.resolve(rng, seed)
+
         # Pick a topic
         if not topics:
             topics = ["everything"]
 
-        topic_id = rng_manager.choice(topics, seed=seed)
-        topic_obj = topic_graph.get_topic(topic_id)
-        topic_name = topic_obj.name if topic_obj else topic_id
+        topic_id = str(rng.choice(topics))
+        topic_name = topic_graph.snapshot().name(topic_id)
 
         # Select template category
-        category = self.select_template_category(persona, seed=seed)
-        templates = TEMPLATES[category]
-        template = rng_manager.choice(templates, seed=seed)
+        category = self.select_template_category(persona, rng=rng)
+        templates = self.templates[category]
+        template = templates[rng.integers(len(templates))]
 
         # Fill template
-        text = self.fill_template(template, topic_name, seed=seed)
+        text = self.fill_template(template, topic_name, rng=rng)
 
         # Optionally extend with Markov
-        if rng_manager.random(seed=seed) < 0.3:  # 30% chance
-            seed_words = text.split()[-2:]
-            extension = self.markov.generate(seed_words, max_length=10, rng_seed=seed)
-            # Take only the new words
-            new_words = extension.split()[len(seed_words):]
-            if new_words:
-                text += " " + " ".join(new_words[:5])
+        if rng.random() < 0.3:  # 30% chance
+            text = self.extend_with_markov(text, rng)
 
         template_name = f"{category}_v1"
         return text, template_name
 
+    def extend_with_markov(self, text: str, rng: np.random.Generator) -> str:
+        """Append up to five Markov-generated words continuing the text."""
+        seed_words = text.split()[-self.markov.order :]
+        extension = self.markov.generate(seed_words, max_length=10, rng=rng)
+        # Take only the new words
+        new_words = extension.split()[len(seed_words):]
+        if new_words:
+            text += " " + " ".join(new_words[:5])
+        return text
+
     def generate(
         self,
         persona: Persona,
         topics: list[str],
         seed: int | None = None,
+        rng: np.random.Generator | None = None,
     ) -> tuple[str, str]:
         """
         Generate text for a persona and topics.
@@ -261,7 +347,7 @@ class TextGenerator:
         Returns:
             (text, template_name)
         """
-        return self.generate_base_text(persona, topics, seed=seed)
+        return self.generate_base_text(persona, topics, seed=seed, rng=rng)
 
 
 # Global text generator instance
@@ -0,0 +1,458 @@
+#!/usr/bin/env python
+"""Compact integer-encoded Markov chain with alias-table sampling."""
+
+import struct
+from collections.abc import Iterable
+from pathlib import Path
+from typing import overload
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.services.rng import rng_manager
+from app.services.sampling import build_alias
+
+# 64-bit multiplicative hash constants for state lookup
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+_EMPTY = -1
+
+# On-disk model format: header, then 64-byte aligned little-endian arrays
+MODEL_MAGIC = b"HURLMKV1"
+# magic, version, order, min order, vocab, states, successors, table, vocab bytes
+_HEADER = struct.Struct("<8sIIIQQQQQ")
+_FORMAT_VERSION = 2
+_ALIGN = 64
+
+# Tokens buffered before merging n-gram counts during training
+DEFAULT_CHUNK_TOKENS = 1_000_000
+
+
+def _hash_ids(ids: tuple[int, ...]) -> int:
+    """Hash a state (tuple of token IDs); must match _hash_rows."""
+    h = 0
+    for token in ids:
+        h = ((h ^ token) * _HASH_MULTIPLIER) & _MASK64
+    return h ^ (h >> 29)
+
+
+def _hash_rows(states: np.ndarray) -> np.ndarray:
+    """Vectorized _hash_ids over the rows of a (states, order) array."""
+    h = np.zeros(len(states), dtype=np.uint64)
+    multiplier = np.uint64(_HASH_MULTIPLIER)
+    for column in states.T:
+        h = (h ^ column.astype(np.uint64)) * multiplier
+    return h ^ (h >> np.uint64(29))
+
+
+def _aligned(offset: int) -> int:
+    """Round a file offset up to the array alignment."""
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class MappedVocab:
+    """
+    Read-only vocabulary backed by a memory-mapped model file.
+
+    Words are stored as one UTF-8 blob with offsets, plus a permutation that
+    sorts them, so word -> ID is a binary search and nothing is copied into
+    per-process dicts. Supports the dict.get / list indexing that
+    MarkovChain uses for token_ids and vocab.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray, sorted_ids: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+        self._sorted_ids = sorted_ids
+
+    def __len__(self) -> int:
+        return len(self._sorted_ids)
+
+    def _word_bytes(self, token: int) -> bytes:
+        return self._blob[self._offsets[token] : self._offsets[token + 1]].tobytes()
+
+    def __getitem__(self, token: int) -> str:
+        return self._word_bytes(token).decode("utf-8")
+
+    @overload
+    def get(self, word: str) -> int | None: ...
+
+    @overload
+    def get(self, word: str, default: int) -> int: ...
+
+    def get(self, word: str, default: int | None = None) -> int | None:
+        """Token ID for a word, or default if it is not in the vocabulary."""
+        target = word.encode("utf-8")
+        lo, hi = 0, len(self._sorted_ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._word_bytes(self._sorted_ids[mid]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._sorted_ids):
+            token = int(self._sorted_ids[lo])
+            if self._word_bytes(token) == target:
+                return token
+        return default
+
+
+# Characters stripped when matching seed words that are not in the vocabulary
+_SEED_PUNCTUATION = ".,!?:;\"'()*"
+
+
+class MarkovChain:
+    """
+    Variable-order Markov chain over interned token IDs.
+
+    Contexts of every order from min_order to order share one n-gram index:
+    a state table (order token IDs per state, left-padded with -1 for lower
+    orders), CSR successor offsets, successor token IDs and a per-successor
+    alias table. Generation looks states up in an open-addressing hash table,
+    backing off from the longest context to min_order, and draws each next
+    token with one uniform, so a step costs at most (order - min_order + 1)
+    O(1) lookups and allocates no arrays.
+    """
+
+    def __init__(self, order: int = 2, min_order: int | None = None):
+        self.order = order
+        self.min_order = order if min_order is None else min_order
+        if not 1 <= self.min_order <= self.order:
+            raise ValueError(f"min_order must be in [1, {order}], got {self.min_order}")
+
+        # Words interned so far; vocab and token_ids are these until load() maps a file
+        self._words: list[str] = []
+        self._word_ids: dict[str, int] = {}
+        self.vocab: list[str] | MappedVocab = self._words
+        self.token_ids: dict[str, int] | MappedVocab = self._word_ids
+        self.read_only = False
+
+        # Unique (order + 1)-grams and their counts, accumulated across train() calls
+        self._grams = np.empty((0, order + 1), dtype=np.int32)
+        self._counts = np.empty(0, dtype=np.int64)
+
+        # Compiled model
+        self.states = np.empty((0, order), dtype=np.int32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.successors = np.empty(0, dtype=np.int32)
+        self.alias_prob = np.empty(0, dtype=np.float32)
+        self.alias_idx = np.empty(0, dtype=np.int32)
+        self.table = np.full(1, _EMPTY, dtype=np.int64)
+
+    @property
+    def num_states(self) -> int:
+        """Number of distinct states."""
+        return len(self.states)
+
+    def intern(self, word: str) -> int:
+        """Get (or assign) the token ID for a word."""
+        token = self._word_ids.get(word)
+        if token is None:
+            if self.read_only:
+                raise RuntimeError("Cannot add words to a memory-mapped Markov model")
+            token = len(self._words)
+            self._word_ids[word] = token
+            self._words.append(word)
+        return token
+
+    def train(self, texts: Iterable[str], chunk_tokens: int = DEFAULT_CHUNK_TOKENS) -> None:
+        """
+        Train on a corpus of texts.
+
+        texts may be any iterable (e.g. lines streamed from a file). N-gram
+        windows are buffered for about chunk_tokens tokens and then counted
+        into a sorted run; runs are merged like a binary counter, so each
+        n-gram is re-sorted O(log chunks) times rather than once per chunk.
+        Memory is bounded by the chunk plus about twice the model, not by the
+        corpus.
+        """
+        if self.read_only:
+            raise RuntimeError("Cannot train a memory-mapped Markov model")
+
+        runs = [(self._grams, self._counts)]
+        windows = []
+        buffered = 0
+        for text in texts:
+            words = text.split()
+            if len(words) < self.min_order + 1:
+                continue
+
+            ids = np.fromiter((self.intern(w) for w in words), dtype=np.int32, count=len(words))
+            for k in range(self.min_order, min(self.order, len(words) - 1) + 1):
+                grams = sliding_window_view(ids, k + 1)
+                if k < self.order:
+                    # Left-pad lower-order contexts to the shared state width
+                    pad = np.full((len(grams), self.order - k), _EMPTY, dtype=np.int32)
+                    grams = np.hstack([pad, grams])
+                windows.append(grams)
+            buffered += len(words)
+
+            if buffered >= chunk_tokens:
+                self._absorb(runs, windows)
+                windows = []
+                buffered = 0
+
+        self._absorb(runs, windows)
+        while len(runs) > 1:
+            self._merge_last(runs)
+        self._grams, self._counts = runs[0]
+        self.compile()
+
+    def _absorb(self, runs: list[tuple[np.ndarray, np.ndarray]], windows: list[np.ndarray]) -> None:
+        """
+        Count a chunk of n-gram windows into a new sorted run.
+
+        Runs are kept more than halving in size from first to last, so there
+        are O(log chunks) of them and merges stay balanced.
+        """
+        if not windows:
+            return
+
+        grams = np.concatenate(windows)
+        runs.append(self._merge_counts(grams, np.ones(len(grams), dtype=np.int64)))
+        while len(runs) > 1 and len(runs[-2][0]) <= 2 * len(runs[-1][0]):
+            self._merge_last(runs)
+
+    def _merge_last(self, runs: list[tuple[np.ndarray, np.ndarray]]) -> None:
+        """Merge the last two runs into one."""
+        grams, counts = runs.pop()
+        prev_grams, prev_counts = runs.pop()
+        runs.append(
+            self._merge_counts(
+                np.concatenate([prev_grams, grams]), np.concatenate([prev_counts, counts])
+            )
+        )
+
+    @staticmethod
+    def _merge_counts(grams: np.ndarray, counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Sort n-grams lexicographically and sum the counts of duplicates."""
+        order = np.lexsort(grams.T[::-1])
+        grams, counts = grams[order], counts[order]
+
+        first = np.ones(len(grams), dtype=bool)
+        first[1:] = (grams[1:] != grams[:-1]).any(axis=1)
+        starts = np.flatnonzero(first)
+        return grams[starts], np.add.reduceat(counts, starts) if len(starts) else counts
+
+    def compile(self) -> None:
+        """Pack accumulated n-gram counts into CSR arrays, alias tables and a hash table."""
+        grams, counts = self._grams, self._counts  # sorted lexicographically
+        order = self.order
+
+        if len(grams):
+            new_state = np.ones(len(grams), dtype=bool)
+            new_state[1:] = (grams[1:, :order] != grams[:-1, :order]).any(axis=1)
+            starts = np.flatnonzero(new_state)
+        else:
+            starts = np.empty(0, dtype=np.int64)
+
+        self.states = np.ascontiguousarray(grams[starts, :order])
+        self.offsets = np.append(starts, len(grams)).astype(np.int64)
+        self.successors = np.ascontiguousarray(grams[:, order])
+
+        # Alias tables; rows with one successor or uniform counts need no aliasing
+        self.alias_prob = np.ones(len(grams), dtype=np.float32)
+        self.alias_idx = (np.arange(len(grams)) - np.repeat(starts, np.diff(self.offsets))).astype(
+            np.int32
+        )
+        for row in range(len(starts)):
+            lo, hi = self.offsets[row], self.offsets[row + 1]
+            row_counts = counts[lo:hi]
+            if hi - lo > 1 and row_counts.min() != row_counts.max():
+                prob, alias = build_alias(row_counts.astype(np.float64))
+                self.alias_prob[lo:hi] = prob
+                self.alias_idx[lo:hi] = alias
+
+        self.table = self._build_table(self.states)
+
+    @staticmethod
+    def _build_table(states: np.ndarray) -> np.ndarray:
+        """Build an open-addressing (linear probing) table mapping state hash -> row."""
+        capacity = 1
+        while capacity < 2 * len(states):
+            capacity <<= 1
+
+        table = np.full(capacity, _EMPTY, dtype=np.int64)
+        mask = np.uint64(capacity - 1)
+        pending = np.arange(len(states))
+        slots = (_hash_rows(states) & mask).astype(np.int64)
+
+        # Place all states in rounds: each free slot takes its first claimant,
+        # everyone else probes the next slot
+        while len(pending):
+            free = table[slots] == _EMPTY
+            claim_slots, first = np.unique(slots[free], return_index=True)
+            winners = pending[free][first]
+            table[claim_slots] = winners
+
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[np.flatnonzero(free)[first]] = True
+            pending = pending[~placed]
+            slots = (slots[~placed] + 1) & (capacity - 1)
+
+        return table
+
+    def find_state(self, ids: tuple[int, ...]) -> int:
+        """
+        Return the state row for a tuple of token IDs, or -1 if unseen.
+
+        ids has one entry per order, left-padded with -1 for lower-order contexts.
+        """
+        table = self.table
+        mask = len(table) - 1
+        slot = _hash_ids(ids) & mask
+        while True:
+            row = table[slot]
+            if row == _EMPTY:
+                return _EMPTY
+            state = self.states[row]
+            if all(state[j] == ids[j] for j in range(self.order)):
+                return int(row)
+            slot = (slot + 1) & mask
+
+    def sample_successor(self, row: int, rng: np.random.Generator) -> int:
+        """Draw the next token ID for a state with one uniform (alias method)."""
+        start = self.offsets[row]
+        n = self.offsets[row + 1] - start
+        u = rng.random() * n
+        k = int(u)
+        j = start + k
+        if u - k >= self.alias_prob[j]:
+            j = start + self.alias_idx[j]
+        return int(self.successors[j])
+
+    def find_context(self, context: tuple[int, ...]) -> int:
+        """
+        Find the longest known state ending a context, backing off to min_order.
+
+        context holds up to `order` token IDs (-1 for unknown words).
+        Returns the state row, or -1 if no suffix of the context is known.
+        """
+        for k in range(min(self.order, len(context)), self.min_order - 1, -1):
+            tail = context[len(context) - k :]
+            if _EMPTY in tail:
+                continue
+            row = self.find_state((_EMPTY,) * (self.order - k) + tail)
+            if row != _EMPTY:
+                return row
+        return _EMPTY
+
+    def _seed_id(self, word: str) -> int:
+        """Token ID for a seed word, retrying lower-cased without punctuation."""
+        token = self.token_ids.get(word, _EMPTY)
+        if token == _EMPTY:
+            token = self.token_ids.get(word.lower().strip(_SEED_PUNCTUATION), _EMPTY)
+        return token
+
+    def generate(
+        self,
+        seed_words: list[str],
+        max_length: int = 20,
+        rng_seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> str:
+        """Generate text starting from seed words."""
+        if len(seed_words) < self.min_order:
+            return " ".join(seed_words)
+
+        rng = rng_manager.resolve(rng, rng_seed)
+
+        context = tuple(self._seed_id(w) for w in seed_words[-self.order :])
+        output = list(seed_words)
+
+        for _ in range(max_length - len(seed_words)):
+            row = self.find_context(context)
+            if row == _EMPTY:
+                break
+
+            next_id = self.sample_successor(row, rng)
+            output.append(self.vocab[next_id])
+
+            context = (context + (next_id,))[-self.order :]
+
+        return " ".join(output)
+
+    def save(self, path: str | Path) -> None:
+        """
+        Write the compiled model to a binary file that load() can memory-map.
+
+        Layout: header, then states, offsets, successors, alias_prob,
+        alias_idx, hash table, vocab offsets, vocab sort order and the UTF-8
+        vocab blob, each 64-byte aligned.
+        """
+        encoded = [self.vocab[i].encode("utf-8") for i in range(len(self.vocab))]
+        vocab_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        vocab_offsets[1:] = np.cumsum([len(w) for w in encoded])
+        sorted_ids = np.array(
+            sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int32
+        )
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+        header = _HEADER.pack(
+            MODEL_MAGIC,
+            _FORMAT_VERSION,
+            self.order,
+            self.min_order,
+            len(encoded),
+            self.num_states,
+            len(self.successors),
+            len(self.table),
+            len(blob),
+        )
+        arrays = [
+            self.states.astype("<i4"),
+            self.offsets.astype("<i8"),
+            self.successors.astype("<i4"),
+            self.alias_prob.astype("<f4"),
+            self.alias_idx.astype("<i4"),
+            self.table.astype("<i8"),
+            vocab_offsets.astype("<i8"),
+            sorted_ids.astype("<i4"),
+            blob,
+        ]
+
+        with open(path, "wb") as f:
+            f.write(header)
+            for array in arrays:
+                f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+                f.write(np.ascontiguousarray(array).tobytes())
+
+    @classmethod
+    def load(cls, path: str | Path) -> "MarkovChain":
+        """
+        Memory-map a model written by save().
+
+        Arrays are read-only views into the file, so processes that load the
+        same file share one copy through the page cache and nothing is retrained.
+        """
+        mm = np.memmap(path, dtype=np.uint8, mode="r")
+        header = _HEADER.unpack(mm[: _HEADER.size].tobytes())
+        magic, version, order, min_order, n_vocab, n_states, n_succ, n_table, n_blob = header
+        if magic != MODEL_MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"{path} is not a Hurl Markov model (version {_FORMAT_VERSION})")
+
+        offset = _HEADER.size
+
+        def take(dtype: str, count: int) -> np.ndarray:
+            nonlocal offset
+            if count == 0:
+                return np.empty(0, dtype=dtype)
+            offset = _aligned(offset)
+            array = np.frombuffer(mm, dtype=dtype, count=count, offset=offset)
+            offset += array.nbytes
+            return array
+
+        chain = cls(order=order, min_order=min_order)
+        chain.states = take("<i4", n_states * order).reshape(n_states, order)
+        chain.offsets = take("<i8", n_states + 1)
+        chain.successors = take("<i4", n_succ)
+        chain.alias_prob = take("<f4", n_succ)
+        chain.alias_idx = take("<i4", n_succ)
+        chain.table = take("<i8", n_table)
+        vocab_offsets = take("<i8", n_vocab + 1)
+        sorted_ids = take("<i4", n_vocab)
+        blob = take("<u1", n_blob)
+
+        chain.vocab = chain.token_ids = MappedVocab(vocab_offsets, blob, sorted_ids)
+        chain.read_only = True
+        return chain
@@ -1,7 +1,9 @@
 #!/usr/bin/env python
 """Simulated engagement metrics and influence calculation."""
 
-from app.schemas import Persona, PostMetrics
+import numpy as np
+
+from app.schemas import Persona, PostMetrics, trusted
 from app.services.rng import rng_manager
 
 
@@ -23,6 +25,7 @@ class MetricsSimulator:
         text: str,
         mode: str,
         seed: int | None = None,
+        rng: np.random.Generator | None = None,
     ) -> PostMetrics:
         """
         Simulate engagement metrics.
@@ -33,6 +36,7 @@ class MetricsSimulator:
         - Text length and style
         - Mode (emergent has more variance)
         """
+        rng = rng_manager.resolve(rng, seed)
         base_reach = self.compute_base_reach(persona)
 
         # Topic boost (higher trend = more impressions)
@@ -40,7 +44,7 @@ class MetricsSimulator:
         if topics:
             # For simplicity, use a fixed boost
             # In full implementation, query topic trend scores
-            topic_boost = 1.0 + rng_manager.random(seed=seed) * 0.5
+            topic_boost = 1.0 + rng.random() * 0.5
 
         # Text length factor (longer = slightly more engagement)
         word_count = len(text.split())
@@ -48,26 +52,62 @@ class MetricsSimulator:
 
         # Impressions
         impressions_mean = base_reach * topic_boost * length_factor * 50
-        impressions = max(
-            int(rng_manager.exponential(scale=impressions_mean, seed=seed)), 1
-        )
+        impressions = max(int(rng.exponential(scale=impressions_mean)), 1)
 
         # Engagement rate (likes, replies, quotes as % of impressions)
-        like_rate = rng_manager.beta(2, 10, seed=seed)  # ~10-20%
-        reply_rate = rng_manager.beta(1, 20, seed=seed)  # ~2-5%
-        quote_rate = rng_manager.beta(1, 50, seed=seed)  # ~1-2%
+        like_rate = rng.beta(2, 10)  # ~10-20%
+        reply_rate = rng.beta(1, 20)  # ~2-5%
+        quote_rate = rng.beta(1, 50)  # ~1-2%
 
         likes = int(impressions * like_rate)
         replies = int(impressions * reply_rate)
         quotes = int(impressions * quote_rate)
 
-        return PostMetrics(
+        return trusted(
+            PostMetrics,
             likes=likes,
             replies=replies,
             quotes=quotes,
             impressions=impressions,
         )
 
+    def simulate_batch(
+        self,
+        influence_scores: np.ndarray,
+        word_counts: np.ndarray,
+        has_topics: np.ndarray,
+        rng: np.random.Generator,
+    ) -> dict[str, np.ndarray]:
+        """
+        Vectorized simulate_metrics for a batch of posts.
+
+        Args:
+            influence_scores: persona influence per post
+            word_counts: final word count per post
+            has_topics: boolean mask of posts with at least one topic; as in
+                simulate_metrics, only those get the topic boost
+            rng: RNG for the batch
+
+        Returns:
+            dict of likes/replies/quotes/impressions integer arrays
+        """
+        n = len(influence_scores)
+        base_reach = 1.0 + influence_scores * 99.0  # see compute_base_reach
+        topic_boost = np.where(has_topics, 1.0 + rng.random(n) * 0.5, 1.0)
+        length_factor = np.minimum(1.0 + word_counts / 100.0, 2.0)
+
+        impressions_mean = base_reach * topic_boost * length_factor * 50
+        impressions = np.maximum(
+            (rng.standard_exponential(n) * impressions_mean).astype(np.int64), 1
+        )
+
+        return {
+            "likes": (impressions * rng.beta(2, 10, size=n)).astype(np.int64),
+            "replies": (impressions * rng.beta(1, 20, size=n)).astype(np.int64),
+            "quotes": (impressions * rng.beta(1, 50, size=n)).astype(np.int64),
+            "impressions": impressions,
+        }
+
 
 # Global metrics simulator instance
 metrics_simulator = MetricsSimulator()
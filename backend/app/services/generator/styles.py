@@ -3,7 +3,9 @@
 
 import re
 
-from app.schemas import Persona, StyleMetrics
+import numpy as np
+
+from app.schemas import Persona, StyleMetrics, trusted
 from app.services.rng import rng_manager
 
 
@@ -16,6 +18,12 @@ EMOJIS = {
     "celebration": ["🎊", "🥳", "🍾", "🏆", "🎁"],
 }
 
+POSITIVE_EMOJIS = EMOJIS["positive"] + EMOJIS["celebration"]
+
+# Sentiment keywords for emoji pool selection
+POSITIVE_WORDS = {"good", "great", "amazing", "love", "awesome", "best", "fire", "peak"}
+NEGATIVE_WORDS = {"bad", "terrible", "worst", "hate", "awful", "trash", "mid"}
+
 # Common hashtags by topic
 HASHTAG_TEMPLATES = {
     "ai": ["AI", "MachineLearning", "ArtificialIntelligence", "ML", "DeepLearning"],
@@ -27,6 +35,13 @@ HASHTAG_TEMPLATES = {
     "stocks": ["Stocks", "Investing", "StockMarket", "Trading", "Finance"],
 }
 
+FALLBACK_HASHTAGS = ["Trending", "Viral", "Thoughts", "Update", "News"]
+
+# Simple profanity blocklist for toxicity masking
+PROFANITY_PATTERN = re.compile(
+    r"\b(" + "|".join(["fuck", "shit", "damn", "ass", "bitch"]) + r")\b", re.IGNORECASE
+)
+
 # Sample URLs for link injection
 SAMPLE_URLS = [
     "example.com/article",
@@ -43,45 +58,54 @@ class StyleDecorator:
     def __init__(self):
         pass
 
-    def add_emojis(self, text: str, persona: Persona, seed: int | None = None) -> tuple[str, int]:
+    def emoji_pool(self, text: str) -> list[str]:
+        """Select an emoji pool based on text sentiment (simple heuristic)."""
+        text_lower = text.lower()
+        if any(word in text_lower for word in POSITIVE_WORDS):
+            return POSITIVE_EMOJIS
+        if any(word in text_lower for word in NEGATIVE_WORDS):
+            return EMOJIS["negative"]
+        return EMOJIS["neutral"]
+
+    def hashtag_pool(self, topics: list[str]) -> list[str]:
+        """Collect possible hashtags for a set of topics."""
+        hashtag_pool = []
+        for topic in topics:
+            if topic in HASHTAG_TEMPLATES:
+                hashtag_pool.extend(HASHTAG_TEMPLATES[topic])
+
+        return hashtag_pool or FALLBACK_HASHTAGS
+
+    def add_emojis(
+        self,
+        text: str,
+        persona: Persona,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> tuple[str, int]:
         """
         Add emojis based on persona preference.
 
         Returns:
             (decorated_text, emoji_count)
         """
+        rng = rng_manager.resolve(rng, seed)
         emoji_pref = persona.style.emoji_preference
         if emoji_pref < 0.1:
             return text, 0
 
         # Determine how many emojis to add
         max_emojis = int(emoji_pref * 5)  # 0-5 emojis
-        num_emojis = rng_manager.randint(0, max_emojis + 1, seed=seed)
+        num_emojis = int(rng.integers(0, max_emojis + 1))
 
         if num_emojis == 0:
             return text, 0
 
-        # Select emoji category based on text sentiment (simple heuristic)
-        positive_words = {"good", "great", "amazing", "love", "awesome", "best", "fire", "peak"}
-        negative_words = {"bad", "terrible", "worst", "hate", "awful", "trash", "mid"}
-
-        text_lower = text.lower()
-        has_positive = any(word in text_lower for word in positive_words)
-        has_negative = any(word in text_lower for word in negative_words)
-
-        if has_positive:
-            emoji_pool = EMOJIS["positive"] + EMOJIS["celebration"]
-        elif has_negative:
-            emoji_pool = EMOJIS["negative"]
-        else:
-            emoji_pool = EMOJIS["neutral"]
-
-        selected_emojis = [
-            rng_manager.choice(emoji_pool, seed=seed) for _ in range(num_emojis)
-        ]
+        emoji_pool = self.emoji_pool(text)
+        selected_emojis = rng.choice(emoji_pool, size=num_emojis).tolist()
 
         # Add emojis (50% at end, 50% sprinkled)
-        if rng_manager.random(seed=seed) < 0.5:
+        if rng.random() < 0.5:
             # Append at end
             text = text + " " + " ".join(selected_emojis)
         else:
@@ -89,14 +113,19 @@ class StyleDecorator:
             words = text.split()
             for emoji in selected_emojis:
                 if words:
-                    pos = rng_manager.randint(0, len(words), seed=seed)
+                    pos = int(rng.integers(0, len(words)))
                     words.insert(pos, emoji)
             text = " ".join(words)
 
         return text, num_emojis
 
     def add_hashtags(
-        self, text: str, persona: Persona, topics: list[str], seed: int | None = None
+        self,
+        text: str,
+        persona: Persona,
+        topics: list[str],
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
     ) -> tuple[str, int]:
         """
         Add hashtags based on persona and topics.
@@ -104,29 +133,21 @@ class StyleDecorator:
         Returns:
             (decorated_text, hashtag_count)
         """
+        rng = rng_manager.resolve(rng, seed)
         hashtag_pref = persona.style.hashtag_propensity
         if hashtag_pref < 0.1:
             return text, 0
 
         max_hashtags = int(hashtag_pref * 4)  # 0-4 hashtags
-        num_hashtags = rng_manager.randint(0, max_hashtags + 1, seed=seed)
+        num_hashtags = int(rng.integers(0, max_hashtags + 1))
 
         if num_hashtags == 0:
             return text, 0
 
-        # Collect possible hashtags
-        hashtag_pool = []
-        for topic in topics:
-            if topic in HASHTAG_TEMPLATES:
-                hashtag_pool.extend(HASHTAG_TEMPLATES[topic])
-
-        if not hashtag_pool:
-            hashtag_pool = ["Trending", "Viral", "Thoughts", "Update", "News"]
+        hashtag_pool = self.hashtag_pool(topics)
 
         # Sample hashtags
-        selected = [
-            rng_manager.choice(hashtag_pool, seed=seed) for _ in range(num_hashtags)
-        ]
+        selected = rng.choice(hashtag_pool, size=num_hashtags).tolist()
         hashtags = [f"#{tag}" for tag in selected]
 
         # Append at end
@@ -134,33 +155,48 @@ class StyleDecorator:
 
         return text, num_hashtags
 
-    def add_links(self, text: str, persona: Persona, seed: int | None = None) -> tuple[str, int]:
+    def add_links(
+        self,
+        text: str,
+        persona: Persona,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> tuple[str, int]:
         """
         Add URLs based on persona.
 
         Returns:
             (decorated_text, link_count)
         """
+        rng = rng_manager.resolve(rng, seed)
         link_pref = persona.style.link_propensity
-        if rng_manager.random(seed=seed) > link_pref:
+        if rng.random() > link_pref:
             return text, 0
 
-        url = rng_manager.choice(SAMPLE_URLS, seed=seed)
+        url = SAMPLE_URLS[rng.integers(len(SAMPLE_URLS))]
         text = text + f" {url}"
 
         return text, 1
 
-    def apply_caps(self, text: str, persona: Persona, seed: int | None = None) -> tuple[str, float]:
+    def apply_caps(
+        self,
+        text: str,
+        persona: Persona,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> tuple[str, float]:
         """
         Apply random CAPS based on persona excitement.
 
         Returns:
             (decorated_text, caps_ratio)
         """
+        rng = rng_manager.resolve(rng, seed)
+
         # High emoji users tend to use more caps
         caps_prob = persona.style.emoji_preference * 0.3
 
-        if rng_manager.random(seed=seed) > caps_prob:
+        if rng.random() > caps_prob:
             return text, 0.0
 
         words = text.split()
@@ -171,15 +207,22 @@ class StyleDecorator:
             if words[i].startswith("#") or words[i].startswith("http"):
                 continue
 
-            if rng_manager.random(seed=seed) < 0.3:  # 30% of words
+            if rng.random() < 0.3:  # 30% of words
                 words[i] = words[i].upper()
                 caps_count += 1
 
         caps_ratio = caps_count / len(words) if words else 0.0
         return " ".join(words), caps_ratio
 
-    def apply_punctuation_quirks(self, text: str, persona: Persona, seed: int | None = None) -> str:
+    def apply_punctuation_quirks(
+        self,
+        text: str,
+        persona: Persona,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> str:
         """Apply persona-specific punctuation quirks."""
+        rng = rng_manager.resolve(rng, seed)
         quirks = persona.style.punctuation_quirks
 
         if not quirks:
@@ -187,7 +230,7 @@ class StyleDecorator:
 
         # Apply quirks (e.g., "..." or "!!" or "?!")
         for quirk in quirks:
-            if rng_manager.random(seed=seed) < 0.4:  # 40% chance
+            if rng.random() < 0.4:  # 40% chance
                 text = text + quirk
 
         return text
@@ -201,15 +244,11 @@ class StyleDecorator:
         if persona.toxicity > 0.7:
             return text  # Allow everything
 
-        # Simple blocklist
-        blocklist = ["fuck", "shit", "damn", "ass", "bitch"]
-        pattern = re.compile(r"\b(" + "|".join(blocklist) + r")\b", re.IGNORECASE)
-
         def mask(match):
             word = match.group(0)
             return word[0] + "*" * (len(word) - 1)
 
-        return pattern.sub(mask, text)
+        return PROFANITY_PATTERN.sub(mask, text)
 
     def decorate(
         self,
@@ -217,6 +256,7 @@ class StyleDecorator:
         persona: Persona,
         topics: list[str],
         seed: int | None = None,
+        rng: np.random.Generator | None = None,
     ) -> tuple[str, StyleMetrics]:
         """
         Apply all decorations to text.
@@ -224,15 +264,18 @@ class StyleDecorator:
         Returns:
             (decorated_text, style_metrics)
         """
+        rng = rng_manager.resolve(rng, seed)
+
         # Apply decorations in sequence
-        text, emoji_count = self.add_emojis(text, persona, seed=seed)
-        text, hashtag_count = self.add_hashtags(text, persona, topics, seed=seed)
-        text, link_count = self.add_links(text, persona, seed=seed)
-        text, caps_ratio = self.apply_caps(text, persona, seed=seed)
-        text = self.apply_punctuation_quirks(text, persona, seed=seed)
+        text, emoji_count = self.add_emojis(text, persona, rng=rng)
+        text, hashtag_count = self.add_hashtags(text, persona, topics, rng=rng)
+        text, link_count = self.add_links(text, persona, rng=rng)
+        text, caps_ratio = self.apply_caps(text, persona, rng=rng)
+        text = self.apply_punctuation_quirks(text, persona, rng=rng)
         text = self.sanitize_toxicity(text, persona)
 
-        metrics = StyleMetrics(
+        metrics = trusted(
+            StyleMetrics,
             emojis=emoji_count,
             hashtags=hashtag_count,
             links=link_count,
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""Time-ordered post IDs."""
+
+import threading
+import time
+
+from ulid import ULID
+
+
+class PostIdFactory:
+    """
+    Monotonic ULIDs.
+
+    A plain ULID only orders by millisecond; within one millisecond the
+    random part is unordered. Here an ID minted in the same (or an earlier)
+    millisecond as the previous one is the previous ID plus one, so IDs
+    from this process sort in creation order, which the store's cursor
+    pagination relies on.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = 0
+
+    def new_id(self) -> str:
+        """Mint the next post ID."""
+        candidate = int(ULID.from_timestamp(time.time()))
+        with self._lock:
+            self._last = max(candidate, self._last + 1)
+            return str(ULID.from_int(self._last))
+
+
+# Global post ID factory instance
+post_ids = PostIdFactory()
@@ -2,9 +2,12 @@
 """Persona factory and registry with seed personas."""
 
 import uuid
+from array import array
 from typing import Any
 
+import numpy as np
 from faker import Faker
+from scipy import sparse
 
 from app.schemas import (
     CreatePersonaRequest,
@@ -12,8 +15,13 @@ from app.schemas import (
     PersonaBehavior,
     PersonaStances,
     PersonaStyle,
+    Post,
 )
 from app.services.rng import rng_manager
+from app.services.sampling import AliasTable
+from app.services.social import FollowerGraph
+from app.services.topics import topic_graph
+from app.store.memory import memory_store
 
 fake = Faker()
 
@@ -247,20 +255,157 @@ def _generate_additional_personas(count: int = 80) -> list[dict[str, Any]]:
     return personas
 
 
+STYLE_COLUMNS = (
+    "emoji_preference",
+    "link_propensity",
+    "hashtag_propensity",
+    "reading_level",
+    "cynicism",
+    "hot_take_factor",
+)
+BEHAVIOR_COLUMNS = (
+    "posting_rate_per_hour",
+    "burstiness",
+    "reply_propensity",
+    "quote_propensity",
+)
+STANCE_KEYS = tuple(PersonaStances.model_fields)
+
+
+class PersonaTable:
+    """
+    Struct-of-arrays view of registered personas.
+
+    Each numeric persona field is a float32 column indexed by row, stances
+    are an (N, len(STANCE_KEYS)) matrix and interests are a sparse
+    persona x topic matrix. Columns grow by doubling, so appends are
+    amortised O(1) and reads are views over the first len(self) rows.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.ids: list[str] = []
+        self.row_of: dict[str, int] = {}
+        self.topic_ids: list[str] = []
+        self.topic_column: dict[str, int] = {}
+
+        self._columns = {
+            name: np.zeros(capacity, dtype=np.float32)
+            for name in (*STYLE_COLUMNS, *BEHAVIOR_COLUMNS, "toxicity", "influence_score")
+        }
+        self._stances = np.zeros((capacity, len(STANCE_KEYS)), dtype=np.float32)
+
+        # Interests are appended as COO triples and compiled to CSR on read
+        self._interest_rows = array("i")
+        self._interest_cols = array("i")
+        self._interest_vals = array("f")
+        self._interests: sparse.csr_matrix | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _grow(self) -> None:
+        """Double the capacity of every column."""
+        for name, column in self._columns.items():
+            grown = np.zeros(len(column) * 2, dtype=column.dtype)
+            grown[: len(column)] = column
+            self._columns[name] = grown
+
+        stances = np.zeros((len(self._stances) * 2, len(STANCE_KEYS)), dtype=np.float32)
+        stances[: len(self._stances)] = self._stances
+        self._stances = stances
+
+    def add(self, persona: Persona) -> int:
+        """Append a persona and return its row."""
+        row = len(self.ids)
+        if row == len(self._stances):
+            self._grow()
+
+        for name in STYLE_COLUMNS:
+            self._columns[name][row] = getattr(persona.style, name)
+        for name in BEHAVIOR_COLUMNS:
+            self._columns[name][row] = getattr(persona.behavior, name)
+        self._columns["toxicity"][row] = persona.toxicity
+        self._columns["influence_score"][row] = persona.influence_score
+        self._stances[row] = [getattr(persona.stances, key) for key in STANCE_KEYS]
+
+        for topic_id, weight in persona.interests.items():
+            col = self.topic_column.get(topic_id)
+            if col is None:
+                col = self.topic_column[topic_id] = len(self.topic_ids)
+                self.topic_ids.append(topic_id)
+            self._interest_rows.append(row)
+            self._interest_cols.append(col)
+            self._interest_vals.append(weight)
+        self._interests = None
+
+        self.ids.append(persona.id)
+        self.row_of[persona.id] = row
+        return row
+
+    def column(self, name: str) -> np.ndarray:
+        """Get a style, behavior, toxicity or influence_score column."""
+        return self._columns[name][: len(self.ids)]
+
+    @property
+    def stances(self) -> np.ndarray:
+        """Stance matrix with columns in STANCE_KEYS order."""
+        return self._stances[: len(self.ids)]
+
+    @property
+    def interests(self) -> sparse.csr_matrix:
+        """Persona x topic interest matrix with columns in topic_ids order."""
+        if self._interests is None:
+            self._interests = sparse.csr_matrix(
+                (
+                    np.frombuffer(self._interest_vals, dtype=np.float32),
+                    (
+                        np.frombuffer(self._interest_rows, dtype=np.int32),
+                        np.frombuffer(self._interest_cols, dtype=np.int32),
+                    ),
+                ),
+                shape=(len(self.ids), len(self.topic_ids)),
+            )
+        return self._interests
+
+    def interest_matrix(self, rows: np.ndarray, topic_ids: list[str]) -> np.ndarray:
+        """Dense interests for the given rows over an arbitrary topic list."""
+        cols = np.array([self.topic_column.get(t, -1) for t in topic_ids], dtype=np.int64)
+        known = cols >= 0
+
+        dense = np.zeros((len(rows), len(topic_ids)))
+        if known.any() and len(rows):
+            dense[:, known] = self.interests[rows][:, cols[known]].toarray()
+        return dense
+
+    def eligible(self, toxicity_max: float = 1.0) -> np.ndarray:
+        """Rows whose base toxicity is at most toxicity_max."""
+        return np.flatnonzero(self.column("toxicity") <= toxicity_max)
+
+
 class PersonaRegistry:
     """Registry for managing personas."""
 
     def __init__(self):
         self._personas: dict[str, Persona] = {}
+        self.table = PersonaTable()
+        self._language_tables: dict[str, AliasTable] = {}
         self._initialize_seed_personas()
+        # Personas created later follow nobody and have no followers
+        self.followers = FollowerGraph.generate(
+            self.table.column("influence_score"), len(topic_graph.topic_ids)
+        )
 
     def _initialize_seed_personas(self) -> None:
         """Initialize with seed personas."""
         all_seed_data = SEED_PERSONAS_DATA + _generate_additional_personas(80)
 
         for data in all_seed_data:
-            persona = self._create_persona_from_data(data)
-            self._personas[persona.id] = persona
+            self._register(self._create_persona_from_data(data))
+
+    def _register(self, persona: Persona) -> None:
+        """Add a persona to the lookup dict and the columnar table."""
+        self._personas[persona.id] = persona
+        self.table.add(persona)
 
     def _create_persona_from_data(self, data: dict[str, Any]) -> Persona:
         """Create a Persona from seed data dict."""
@@ -307,6 +452,36 @@ class PersonaRegistry:
         """Get all personas."""
         return list(self._personas.values())
 
+    def language_table(self, persona: Persona) -> AliasTable:
+        """Alias table over a persona's language distribution (built on first use)."""
+        table = self._language_tables.get(persona.id)
+        if table is None:
+            table = AliasTable.from_dict(persona.behavior.language_distribution)
+            self._language_tables[persona.id] = table
+        return table
+
+    def record_post(self, post: Post) -> None:
+        """Push a stored post into the feeds of its author's followers."""
+        row = self.table.row_of.get(post.persona_id)
+        if row is None:
+            return
+        index = topic_graph.topic_index
+        columns = [index[topic] for topic in post.topics if topic in index]
+        self.followers.observe(row, columns, post.created_at.timestamp())
+
+    def peer_influence(self, rows: Any) -> np.ndarray:
+        """Peer influence per topic (topic_ids order) from each persona's feed."""
+        return self.followers.peer_influence(rows)
+
+    def get_personas_at(self, rows: Any) -> list[Persona]:
+        """Get personas by table row."""
+        ids = self.table.ids
+        return [self._personas[ids[row]] for row in rows]
+
+    def list_personas(self, limit: int = 100, offset: int = 0) -> list[Persona]:
+        """Get a page of personas in registration order."""
+        return [self._personas[pid] for pid in self.table.ids[offset : offset + limit]]
+
     def create_persona(self, request: CreatePersonaRequest) -> Persona:
         """Create a new custom persona."""
         persona_id = str(uuid.uuid4())
@@ -328,18 +503,23 @@ class PersonaRegistry:
             influence_score=0.3,  # new personas start with low influence
         )
 
-        self._personas[persona_id] = persona
+        self._register(persona)
         return persona
 
-    def get_random_personas(self, count: int, seed: int | None = None) -> list[Persona]:
+    def get_random_personas(
+        self,
+        count: int,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> list[Persona]:
         """Get random personas."""
-        personas = self.get_all_personas()
-        if count >= len(personas):
-            return personas
+        if count >= len(self.table):
+            return self.get_all_personas()
 
-        selected = rng_manager.choice(personas, size=count, seed=seed)
-        return selected.tolist() if hasattr(selected, 'tolist') else list(selected)
+        rng = rng_manager.resolve(rng, seed)
+        return self.get_personas_at(rng.integers(0, len(self.table), size=count))
 
 
 # Global persona registry
 persona_registry = PersonaRegistry()
+memory_store.subscribe(persona_registry.record_post)
@@ -14,6 +14,7 @@ class RNGManager:
         self._lock = threading.Lock()
         self._global_seed = default_seed
         self._global_rng = self._make_rng(default_seed)
+        self._global_seq = np.random.SeedSequence(default_seed)
 
     def _make_rng(self, seed: int | None) -> np.random.Generator:
         """Create a new RNG with PCG64 bit generator."""
@@ -24,6 +25,7 @@ class RNGManager:
         with self._lock:
             self._global_seed = seed
             self._global_rng = self._make_rng(seed)
+            self._global_seq = np.random.SeedSequence(seed)
 
     def get_global_seed(self) -> int | None:
         """Get the current global seed."""
@@ -42,6 +44,29 @@ class RNGManager:
         with self._lock:
             return self._global_rng
 
+    def stream(self, seed: int | None = None, index: int = 0) -> np.random.Generator:
+        """
+        Get a per-post RNG stream.
+
+        Seeded streams are keyed on (seed, index) through a SeedSequence, so each
+        post in a batch gets an independent but reproducible generator. Unseeded
+        streams are spawned from the global SeedSequence.
+        """
+        if seed is None:
+            with self._lock:
+                seq = self._global_seq.spawn(1)[0]
+        else:
+            seq = np.random.SeedSequence([seed, index])
+        return np.random.Generator(np.random.PCG64(seq))
+
+    def resolve(
+        self, rng: np.random.Generator | None = None, seed: int | None = None
+    ) -> np.random.Generator:
+        """Return rng if given, otherwise an RNG for seed (see get_rng)."""
+        if rng is not None:
+            return rng
+        return self.get_rng(seed)
+
     def choice(
         self,
         arr: list[Any] | np.ndarray,
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""Weighted sampling primitives (Gumbel top-k and alias tables)."""
+
+from typing import Any
+
+import numpy as np
+
+
+def gumbel_top_k(
+    weights: np.ndarray,
+    k: int,
+    rng: np.random.Generator,
+    out: np.ndarray | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted sampling without replacement along the last axis.
+
+    Uses the exponential-race form of the Gumbel top-k trick: with
+    E ~ Exp(1), the k smallest E / w are a weighted sample without
+    replacement, in draw order. One exponential per weight, no normalization.
+
+    Args:
+        weights: non-negative weights, shape (..., n)
+        k: number of items per row
+        rng: RNG stream
+        out: optional preallocated float64 buffer of the same shape for the keys
+
+    Returns:
+        (indices, valid), both shape (..., min(k, n)). Zero-weight items are
+        never chosen; slots that would need one are marked invalid.
+    """
+    n = weights.shape[-1]
+    k = min(k, n)
+    keys = rng.standard_exponential(weights.shape, out=out)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(keys, weights, out=keys)
+
+    if k < n:
+        top = np.argpartition(keys, k - 1, axis=-1)[..., :k]
+    else:
+        top = np.broadcast_to(np.arange(n), weights.shape)
+    top_keys = np.take_along_axis(keys, top, axis=-1)
+    order = np.argsort(top_keys, axis=-1)
+
+    top = np.take_along_axis(top, order, axis=-1)
+    valid = np.isfinite(np.take_along_axis(top_keys, order, axis=-1))
+    return top, valid
+
+
+def build_alias(weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Vose alias table for one row of weights (alias indices are row-local)."""
+    n = len(weights)
+    scaled = weights * (n / weights.sum())
+    prob = np.ones(n)
+    alias = np.arange(n)
+
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        s = small.pop()
+        g = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = g
+        scaled[g] -= 1.0 - scaled[s]
+        (small if scaled[g] < 1.0 else large).append(g)
+
+    return prob, alias
+
+
+class AliasTable:
+    """
+    O(1) with-replacement sampling from a fixed discrete distribution.
+
+    Built once in O(n); each draw then costs a single uniform.
+    """
+
+    __slots__ = ("labels", "prob", "alias")
+
+    def __init__(self, weights: np.ndarray, labels: list[Any] | None = None):
+        self.labels = labels
+        self.prob, self.alias = build_alias(np.asarray(weights, dtype=np.float64))
+
+    @classmethod
+    def from_dict(cls, weights: dict[Any, float]) -> "AliasTable":
+        """Build a table over the keys of a label -> weight dict."""
+        return cls(np.fromiter(weights.values(), dtype=np.float64), list(weights))
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def sample(self, rng: np.random.Generator, size: int | None = None) -> Any:
+        """Draw one index (or an array of size indices)."""
+        n = len(self.prob)
+        if size is None:
+            x = rng.random() * n
+            column = min(int(x), n - 1)
+            return column if x - column < self.prob[column] else int(self.alias[column])
+
+        u = rng.random(size) * n
+        columns = np.minimum(u.astype(np.int64), n - 1)
+        return np.where((u - columns) < self.prob[columns], columns, self.alias[columns])
+
+    def sample_label(self, rng: np.random.Generator) -> Any:
+        """
+        Draw one label.
+
+        Raises:
+            ValueError: if the table was built without labels
+        """
+        if self.labels is None:
+            raise ValueError("AliasTable has no labels; use sample() for indices")
+        return self.labels[self.sample(rng)]
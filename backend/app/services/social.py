@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""Persona follower graph and feed exposure."""
+
+import time
+
+import numpy as np
+from scipy import sparse
+
+from app.services.rng import rng_manager
+from app.services.sampling import AliasTable
+
+
+FOLLOW_MEAN_DEGREE = 20  # accounts followed per persona, on average
+FOLLOW_ZIPF_EXPONENT = 0.7  # popularity falls off as rank ** -exponent (in-degree tail ~2.4)
+EXPOSURE_HALF_LIFE_S = 3600.0  # how long a post in the feed keeps influencing followers
+EXPOSURE_SATURATION = 5.0  # decayed posts on a topic at which peer influence is ~63% of max
+PEER_INFLUENCE_MAX = 0.3
+# Accounts with more followers than this are pulled by readers instead of pushed to feeds
+FANOUT_LIMIT = 10000
+
+# Edges drawn per chunk while generating, to bound temporary memory
+_GENERATE_CHUNK = 1 << 23
+# Exposure is stored scaled up by exp(rate * (t - origin)); rebase before it overflows float32
+_MAX_LOG_SCALE = 30.0
+
+
+class FollowerGraph:
+    """
+    Who follows whom, plus each persona's decayed per-topic feed exposure.
+
+    The graph is a CSR matrix indexed by table row with one row per
+    followee listing its followers, so a new post is pushed to the
+    author's followers with a single slice. Exposure is a dense
+    (personas, topics) float32 matrix: a post adds 1 to the exposure of
+    each follower for each of its topics, decaying with
+    EXPOSURE_HALF_LIFE_S. Instead of decaying every row, new posts are
+    added scaled up by exp(rate * (t - origin)) and reads scale back down,
+    so both pushes and reads touch only the rows involved.
+
+    Decay runs on the posts' own clock: origin is the first observed post
+    time and reads default to the newest one, so simulated timestamps
+    (hurlgen --start) decay exactly like live ones.
+
+    Posts by accounts with more than FANOUT_LIMIT followers are not pushed
+    (one hub post would touch most of the matrix). They accumulate in a
+    small per-account activity matrix instead, and readers add in the
+    activity of the hubs they follow.
+    """
+
+    def __init__(
+        self,
+        followers: sparse.csr_matrix,
+        num_topics: int,
+        half_life_s: float = EXPOSURE_HALF_LIFE_S,
+    ):
+        self.followers = followers
+        self.num_personas = followers.shape[0]
+        self.rate = np.log(2.0) / half_life_s
+        self._exposure = np.zeros((self.num_personas, num_topics), dtype=np.float32)
+        self._origin: float | None = None  # time of the first observed post
+        self._latest = 0.0  # time of the newest observed post
+
+        # Hubs: activity per hub, and which hubs each persona follows
+        in_degree = np.diff(followers.indptr)
+        self.hubs = np.flatnonzero(in_degree > FANOUT_LIMIT)
+        self._hub_of = np.full(self.num_personas, -1, dtype=np.int32)
+        self._hub_of[self.hubs] = np.arange(len(self.hubs))
+        self._hub_activity = np.zeros((len(self.hubs), num_topics))
+        self._follows_hub = followers[self.hubs].T.tocsr()
+
+    @classmethod
+    def generate(
+        cls,
+        popularity: np.ndarray,
+        num_topics: int,
+        mean_degree: float = FOLLOW_MEAN_DEGREE,
+        exponent: float = FOLLOW_ZIPF_EXPONENT,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> "FollowerGraph":
+        """
+        Generate a power-law follower graph.
+
+        Out-degrees are lognormal around mean_degree; each follow picks its
+        target with probability proportional to rank ** -exponent, ranking
+        personas by popularity, so in-degrees follow a power law with the
+        most popular personas as hubs. Self-follows and repeats are dropped.
+
+        Args:
+            popularity: per-persona popularity (e.g. influence score), by table row
+            num_topics: width of the exposure vectors
+            mean_degree: average number of accounts followed
+            exponent: Zipf exponent of the in-degree distribution
+            seed: random seed
+            rng: RNG stream (overrides seed)
+
+        Returns:
+            FollowerGraph over len(popularity) personas
+        """
+        rng = rng_manager.resolve(rng, seed)
+        n = len(popularity)
+        if n < 2:
+            return cls(sparse.csr_matrix((n, n), dtype=np.int8), num_topics)
+
+        ranks = np.empty(n)
+        ranks[np.argsort(-np.asarray(popularity), kind="stable")] = np.arange(1, n + 1)
+        targets = AliasTable(ranks**-exponent)
+
+        mean_degree = min(mean_degree, n - 1)
+        out_degree = rng.lognormal(np.log(mean_degree) - 0.5, 1.0, size=n)
+        out_degree = np.clip(np.rint(out_degree), 1, n - 1).astype(np.int64)
+
+        follower_rows, followee_rows = [], []
+        edges = np.cumsum(out_degree)
+        start = 0
+        while start < n:
+            # Whole personas per chunk, about _GENERATE_CHUNK edges each
+            limit = (edges[start - 1] if start else 0) + _GENERATE_CHUNK
+            end = max(int(np.searchsorted(edges, limit, side="right")), start + 1)
+            follower = np.repeat(np.arange(start, end, dtype=np.int32), out_degree[start:end])
+            followee = targets.sample(rng, size=len(follower)).astype(np.int32)
+            keep = follower != followee
+            follower_rows.append(follower[keep])
+            followee_rows.append(followee[keep])
+            start = end
+
+        follower = np.concatenate(follower_rows)
+        followee = np.concatenate(followee_rows)
+        del follower_rows, followee_rows
+        followers = sparse.csr_matrix(
+            (np.ones(len(follower), dtype=np.int8), (followee, follower)), shape=(n, n)
+        )
+        followers.sum_duplicates()
+        followers.data[:] = 1
+        return cls(followers, num_topics)
+
+    def followers_of(self, row: int) -> np.ndarray:
+        """Table rows of a persona's followers."""
+        if row >= self.num_personas:
+            return np.zeros(0, dtype=self.followers.indices.dtype)
+        indptr = self.followers.indptr
+        return self.followers.indices[indptr[row] : indptr[row + 1]]
+
+    def _scale(self, at: float) -> float:
+        """Storage scale for a timestamp, rebasing the exposure matrix if needed."""
+        if self._origin is None:
+            self._origin = self._latest = at
+        self._latest = max(self._latest, at)
+        log_scale = self.rate * (at - self._origin)
+        if log_scale > _MAX_LOG_SCALE:
+            self._exposure *= np.float32(np.exp(-log_scale))
+            self._hub_activity *= np.exp(-log_scale)
+            self._origin = at
+            log_scale = 0.0
+        return float(np.exp(log_scale))
+
+    def observe(self, author_row: int, topic_columns: list[int], at: float | None = None) -> None:
+        """
+        Push a new post into the feeds of the author's followers.
+
+        Args:
+            author_row: table row of the author
+            topic_columns: topic indices (topic_graph.topic_ids order) of the post
+            at: post time (defaults to now)
+        """
+        followers = self.followers_of(author_row)
+        if not len(followers) or not topic_columns:
+            return
+
+        scale = self._scale(time.time() if at is None else at)
+        hub = self._hub_of[author_row]
+        if hub >= 0:
+            self._hub_activity[hub, topic_columns] += scale
+            return
+        for column in topic_columns:
+            self._exposure[followers, column] += np.float32(scale)
+
+    def exposure(self, rows: np.ndarray | int, at: float | None = None) -> np.ndarray:
+        """
+        Decayed per-topic exposure of personas to their feeds.
+
+        Args:
+            rows: table row or rows (rows past the graph, e.g. personas created
+                later, follow nobody and get zeros)
+            at: time to decay to (defaults to the newest observed post)
+
+        Returns:
+            float64 array of shape (num_topics,) or (len(rows), num_topics)
+        """
+        rows = np.asarray(rows)
+        if rows.ndim == 0:
+            return self.exposure(rows[None], at)[0]
+
+        exposure = np.zeros((len(rows), self._exposure.shape[1]))
+        if self._origin is None:
+            return exposure
+        in_graph = np.flatnonzero(rows < self.num_personas)
+        graph_rows = rows[in_graph]
+        exposure[in_graph] = self._exposure[graph_rows]
+        if len(self.hubs) and len(graph_rows) == 1:
+            indptr = self._follows_hub.indptr
+            row = graph_rows[0]
+            hubs = self._follows_hub.indices[indptr[row] : indptr[row + 1]]
+            exposure[in_graph[0]] += self._hub_activity[hubs].sum(axis=0)
+        elif len(self.hubs):
+            exposure[in_graph] += self._follows_hub[graph_rows] @ self._hub_activity
+        age = (self._latest if at is None else at) - self._origin
+        exposure *= np.exp(-self.rate * age)
+        return exposure
+
+    def peer_influence(self, rows: np.ndarray | int, at: float | None = None) -> np.ndarray:
+        """
+        Peer influence (0 to PEER_INFLUENCE_MAX) per topic from feed exposure.
+
+        Saturates as exposure grows, so a handful of recent posts on a topic
+        from followed accounts has most of the effect.
+        """
+        exposure = self.exposure(rows, at)
+        return PEER_INFLUENCE_MAX * -np.expm1(-exposure / EXPOSURE_SATURATION)
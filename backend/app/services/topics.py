@@ -1,14 +1,31 @@
 #!/usr/bin/env python
 """Topic graph and management."""
 
+import sys
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
 
 import networkx as nx
+import numpy as np
+import orjson
+from prometheus_client import Histogram
+from scipy import sparse
 
+from app.config import settings
 from app.schemas import Topic
+from app.services.trend_state import TrendState
 
 
+trend_advance_duration = Histogram(
+    "hurl_trend_advance_seconds",
+    "Time to advance trend state and swap in the new snapshot",
+)
+trend_swap_lag = Histogram(
+    "hurl_trend_swap_lag_seconds",
+    "Time from a reader finding trend state stale to the fresh snapshot being swapped in",
+)
+
 # Seed topics covering diverse domains
 SEED_TOPICS = [
     # Tech
@@ -100,156 +117,549 @@ TOPIC_EDGES = [
 ]
 
 
-class TopicGraph:
-    """Topic graph with trend dynamics."""
+# Trend score every topic starts at and decays back towards
+BASELINE_SCORE = 0.1
+MAX_SCORE = 10.0
+
+# Interval the per-step trend coefficients are expressed over
+REFERENCE_TICK_S = 5.0
+
+# Relative weight below which the state at the start of an advance is ignored
+HORIZON_TOLERANCE = 1e-10
+
+# Largest 1-norm of a single Taylor step in expm_action
+_TAYLOR_STEP_NORM = 4.0
+
+
+def expm_action(matrix: sparse.csr_matrix, vector: np.ndarray, t: float) -> np.ndarray:
+    """
+    Compute exp(t * matrix) @ vector with scaled Taylor steps.
+
+    The mean diagonal is shifted out and the step count comes from the exact
+    1-norm, which is cheap for a CSR matrix; scipy's expm_multiply spends
+    most of its time estimating norms of matrix powers instead.
+    """
+    n = matrix.shape[0]
+    shift = matrix.diagonal().sum() / n
+    shifted = (matrix - shift * sparse.identity(n, format="csr")).tocsr()
+    norm = t * abs(shifted).sum(axis=0).max() if n else 0.0
+    steps = max(1, int(np.ceil(norm / _TAYLOR_STEP_NORM)))
+    h = t / steps
+    tolerance = np.finfo(np.float64).eps
+
+    for _ in range(steps):
+        term = vector
+        result = vector.copy()
+        for k in range(1, 100):
+            term = (h / k) * (shifted @ term)
+            result += term
+            if np.abs(term).max() <= tolerance * np.abs(result).max():
+                break
+        vector = np.exp(shift * h) * result
+    return vector
+
+
+class TopicSnapshot:
+    """
+    Immutable, versioned view of the topic graph for readers.
+
+    The static parts (interned names, tags, related topics) are shared by
+    every snapshot; only the read-only score and velocity vectors change per
+    version, and both always come from the same advance.
+    Derived forms (Topic models, the /v1/topics JSON body) are built on first
+    use and then reused for the lifetime of the version.
+    """
+
+    __slots__ = (
+        "version",
+        "topic_ids",
+        "index",
+        "names",
+        "tags",
+        "related",
+        "scores",
+        "velocities",
+        "_topics",
+        "_list_json",
+    )
+
+    def __init__(
+        self,
+        version: int,
+        topic_ids: tuple[str, ...],
+        index: dict[str, int],
+        names: tuple[str, ...],
+        tags: tuple[tuple[str, ...], ...],
+        related: tuple[tuple[str, ...], ...],
+        scores: np.ndarray,
+        velocities: np.ndarray,
+    ):
+        self.version = version
+        self.topic_ids = topic_ids
+        self.index = index
+        self.names = names
+        self.tags = tags
+        self.related = related
+        self.scores = scores.view()
+        self.scores.flags.writeable = False
+        self.velocities = velocities.view()
+        self.velocities.flags.writeable = False
+        self._topics: list[Topic] | None = None
+        self._list_json: bytes | None = None
+
+    def name(self, topic_id: str) -> str:
+        """Display name for a topic (the ID itself if unknown)."""
+        index = self.index.get(topic_id)
+        return self.names[index] if index is not None else topic_id
+
+    def topic(self, topic_id: str) -> Topic | None:
+        """Get a topic by ID."""
+        index = self.index.get(topic_id)
+        if index is None:
+            return None
+        return self.topics()[index]
+
+    def topics(self) -> list[Topic]:
+        """All topics in topic_ids order."""
+        if self._topics is None:
+            self._topics = [
+                Topic.model_construct(
+                    id=topic_id,
+                    name=name,
+                    tags=list(tags),
+                    related=list(related),
+                    trend_score=score,
+                )
+                for topic_id, name, tags, related, score in zip(
+                    self.topic_ids, self.names, self.tags, self.related, self.scores.tolist()
+                )
+            ]
+        return self._topics
+
+    def list_json(self) -> bytes:
+        """Serialized TopicListResponse body."""
+        if self._list_json is None:
+            self._list_json = orjson.dumps(
+                {
+                    "topics": [topic.model_dump() for topic in self.topics()],
+                    "count": len(self.topic_ids),
+                }
+            )
+        return self._list_json
+
 
-    def __init__(self):
+class TopicGraph:
+    """
+    Topic graph with trend dynamics.
+
+    networkx holds the graph for building and admin queries; trend state
+    lives in NumPy arrays in topic_ids order, and in-edges are a CSR matrix.
+
+    Trends evolve in continuous time. Per REFERENCE_TICK_S the score vector s
+    moves by the classic update
+
+        s' = d * (alpha * s + beta * W s + shocks) + (1 - d) * baseline
+
+    (d = recency_decay, W = mean in-edge weights), read as the linear ODE
+
+        ds/dt = ((d * (alpha * I + beta * W) - I) s + d * shocks + (1 - d) * baseline) / tau
+
+    with each shock decaying exponentially by its half-life. State is only
+    advanced when read and at least resolution_s old, in one closed-form
+    step (expm_action on the augmented system) over the real elapsed time,
+    so an idle server does no work and the dynamics do not depend on how
+    often anyone reads.
+
+    Reads never wait for an advance: a stale read schedules one on a worker
+    thread and keeps serving the current snapshot. The worker computes fresh
+    arrays off to the side and publishes them with a single swap, so readers
+    see either the old or the new state, never a mix.
+
+    Scores, velocities, shocks and the clock live in a TrendState. With
+    shm_name it is shared memory, so every worker process serves the same
+    trends; whichever process first finds state stale and wins the writer
+    lock advances it, and the others pick the result up on their next read.
+    """
+
+    def __init__(
+        self,
+        topics: list[dict[str, Any]] | None = None,
+        edges: list[tuple[str, str, float]] | None = None,
+        alpha: float = 0.2,
+        beta: float = 0.3,
+        recency_decay: float = 0.95,
+        shm_name: str | None = None,
+    ):
         self.graph = nx.DiGraph()
-        self._trend_scores: dict[str, float] = {}
-        self._velocities: dict[str, float] = {}
-        self._shocks: list[dict[str, Any]] = []  # active shocks
-        self._last_tick = time.time()
+        self.topic_ids: list[str] = []  # node order, shared by every topic vector
+        self.topic_index: dict[str, int] = {}
+        self.alpha = alpha  # self weight per reference tick
+        self.beta = beta  # neighbor weight per reference tick
+        self.recency_decay = recency_decay  # pull toward baseline per reference tick
+        self.resolution_s = settings.trend_tick_interval  # max age of state served to readers
+        self._neighbor_weights = sparse.csr_matrix((0, 0))
+        self._dynamics: tuple | None = None  # cached (coefficients, generator terms, horizon)
+        self._snapshot: TopicSnapshot | None = None
+        self._snapshot_sequence = -1  # TrendState sequence the snapshot was read at
+        self._executor: ThreadPoolExecutor | None = None  # started by the first stale read
+        self._pending: Future | None = None
 
         # Build initial graph
-        self._initialize_graph()
-
-    def _initialize_graph(self) -> None:
+        self._initialize_graph(
+            SEED_TOPICS if topics is None else topics,
+            TOPIC_EDGES if edges is None else edges,
+        )
+        self._trend_state = self._attach_state(shm_name)  # scores, velocities, shocks and clock
+        self._sync_snapshot()
+
+    def _initialize_graph(
+        self,
+        topics: list[dict[str, Any]],
+        edges: list[tuple[str, str, float]],
+    ) -> None:
         """Initialize graph with seed topics and edges."""
-        for topic_data in SEED_TOPICS:
+        for topic_data in topics:
             self.graph.add_node(
                 topic_data["id"],
                 name=topic_data["name"],
                 tags=topic_data["tags"],
             )
-            self._trend_scores[topic_data["id"]] = 0.1  # baseline
+            self.topic_index[topic_data["id"]] = len(self.topic_ids)
+            self.topic_ids.append(topic_data["id"])
 
-        for source, target, weight in TOPIC_EDGES:
+        for source, target, weight in edges:
             if source in self.graph and target in self.graph:
                 self.graph.add_edge(source, target, weight=weight)
 
-    def get_topic(self, topic_id: str) -> Topic | None:
-        """Get a topic by ID."""
-        if topic_id not in self.graph:
-            return None
-
-        node_data = self.graph.nodes[topic_id]
-        related = [
-            edge[1] for edge in self.graph.out_edges(topic_id)
-        ]
+        self._neighbor_weights = self._build_neighbor_weights()
+
+    @property
+    def _state(self) -> TrendState:
+        """Trend state, reattached if shutdown() detached it (e.g. a second app lifespan)."""
+        if self._trend_state.closed:
+            self._trend_state = self._attach_state(self._trend_state.name)
+        return self._trend_state
+
+    def _attach_state(self, shm_name: str | None) -> TrendState:
+        """Create (or attach to the shared) trend state for the graph's topics."""
+        num_topics = len(self.topic_ids)
+        state = TrendState(num_topics, settings.trend_shock_capacity, shm_name)
+        with state.write_lock():
+            # The first process to attach seeds the shared state
+            if not state.initialized:
+                state.publish(
+                    np.full(num_topics, BASELINE_SCORE), np.zeros(num_topics), time.time()
+                )
+        return state
+
+    def _sync_snapshot(self) -> None:
+        """Replace the snapshot if trend state has been published since it was taken."""
+        if self._state.sequence == self._snapshot_sequence:
+            return
+        sequence, scores, velocities = self._state.read()
+        self._publish_snapshot(sequence // 2, scores, velocities)
+        self._snapshot_sequence = sequence
+
+    def _publish_snapshot(self, version: int, scores: np.ndarray, velocities: np.ndarray) -> None:
+        """Publish a new snapshot with the given scores."""
+        previous = self._snapshot
+        if previous is None:
+            nodes = self.graph.nodes
+            snapshot = TopicSnapshot(
+                version=version,
+                topic_ids=tuple(self.topic_ids),
+                index=dict(self.topic_index),
+                names=tuple(sys.intern(nodes[tid]["name"]) for tid in self.topic_ids),
+                tags=tuple(tuple(nodes[tid]["tags"]) for tid in self.topic_ids),
+                related=tuple(
+                    tuple(target for _, target in self.graph.out_edges(tid))
+                    for tid in self.topic_ids
+                ),
+                scores=scores,
+                velocities=velocities,
+            )
+        else:
+            snapshot = TopicSnapshot(
+                version,
+                previous.topic_ids,
+                previous.index,
+                previous.names,
+                previous.tags,
+                previous.related,
+                scores,
+                velocities,
+            )
+        self._snapshot = snapshot
+
+    def snapshot(self) -> TopicSnapshot:
+        """Current topic snapshot (swapped, never mutated, on each advance)."""
+        self.refresh()
+        self._sync_snapshot()
+        snapshot = self._snapshot
+        assert snapshot is not None  # taken in __init__
+        return snapshot
+
+    @property
+    def epoch(self) -> int:
+        """Bumped whenever trend state changes (advance or shock), in any process."""
+        return self._state.epoch
+
+    def _build_neighbor_weights(self) -> sparse.csr_matrix:
+        """
+        Row-normalized in-edge matrix: W[target, source] = weight / in_degree.
 
-        return Topic(
-            id=topic_id,
-            name=node_data["name"],
-            tags=node_data["tags"],
-            related=related,
-            trend_score=self._trend_scores.get(topic_id, 0.0),
+        W @ scores is then the mean weighted score over each topic's in-edges.
+        """
+        num_topics = len(self.topic_ids)
+        index = self.topic_index
+        sources = []
+        targets = []
+        weights = []
+        for source, target, edge_data in self.graph.edges(data=True):
+            sources.append(index[source])
+            targets.append(index[target])
+            weights.append(edge_data.get("weight", 0.5))
+
+        rows = np.array(targets, dtype=np.int64)
+        in_degree = np.bincount(rows, minlength=num_topics)
+        values = np.array(weights, dtype=np.float64) / np.maximum(in_degree[rows], 1)
+        return sparse.csr_matrix(
+            (values, (rows, np.array(sources, dtype=np.int64))),
+            shape=(num_topics, num_topics),
         )
 
+    def vector(self, weights: dict[str, float]) -> np.ndarray:
+        """Dense topic vector from a sparse topic_id -> weight dict (unknown ids ignored)."""
+        out = np.zeros(len(self.topic_ids))
+        for topic_id, weight in weights.items():
+            index = self.topic_index.get(topic_id)
+            if index is not None:
+                out[index] = weight
+        return out
+
+    def mask(self, topic_ids: list[str]) -> np.ndarray:
+        """Boolean topic vector that is True for the given topic IDs."""
+        out = np.zeros(len(self.topic_ids), dtype=bool)
+        for topic_id in topic_ids:
+            index = self.topic_index.get(topic_id)
+            if index is not None:
+                out[index] = True
+        return out
+
+    def get_topic(self, topic_id: str) -> Topic | None:
+        """Get a topic by ID."""
+        return self.snapshot().topic(topic_id)
+
     def get_all_topics(self) -> list[Topic]:
         """Get all topics."""
-        return [
-            self.get_topic(topic_id)
-            for topic_id in self.graph.nodes
-            if self.get_topic(topic_id) is not None
-        ]
+        return self.snapshot().topics()
 
     def inject_shock(self, topic_id: str, magnitude: float, half_life_s: float) -> bool:
         """Inject a trend shock."""
-        if topic_id not in self.graph:
-            return False
-
-        self._shocks.append(
-            {
-                "topic_id": topic_id,
-                "magnitude": magnitude,
-                "half_life_s": half_life_s,
-                "created_at": time.time(),
-            }
-        )
-        return True
+        return not self.inject_shocks([topic_id], [magnitude], [half_life_s])
 
-    def tick(self, alpha: float = 0.2, beta: float = 0.3, recency_decay: float = 0.95) -> None:
+    def inject_shocks(
+        self, topic_ids: list[str], magnitudes: list[float], half_lives_s: list[float]
+    ) -> list[str]:
         """
-        Update trend scores via dynamics.
+        Inject many trend shocks at once.
 
-        Simple model:
-        - Shocks add impulse
-        - Neighbor influence spreads through edges
-        - Recency decay pulls scores toward baseline
+        Nothing is injected if any topic is unknown.
+
+        Returns:
+            list of unknown topic IDs (empty on success)
+
+        Raises:
+            ValueError: if shared trend state has no room for the shocks
         """
-        now = time.time()
-        dt = now - self._last_tick
-        self._last_tick = now
-
-        # Apply shocks
-        shock_contributions: dict[str, float] = {}
-        for shock in self._shocks[:]:
-            age = now - shock["created_at"]
-            decay_factor = 0.5 ** (age / shock["half_life_s"])
-
-            if decay_factor < 0.01:
-                self._shocks.remove(shock)
-                continue
-
-            topic_id = shock["topic_id"]
-            shock_contributions[topic_id] = (
-                shock_contributions.get(topic_id, 0.0)
-                + shock["magnitude"] * decay_factor
+        missing = [tid for tid in topic_ids if tid not in self.topic_index]
+        if missing:
+            return missing
+
+        with self._state.write_lock():
+            # Bring state up to now so the new shocks only act from here on
+            now = self.now()
+            self._advance(now)
+            self._state.shocks.append(
+                np.array([self.topic_index[tid] for tid in topic_ids], dtype=np.int64),
+                np.asarray(magnitudes, dtype=np.float64),
+                np.asarray(half_lives_s, dtype=np.float64),
+                now,
             )
+            self._state.bump_epoch()
+        return []
+
+    def now(self) -> float:
+        """Simulation clock (wall clock plus any fast_forward)."""
+        return time.time() + self._state.time_offset
+
+    def refresh(self) -> None:
+        """Schedule a background advance if trend state is older than resolution_s."""
+        if self.now() - self._state.last_tick < self.resolution_s:
+            return
+        pending = self._pending
+        if pending is None or pending.done():
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="trend-advance"
+                )
+            self._pending = self._executor.submit(self._advance_stale, time.perf_counter())
+
+    def _advance_stale(self, requested_at: float) -> None:
+        """
+        Worker job: advance to now and record how long readers saw stale state.
 
-        # Update each topic
-        new_scores = {}
-        for topic_id in self.graph.nodes:
-            current = self._trend_scores.get(topic_id, 0.1)
-
-            # Shock contribution
-            shock_boost = shock_contributions.get(topic_id, 0.0)
-
-            # Neighbor influence
-            neighbor_influence = 0.0
-            in_edges = list(self.graph.in_edges(topic_id, data=True))
-            if in_edges:
-                for source, _, edge_data in in_edges:
-                    weight = edge_data.get("weight", 0.5)
-                    neighbor_score = self._trend_scores.get(source, 0.1)
-                    neighbor_influence += weight * neighbor_score
-                neighbor_influence /= len(in_edges)
-
-            # Combined update
-            new_score = (
-                alpha * current
-                + beta * neighbor_influence
-                + shock_boost
-            )
+        If another thread or process holds the writer lock it is already
+        advancing, so there is nothing to do here.
+        """
+        with self._state.write_lock(blocking=False) as acquired:
+            if acquired:
+                self._advance(self.now())
+                trend_swap_lag.observe(time.perf_counter() - requested_at)
+
+    def wait(self) -> None:
+        """Block until any scheduled background advance has been swapped in."""
+        pending = self._pending
+        if pending is not None:
+            pending.result()
+
+    def shutdown(self) -> None:
+        """
+        Stop the background advance worker and detach from trend state.
+
+        The graph stays usable: the next stale read starts a new worker and
+        the next use of trend state reattaches it.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pending = None
+        self._trend_state.close()
+
+    def tick(self) -> None:
+        """Advance trend state to now."""
+        self.advance()
+
+    def fast_forward(self, seconds: float) -> None:
+        """Jump the simulation clock forward (offline runs) and advance once."""
+        with self._state.write_lock():
+            self._state.time_offset += seconds
+            self._advance(self.now())
+
+    def _generator(self) -> tuple[sparse.coo_matrix, float, float, float]:
+        """
+        Continuous-time form of the per-tick update (cached per coefficient set).
 
-            # Recency decay toward baseline
-            baseline = 0.1
-            new_score = new_score * recency_decay + baseline * (1 - recency_decay)
+        Returns:
+            (K, shock gain, baseline inflow, horizon) with
+            ds/dt = K s + gain * shocks + inflow
+        """
+        coefficients = (self.alpha, self.beta, self.recency_decay)
+        if self._dynamics is None or self._dynamics[0] != coefficients:
+            generator, gain, inflow = self._build_generator()
+            self._dynamics = (coefficients, generator.tocoo(), gain, inflow, self._horizon_s())
+        return self._dynamics[1:]
+
+    def _build_generator(self) -> tuple[sparse.csr_matrix, float, float]:
+        """Build (K, shock gain, baseline inflow) from the current coefficients."""
+        tau = REFERENCE_TICK_S
+        d = self.recency_decay
+        identity = sparse.identity(len(self.topic_ids), format="csr")
+        generator = d * (self.alpha * identity + self.beta * self._neighbor_weights) - identity
+        return generator / tau, d / tau, (1 - d) * BASELINE_SCORE / tau
+
+    def _horizon_s(self) -> float:
+        """
+        Time after which the starting state's influence is below HORIZON_TOLERANCE.
 
-            new_scores[topic_id] = max(0.0, min(new_score, 10.0))  # clamp
+        Scores decay at least at rate (1 - d * (alpha + beta * |W|)) / tau, so
+        longer advances only need to integrate over this final window.
+        """
+        row_sums = np.asarray(abs(self._neighbor_weights).sum(axis=1)).ravel()
+        spread = row_sums.max() if len(row_sums) else 0.0
+        rate = (1 - self.recency_decay * (self.alpha + self.beta * spread)) / REFERENCE_TICK_S
+        if rate <= 0:
+            return np.inf
+        return float(-np.log(HORIZON_TOLERANCE) / rate)
+
+    def advance(self, now: float | None = None) -> None:
+        """
+        Integrate trend dynamics from the last advance to now in one step.
 
-        # Compute velocities
-        for topic_id, new_score in new_scores.items():
-            old_score = self._trend_scores.get(topic_id, 0.1)
-            self._velocities[topic_id] = (new_score - old_score) / max(dt, 0.1)
+        Shocks are folded in as exponentially decaying states, so the
+        augmented system [scores; shock amplitudes; 1] is linear with constant
+        coefficients and its solution is a single matrix exponential action.
+        The cost is bounded by the horizon however far the clock has moved.
+        """
+        with self._state.write_lock():
+            self._advance(self.now() if now is None else now)
+
+    def _advance(self, now: float) -> None:
+        """Advance to now and publish the new state (caller holds the writer lock)."""
+        state = self._state
+        shocks = state.shocks
+        elapsed = now - state.last_tick
+        if elapsed <= 0:
+            return
+        started = time.perf_counter()
+
+        # Anything older than the horizon has no measurable effect on the result
+        k, gain, inflow, horizon = self._generator()
+        start = max(state.last_tick, now - horizon)
+        shocks.expire(start)
+
+        num_topics = len(self.topic_ids)
+        num_shocks = len(shocks)
+        shock_states = num_topics + np.arange(num_shocks)
+        one = num_topics + num_shocks
+        # The constant state holds num_topics instead of 1 so its column (inflow
+        # into every topic) does not dominate the matrix norm
+        scale = max(num_topics, 1)
+        rows = np.concatenate(
+            [k.row, shocks.topic[:num_shocks], shock_states, np.arange(num_topics)]
+        )
+        cols = np.concatenate([k.col, shock_states, shock_states, np.full(num_topics, one)])
+        values = np.concatenate(
+            [
+                k.data,
+                np.full(num_shocks, gain),
+                -shocks.decay_rates(),
+                np.full(num_topics, inflow / scale),
+            ]
+        )
+        system = sparse.csr_matrix((values, (rows, cols)), shape=(one + 1, one + 1))
+        scores, _ = state.current()
+        vector = np.concatenate([scores, shocks.amplitudes(start), [scale]])
+
+        vector = expm_action(system, vector, now - start)
+        new_scores = np.clip(vector[:num_topics], 0.0, MAX_SCORE)
 
-        self._trend_scores = new_scores
+        # Instantaneous rate of change at now
+        velocities = k @ new_scores + gain * shocks.contributions(now, num_topics) + inflow
+        state.publish(new_scores, velocities, now)
+        shocks.expire(now)
+        trend_advance_duration.observe(time.perf_counter() - started)
 
     def get_trend_snapshot(self) -> list[dict[str, Any]]:
         """Get current trend scores and velocities."""
+        snapshot = self.snapshot()
         return [
-            {
-                "topic_id": topic_id,
-                "trend_score": self._trend_scores.get(topic_id, 0.0),
-                "velocity": self._velocities.get(topic_id, 0.0),
-            }
-            for topic_id in self.graph.nodes
+            {"topic_id": topic_id, "trend_score": score, "velocity": velocity}
+            for topic_id, score, velocity in zip(
+                snapshot.topic_ids, snapshot.scores.tolist(), snapshot.velocities.tolist()
+            )
         ]
 
     def get_trend_score(self, topic_id: str) -> float:
         """Get trend score for a topic."""
-        return self._trend_scores.get(topic_id, 0.0)
+        snapshot = self.snapshot()
+        index = snapshot.index.get(topic_id)
+        return float(snapshot.scores[index]) if index is not None else 0.0
+
+    def trend_vector(self) -> np.ndarray:
+        """Read-only trend scores in topic_ids order from the current snapshot."""
+        return self.snapshot().scores
 
 
 # Global topic graph instance
-topic_graph = TopicGraph()
+topic_graph = TopicGraph(shm_name=settings.trend_shm_name or None)
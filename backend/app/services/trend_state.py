@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+"""Trend state storage, optionally shared between worker processes."""
+
+import fcntl
+import os
+import tempfile
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+
+# Shocks whose decay factor drops below this no longer move scores measurably
+SHOCK_EXPIRY_FACTOR = 1e-9
+
+# Header slots (float64)
+_SEQ = 0  # seqlock counter: odd while a publish is in progress
+_ACTIVE = 1  # which score/velocity slot readers should use
+_LAST_TICK = 2
+_TIME_OFFSET = 3
+_EPOCH = 4
+_NUM_TOPICS = 5
+_SHOCK_CAPACITY = 6
+_MAGIC = 7
+_HEADER_SLOTS = 8
+_MAGIC_VALUE = 0x7E11D5  # marks an initialized segment
+
+
+def _tracker_name(shm: shared_memory.SharedMemory) -> str:
+    """Name the resource tracker knows a segment by (POSIX names carry a leading slash)."""
+    return f"/{shm.name}"
+
+
+class ShockTable:
+    """
+    Active shocks stored as array columns.
+
+    Rows are appended in bulk and expired rows are compacted away in one
+    pass, so an advance costs O(active shocks) NumPy work. A table over a
+    caller-supplied buffer (shared memory) has a fixed capacity; a table
+    that owns its storage grows by doubling.
+    """
+
+    NUM_COLUMNS = 4
+
+    capacity: int
+    topic: np.ndarray  # int64 topic index
+    magnitude: np.ndarray  # float64
+    half_life_s: np.ndarray  # float64
+    created_at: np.ndarray  # float64, seconds since the epoch
+    _size: np.ndarray  # int64[1] row count, stored in the buffer
+
+    def __init__(self, capacity: int = 64, buffer: memoryview | None = None):
+        self.growable = buffer is None
+        self._bind(capacity, bytearray(self.nbytes(capacity)) if buffer is None else buffer)
+
+    @classmethod
+    def nbytes(cls, capacity: int) -> int:
+        """Buffer size needed for a table of this capacity."""
+        return 8 * (1 + cls.NUM_COLUMNS * capacity)
+
+    def _bind(self, capacity: int, buffer: bytearray | memoryview) -> None:
+        """Point the size counter and columns at a buffer."""
+
+        def column(i: int, dtype: type) -> np.ndarray:
+            offset = 8 * (1 + i * capacity)
+            return np.ndarray((capacity,), dtype=dtype, buffer=buffer, offset=offset)
+
+        self.capacity = capacity
+        self._size = np.ndarray((1,), dtype=np.int64, buffer=buffer)
+        self.topic = column(0, np.int64)
+        self.magnitude = column(1, np.float64)
+        self.half_life_s = column(2, np.float64)
+        self.created_at = column(3, np.float64)
+
+    def columns(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Every column, full capacity."""
+        return self.topic, self.magnitude, self.half_life_s, self.created_at
+
+    @property
+    def size(self) -> int:
+        return int(self._size[0])
+
+    @size.setter
+    def size(self, value: int) -> None:
+        self._size[0] = value
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(
+        self,
+        topic: np.ndarray,
+        magnitude: np.ndarray,
+        half_life_s: np.ndarray,
+        created_at: float,
+    ) -> None:
+        """
+        Append a batch of shocks.
+
+        Raises:
+            ValueError: if a fixed-capacity table has no room for the batch
+        """
+        size = self.size
+        end = size + len(topic)
+        if end > self.capacity:
+            if not self.growable:
+                raise ValueError(f"Shock table is full ({self.capacity} active shocks)")
+            old = [column[:size].copy() for column in self.columns()]
+            capacity = max(end, 2 * self.capacity)
+            self._bind(capacity, bytearray(self.nbytes(capacity)))
+            for column, values in zip(self.columns(), old):
+                column[:size] = values
+            self.size = size
+
+        self.topic[size:end] = topic
+        self.magnitude[size:end] = magnitude
+        self.half_life_s[size:end] = half_life_s
+        self.created_at[size:end] = created_at
+        self.size = end
+
+    def amplitudes(self, at: float) -> np.ndarray:
+        """Decayed magnitude of every shock at a point in time."""
+        n = self.size
+        amplitudes: np.ndarray = self.magnitude[:n] * 0.5 ** (
+            (at - self.created_at[:n]) / self.half_life_s[:n]
+        )
+        return amplitudes
+
+    def decay_rates(self) -> np.ndarray:
+        """Exponential decay rate (1/s) of every shock."""
+        rates: np.ndarray = np.log(2.0) / self.half_life_s[: self.size]
+        return rates
+
+    def expire(self, at: float) -> None:
+        """Drop shocks that have decayed below SHOCK_EXPIRY_FACTOR by a point in time."""
+        n = self.size
+        live = self.amplitudes(at) >= SHOCK_EXPIRY_FACTOR * self.magnitude[:n]
+        if not live.all():
+            kept = int(live.sum())
+            for column in self.columns():
+                column[:kept] = column[:n][live]
+            self.size = kept
+
+    def contributions(self, at: float, num_topics: int) -> np.ndarray:
+        """Sum of decayed shock magnitudes per topic."""
+        boost = np.zeros(num_topics)
+        np.add.at(boost, self.topic[: self.size], self.amplitudes(at))
+        return boost
+
+
+class TrendState:
+    """
+    Trend scores, velocities, shocks and clock in one flat buffer.
+
+    With a name the buffer is a multiprocessing.shared_memory segment that
+    every worker process attaches to, so all workers see the same trends and
+    shocks. Without one it is private to the process. The layout is
+
+        header | scores[2][n] | velocities[2][n] | shock table
+
+    Scores and velocities are double-buffered behind a seqlock: a writer
+    fills the inactive slot, flips the active index and bumps the sequence
+    number, and readers copy the active slot without taking any lock,
+    retrying only if a writer lapped them mid-copy. Writers serialize on a
+    thread lock plus, when shared, an flock on a file next to the segment.
+    """
+
+    def __init__(self, num_topics: int, shock_capacity: int = 65536, name: str | None = None):
+        self.name = name
+        self.num_topics = num_topics
+        self._thread_lock = threading.Lock()
+        self._lock_file: int | None = None
+        self._lock_pid: int | None = None
+        self._shm: shared_memory.SharedMemory | None = None
+
+        if name is None:
+            buffer = bytearray(self._nbytes(num_topics, 0))
+            self._bind(buffer, num_topics, shock=None)
+            self._initialize()
+            return
+
+        size = self._nbytes(num_topics, shock_capacity)
+        with self.write_lock():
+            try:
+                shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                created = True
+            except FileExistsError:
+                shm = shared_memory.SharedMemory(name=name)
+                created = False
+            self._shm = shm
+            # The segment outlives any one worker; do not let the resource
+            # tracker unlink it when this process exits
+            resource_tracker.unregister(_tracker_name(shm), "shared_memory")
+
+            view = shm.buf
+            assert view is not None  # open until close()
+            header: np.ndarray = np.ndarray((_HEADER_SLOTS,), dtype=np.float64, buffer=view)
+            fresh = created or header[_MAGIC] != _MAGIC_VALUE
+            matches = shm.size >= size and (
+                fresh
+                or (header[_NUM_TOPICS] == num_topics and header[_SHOCK_CAPACITY] == shock_capacity)
+            )
+            del header
+            if matches:
+                self._bind(view, num_topics, shock=shock_capacity)
+                if fresh:
+                    self._header[_NUM_TOPICS] = num_topics
+                    self._header[_SHOCK_CAPACITY] = shock_capacity
+                    self._initialize()
+                    self._header[_MAGIC] = _MAGIC_VALUE
+
+        if not matches:
+            self.close()
+            raise ValueError(
+                f"Shared trend state {name!r} has a different layout; unlink "
+                f"/dev/shm/{name} or pick another HURL_TREND_SHM_NAME"
+            )
+
+    @staticmethod
+    def _nbytes(num_topics: int, shock_capacity: int) -> int:
+        """Size of the header, both slots and a fixed-capacity shock table."""
+        return 8 * (_HEADER_SLOTS + 4 * num_topics) + ShockTable.nbytes(shock_capacity)
+
+    def _bind(self, buffer: bytearray | memoryview, n: int, shock: int | None) -> None:
+        """Create array views over the buffer."""
+        self._header: np.ndarray = np.ndarray((_HEADER_SLOTS,), dtype=np.float64, buffer=buffer)
+        offset = 8 * _HEADER_SLOTS
+        self._scores: np.ndarray = np.ndarray(
+            (2, n), dtype=np.float64, buffer=buffer, offset=offset
+        )
+        offset += 8 * 2 * n
+        self._velocities: np.ndarray = np.ndarray(
+            (2, n), dtype=np.float64, buffer=buffer, offset=offset
+        )
+        offset += 8 * 2 * n
+        if shock is None:
+            self.shocks = ShockTable()
+        else:
+            self.shocks = ShockTable(shock, memoryview(buffer)[offset:])
+
+    def _initialize(self) -> None:
+        """Reset to no shocks and nothing published (callers then publish a baseline)."""
+        self._header[[_SEQ, _ACTIVE, _TIME_OFFSET, _EPOCH]] = 0
+        self._header[_LAST_TICK] = float("nan")
+        self._scores[:] = 0.0
+        self._velocities[:] = 0.0
+        self.shocks.size = 0
+
+    @property
+    def initialized(self) -> bool:
+        """Whether any process has published state yet."""
+        return not np.isnan(self._header[_LAST_TICK])
+
+    @property
+    def sequence(self) -> int:
+        """Seqlock counter; changes on every publish."""
+        return int(self._header[_SEQ])
+
+    @property
+    def last_tick(self) -> float:
+        return float(self._header[_LAST_TICK])
+
+    @last_tick.setter
+    def last_tick(self, value: float) -> None:
+        self._header[_LAST_TICK] = value
+
+    @property
+    def time_offset(self) -> float:
+        return float(self._header[_TIME_OFFSET])
+
+    @time_offset.setter
+    def time_offset(self, value: float) -> None:
+        self._header[_TIME_OFFSET] = value
+
+    @property
+    def epoch(self) -> int:
+        """Bumped whenever trend state changes (advance or shock)."""
+        return int(self._header[_EPOCH])
+
+    def bump_epoch(self) -> None:
+        """Mark trend state as changed (caller holds the write lock)."""
+        self._header[_EPOCH] += 1
+
+    @contextmanager
+    def write_lock(self, blocking: bool = True) -> Iterator[bool]:
+        """
+        Hold the writer lock across threads and, when shared, processes.
+
+        Yields:
+            True if the lock is held; False if blocking=False and another
+            writer has it
+        """
+        if not self._thread_lock.acquire(blocking):
+            yield False
+            return
+        try:
+            if self.name is None:
+                yield True
+                return
+            fd = self._process_lock_file()
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            self._thread_lock.release()
+
+    def _process_lock_file(self) -> int:
+        """Lock file descriptor for this process (reopened after fork)."""
+        fd = self._lock_file
+        if fd is None or self._lock_pid != os.getpid():
+            path = os.path.join(tempfile.gettempdir(), f"{self.name}.lock")
+            fd = self._lock_file = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._lock_pid = os.getpid()
+        return fd
+
+    def current(self) -> tuple[np.ndarray, np.ndarray]:
+        """Active scores and velocities, in place (caller holds the write lock)."""
+        active = int(self._header[_ACTIVE])
+        return self._scores[active], self._velocities[active]
+
+    def read(self) -> tuple[int, np.ndarray, np.ndarray]:
+        """
+        Lock-free consistent copy of the published state.
+
+        Returns:
+            (sequence, scores, velocities)
+        """
+        while True:
+            sequence = self._header[_SEQ]
+            active = int(self._header[_ACTIVE])
+            scores = self._scores[active].copy()
+            velocities = self._velocities[active].copy()
+            # A slot is only rewritten two publishes after it stopped being active
+            if self._header[_SEQ] - sequence <= 1:
+                return int(sequence), scores, velocities
+
+    def publish(self, scores: np.ndarray, velocities: np.ndarray, at: float) -> None:
+        """Swap in new state as of a point in time (caller holds the write lock)."""
+        inactive = 1 - int(self._header[_ACTIVE])
+        self._header[_SEQ] += 1
+        self._scores[inactive] = scores
+        self._velocities[inactive] = velocities
+        self._header[_ACTIVE] = inactive
+        self._header[_LAST_TICK] = at
+        self._header[_SEQ] += 1
+        self._header[_EPOCH] += 1
+
+    @property
+    def closed(self) -> bool:
+        """Whether close() has detached shared state (private state never closes)."""
+        return self.name is not None and self._shm is None
+
+    def close(self) -> None:
+        """Detach from shared memory (the segment itself is left in place)."""
+        if self._shm is not None:
+            # Views into the segment must go before it can be unmapped (they
+            # were never bound if the layout did not match)
+            for view in ("_header", "_scores", "_velocities", "shocks"):
+                vars(self).pop(view, None)
+            self._shm.close()
+            self._shm = None
+        if self._lock_file is not None and self._lock_pid == os.getpid():
+            os.close(self._lock_file)
+            self._lock_file = None
+
+    def unlink(self) -> None:
+        """Remove the shared segment (for tests and tooling)."""
+        if self.name is not None:
+            name = self.name
+            self.close()
+            segment = shared_memory.SharedMemory(name=name)
+            resource_tracker.register(_tracker_name(segment), "shared_memory")
+            segment.close()
+            segment.unlink()
@@ -1,17 +1,74 @@
 #!/usr/bin/env python
 """Trend engine with emergent dynamics."""
 
-import asyncio
 import math
+from collections import OrderedDict
 from typing import Any
 
 import numpy as np
+from prometheus_client import Counter
 from scipy.special import expit  # sigmoid
 
+from app.config import settings
+from app.schemas import Persona
 from app.services.rng import rng_manager
+from app.services.sampling import gumbel_top_k
 from app.services.topics import topic_graph
 
 
+adoption_cache_hits = Counter(
+    "hurl_adoption_cache_hits_total",
+    "Adoption cache hits",
+)
+adoption_cache_misses = Counter(
+    "hurl_adoption_cache_misses_total",
+    "Adoption cache misses",
+)
+
+
+class AdoptionCache:
+    """
+    LRU cache of per-persona adoption inputs for the current trend epoch.
+
+    Entries are keyed by (persona, topic filter) and the whole cache is
+    dropped as soon as a lookup sees a newer epoch, so stale trend scores
+    are never served.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.epoch = -1
+        self._entries: OrderedDict[tuple, tuple[np.ndarray, np.ndarray]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple, epoch: int) -> tuple[np.ndarray, np.ndarray] | None:
+        """Look up an entry, invalidating everything if the epoch moved on."""
+        if epoch != self.epoch:
+            self._entries.clear()
+            self.epoch = epoch
+
+        entry = self._entries.get(key)
+        if entry is None:
+            adoption_cache_misses.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        adoption_cache_hits.inc()
+        return entry
+
+    def put(self, key: tuple, entry: tuple[np.ndarray, np.ndarray]) -> None:
+        """Insert an entry, evicting the least recently used beyond max_size."""
+        if self.max_size <= 0:
+            return
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
 class TrendEngine:
     """
     Manages emergent topic adoption dynamics.
@@ -20,11 +77,7 @@ class TrendEngine:
     p = σ(α*trend + β*peer_influence + γ*interest_match + δ*recency_decay + ε*shock)
     """
 
-    def __init__(self, tick_interval: float = 5.0):
-        self.tick_interval = tick_interval
-        self._task: asyncio.Task | None = None
-        self._running = False
-
+    def __init__(self):
         # Coefficients for adoption probability
         self.alpha = 0.3  # trend weight
         self.beta = 0.4  # peer influence weight
@@ -32,36 +85,10 @@ class TrendEngine:
         self.delta = -0.2  # recency decay weight
         self.epsilon = 0.6  # shock weight
 
-    async def start(self) -> None:
-        """Start the trend engine background task."""
-        if self._running:
-            return
+        # Scratch buffer for sampling keys, grown to the largest candidate set seen
+        self._sample_keys = np.empty(0)
 
-        self._running = True
-        self._task = asyncio.create_task(self._tick_loop())
-
-    async def stop(self) -> None:
-        """Stop the trend engine."""
-        self._running = False
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
-
-    async def _tick_loop(self) -> None:
-        """Background loop that updates trends."""
-        while self._running:
-            try:
-                topic_graph.tick()
-                await asyncio.sleep(self.tick_interval)
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                # Log error but keep running
-                print(f"Trend tick error: {e}")
-                await asyncio.sleep(self.tick_interval)
+        self.adoption_cache = AdoptionCache(settings.adoption_cache_size)
 
     def compute_topic_adoption_prob(
         self,
@@ -73,6 +100,8 @@ class TrendEngine:
         """
         Compute adoption probability for each topic given persona state.
 
+        Dict wrapper around compute_persona_adoption.
+
         Args:
             persona_interests: dict of topic_id -> interest weight (0-1)
             peer_influence_scores: dict of topic_id -> peer influence (0-1)
@@ -82,40 +111,165 @@ class TrendEngine:
         Returns:
             dict of topic_id -> adoption probability (0-1)
         """
-        rng = rng_manager.get_rng(seed)
-        probs = {}
+        probs = self.compute_persona_adoption(
+            persona_interests,
+            topic_graph.vector(peer_influence_scores),
+            recent_topics,
+        )
+        return dict(zip(topic_graph.topic_ids, probs.tolist()))
 
-        for topic_id in topic_graph.graph.nodes:
-            trend_score = topic_graph.get_trend_score(topic_id)
-            interest = persona_interests.get(topic_id, 0.0)
-            peer_influence = peer_influence_scores.get(topic_id, 0.0)
+    def recency_penalties(self, recent_topics: list[str]) -> dict[int, float]:
+        """
+        Recency penalty per topic index for recently used topics.
 
-            # Recency decay: penalize if topic was used recently
-            recency_penalty = 0.0
-            if topic_id in recent_topics:
-                # exponential decay based on position
-                idx = recent_topics.index(topic_id)
-                recency_penalty = math.exp(-idx / 3.0)
+        A topic used recently is penalized by exp(-idx / 3), where idx is the
+        position of its first occurrence in recent_topics.
+        """
+        penalties = {}
+        for position in range(len(recent_topics) - 1, -1, -1):
+            index = topic_graph.topic_index.get(recent_topics[position])
+            if index is not None:
+                penalties[index] = math.exp(-position / 3.0)
+        return penalties
+
+    def recency_vector(self, recent_topics: list[str]) -> np.ndarray:
+        """Dense recency penalty in topic_graph.topic_ids order."""
+        penalty = np.zeros(len(topic_graph.topic_ids))
+        for index, value in self.recency_penalties(recent_topics).items():
+            penalty[index] = value
+        return penalty
+
+    def compute_persona_adoption(
+        self,
+        persona_interests: dict[str, float],
+        peer_influence: np.ndarray,
+        recent_topics: list[str],
+    ) -> np.ndarray:
+        """
+        Adoption probabilities for one persona over all topics.
+
+        Same result as compute_adoption_vector, but interests and recency are
+        only added at the handful of topics they touch, so the per-post cost is
+        two passes over the topic vector plus the sigmoid.
+
+        Args:
+            persona_interests: dict of topic_id -> interest weight (0-1)
+            peer_influence: peer influence in topic_graph.topic_ids order
+            recent_topics: list of recently used topic IDs (for recency decay)
 
-            # Combined logit
-            logit = (
-                self.alpha * trend_score
-                + self.beta * peer_influence
-                + self.gamma * interest
-                - self.delta * recency_penalty
-            )
+        Returns:
+            adoption probabilities in topic_graph.topic_ids order
+        """
+        logit = self._interest_logit(persona_interests)
+        logit += self.beta * peer_influence
+        for index, penalty in self.recency_penalties(recent_topics).items():
+            logit[index] -= self.delta * penalty
 
-            # Sigmoid to probability
-            prob = float(expit(logit))
-            probs[topic_id] = prob
+        return expit(logit, out=logit)
 
-        return probs
+    def _interest_logit(self, persona_interests: dict[str, float]) -> np.ndarray:
+        """alpha * trend + gamma * interest over all topics."""
+        logit = self.alpha * topic_graph.trend_vector()
+        topic_index = topic_graph.topic_index
+        for topic_id, interest in persona_interests.items():
+            index = topic_index.get(topic_id)
+            if index is not None:
+                logit[index] += self.gamma * interest
+        return logit
+
+    def adoption_base(
+        self, persona: Persona, topic_filter: list[str]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Candidate topics and their persona-specific base logits.
+
+        The trend and interest terms only change with the trend epoch, so they
+        are memoized per (persona, topic filter) in adoption_cache. The
+        returned arrays are shared and must not be modified.
+
+        Args:
+            persona: persona posting
+            topic_filter: topic IDs to restrict to (empty means all)
+
+        Returns:
+            (candidate topic indices in topic_ids order, base logit per candidate)
+        """
+        key = (persona.id, tuple(sorted(set(topic_filter))))
+        topic_graph.refresh()
+        entry: tuple[np.ndarray, np.ndarray] | None = self.adoption_cache.get(
+            key, topic_graph.epoch
+        )
+        if entry is None:
+            if topic_filter:
+                candidates = np.flatnonzero(topic_graph.mask(topic_filter))
+            else:
+                candidates = np.arange(len(topic_graph.topic_ids))
+            entry = (candidates, self._interest_logit(persona.interests)[candidates])
+            self.adoption_cache.put(key, entry)
+        return entry
+
+    def compute_candidate_adoption(
+        self,
+        candidates: np.ndarray,
+        base_logit: np.ndarray,
+        peer_influence: np.ndarray,
+        recent_topics: list[str],
+    ) -> np.ndarray:
+        """
+        Adoption probabilities for the candidates returned by adoption_base.
+
+        Args:
+            candidates: candidate topic indices (sorted)
+            base_logit: base logit per candidate
+            peer_influence: peer influence per candidate
+            recent_topics: list of recently used topic IDs (for recency decay)
+
+        Returns:
+            adoption probability per candidate
+        """
+        logit = base_logit + self.beta * peer_influence
+        for index, penalty in self.recency_penalties(recent_topics).items():
+            position = np.searchsorted(candidates, index)
+            if position < len(candidates) and candidates[position] == index:
+                logit[position] -= self.delta * penalty
+
+        return expit(logit, out=logit)
+
+    def compute_adoption_vector(
+        self,
+        interests: np.ndarray,
+        peer_influence: np.ndarray,
+        recency_penalty: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Compute adoption probabilities over all topics in one pass.
+
+        Inputs are laid out in topic_graph.topic_ids order and may carry
+        leading batch dimensions, so a (posts, topics) matrix gives one row of
+        probabilities per post.
+
+        Args:
+            interests: interest weights (0-1)
+            peer_influence: peer influence (0-1)
+            recency_penalty: recency penalty (see recency_vector)
+
+        Returns:
+            adoption probabilities, same shape as the inputs
+        """
+        logit = (
+            self.alpha * topic_graph.trend_vector()
+            + self.beta * peer_influence
+            + self.gamma * interests
+            - self.delta * recency_penalty
+        )
+        return expit(logit)
 
     def sample_topics(
         self,
         adoption_probs: dict[str, float],
         count: int = 1,
         seed: int | None = None,
+        rng: np.random.Generator | None = None,
     ) -> list[str]:
         """
         Sample topics based on adoption probabilities.
@@ -124,6 +278,7 @@ class TrendEngine:
             adoption_probs: dict of topic_id -> prob
             count: number of topics to sample
             seed: RNG seed
+            rng: Per-post RNG stream (takes precedence over seed)
 
         Returns:
             list of topic IDs
@@ -132,19 +287,43 @@ class TrendEngine:
             return []
 
         topic_ids = list(adoption_probs.keys())
-        probs = np.array([adoption_probs[tid] for tid in topic_ids])
+        probs = np.fromiter(adoption_probs.values(), dtype=np.float64, count=len(topic_ids))
+
+        picks = self.sample_topic_indices(probs, count, seed=seed, rng=rng)
+        return [topic_ids[i] for i in picks]
+
+    def sample_topic_indices(
+        self,
+        probs: np.ndarray,
+        count: int = 1,
+        seed: int | None = None,
+        rng: np.random.Generator | None = None,
+    ) -> np.ndarray:
+        """
+        Sample distinct indices into an adoption probability vector.
 
-        # Normalize
-        prob_sum = probs.sum()
-        if prob_sum > 0:
-            probs = probs / prob_sum
-        else:
-            probs = np.ones(len(probs)) / len(probs)
+        Weighted sampling without replacement via Gumbel top-k, so the cost is
+        one pass over probs regardless of count.
+
+        Args:
+            probs: unnormalized probabilities
+            count: number of indices to sample
+            seed: RNG seed
+            rng: Per-post RNG stream (takes precedence over seed)
+
+        Returns:
+            array of sampled indices (fewer than count if too few are non-zero)
+        """
+        if not probs.sum() > 0:
+            probs = np.ones(len(probs))
 
-        rng = rng_manager.get_rng(seed)
-        sampled = rng.choice(topic_ids, size=min(count, len(topic_ids)), replace=False, p=probs)
+        if len(self._sample_keys) < len(probs):
+            self._sample_keys = np.empty(len(probs))
 
-        return sampled.tolist() if isinstance(sampled, np.ndarray) else [sampled]
+        rng = rng_manager.resolve(rng, seed)
+        top, valid = gumbel_top_k(probs, count, rng, out=self._sample_keys[: len(probs)])
+        sampled: np.ndarray = top[valid]
+        return sampled
 
 
 # Global trend engine instance
@@ -4,9 +4,11 @@
 import asyncio
 from typing import AsyncGenerator
 
-import orjson
+from pydantic import BaseModel
 from starlette.responses import StreamingResponse
 
+from app.responses import dumps
+
 
 class SSEResponse(StreamingResponse):
     """SSE streaming response."""
@@ -24,12 +26,12 @@ class SSEResponse(StreamingResponse):
         )
 
 
-def format_sse(data: dict | str, event: str | None = None) -> str:
+def format_sse(data: BaseModel | dict | str, event: str | None = None) -> str:
     """
     Format data as SSE message.
 
     Args:
-        data: Data to send (dict will be JSON-encoded)
+        data: Data to send (models and dicts will be JSON-encoded)
         event: Optional event type
 
     Returns:
@@ -40,8 +42,8 @@ def format_sse(data: dict | str, event: str | None = None) -> str:
     if event:
         lines.append(f"event: {event}")
 
-    if isinstance(data, dict):
-        data_str = orjson.dumps(data).decode("utf-8")
+    if isinstance(data, (BaseModel, dict)):
+        data_str = dumps(data).decode("utf-8")
     else:
         data_str = str(data)
 
@@ -0,0 +1,356 @@
+#!/usr/bin/env python
+"""Append-only cold tier for posts evicted from the in-memory window."""
+
+import bisect
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+from app.store.records import StoredPost
+
+# Segment files roll over at this size
+SEGMENT_BYTES = 64 << 20
+# Records per sparse index entry (a lookup decodes at most this many IDs)
+INDEX_EVERY = 64
+
+_MODES = ("emergent", "pure_random")
+_KINDS = ("post", "reply", "quote")
+_MODE_CODES = {mode: code for code, mode in enumerate(_MODES)}
+_KIND_CODES = {kind: code for code, kind in enumerate(_KINDS)}
+_HAS_TEMPLATE = 1
+_HAS_PARENT = 2
+_LIST_SEP = "\x1f"
+
+# Record length, created_at, toxicity, likes, replies, quotes, impressions, emojis,
+# hashtags, links, caps, mode, kind, flags, then byte lengths of the variable fields:
+# id, persona_id, text, language, template, topics, influences, parent_id
+_FIELD_LENGTHS = "IIIIIIII"
+_HEADER = struct.Struct("<IddIIIIHHHdBBB" + _FIELD_LENGTHS)
+_LENGTH = struct.Struct("<I")
+_ID_LENGTH = struct.Struct("<I")
+_ID_LENGTH_OFFSET = _HEADER.size - struct.calcsize("<" + _FIELD_LENGTHS)
+
+
+def encode_post(post: StoredPost) -> bytes:
+    """
+    Serialize a post as one cold-tier record.
+
+    Raises:
+        ValueError: if the post has a mode or kind the format has no code
+            for, or a value that does not fit its header field
+    """
+    mode = _MODE_CODES.get(post.mode)
+    kind = _KIND_CODES.get(post.kind)
+    if mode is None or kind is None:
+        raise ValueError(
+            f"Cannot encode post {post.id} with mode {post.mode!r} and kind {post.kind!r}"
+        )
+    fields = [
+        post.id.encode(),
+        post.persona_id.encode(),
+        post.text.encode(),
+        post.language.encode(),
+        (post.template or "").encode(),
+        _LIST_SEP.join(post.topics).encode(),
+        _LIST_SEP.join(post.influences).encode(),
+        (post.parent_id or "").encode(),
+    ]
+    flags = (_HAS_TEMPLATE if post.template is not None else 0) | (
+        _HAS_PARENT if post.parent_id is not None else 0
+    )
+    body = b"".join(fields)
+    try:
+        header = _HEADER.pack(
+            _HEADER.size + len(body),
+            post.timestamp,
+            post.toxicity,
+            post.likes,
+            post.replies,
+            post.quotes,
+            post.impressions,
+            post.emojis,
+            post.hashtags,
+            post.links,
+            post.caps,
+            mode,
+            kind,
+            flags,
+            *(len(field) for field in fields),
+        )
+    except struct.error as exc:
+        raise ValueError(f"Cannot encode post {post.id}: {exc}") from exc
+    return header + body
+
+
+def decode_post(buffer: mmap.mmap | bytes, offset: int) -> StoredPost:
+    """Deserialize the record at an offset."""
+    (
+        _,
+        created_at,
+        toxicity,
+        likes,
+        replies,
+        quotes,
+        impressions,
+        emojis,
+        hashtags,
+        links,
+        caps,
+        mode,
+        kind,
+        flags,
+        *lengths,
+    ) = _HEADER.unpack_from(buffer, offset)
+    fields = []
+    position = offset + _HEADER.size
+    for length in lengths:
+        fields.append(buffer[position : position + length].decode())
+        position += length
+    post_id, persona_id, text, language, template, topics, influences, parent_id = fields
+
+    return StoredPost(
+        post_id,
+        text,
+        persona_id,
+        created_at,
+        _MODES[mode],
+        topics.split(_LIST_SEP) if topics else (),
+        language,
+        emojis,
+        hashtags,
+        links,
+        caps,
+        template if flags & _HAS_TEMPLATE else None,
+        influences.split(_LIST_SEP) if influences else (),
+        likes,
+        replies,
+        quotes,
+        impressions,
+        toxicity,
+        _KINDS[kind],
+        parent_id if flags & _HAS_PARENT else None,
+    )
+
+
+def _record_id(buffer: mmap.mmap | bytes, offset: int) -> str:
+    """ID of the record at an offset, without decoding the rest."""
+    (length,) = _ID_LENGTH.unpack_from(buffer, offset + _ID_LENGTH_OFFSET)
+    start = offset + _HEADER.size
+    return buffer[start : start + length].decode()
+
+
+class _Segment:
+    """
+    One segment file plus its sparse index.
+
+    Every INDEX_EVERY-th record's ID and offset are kept in memory. Records
+    are in ID order, so a lookup bisects the sparse index and scans one
+    block of the memory-mapped file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.size = 0
+        self.count = 0
+        self.ids: list[str] = []  # first ID of each block
+        self.offsets: list[int] = []  # file offset of each block
+        self.last_id: str | None = None
+        self._map: mmap.mmap | None = None
+
+    def load(self) -> None:
+        """Rebuild the sparse index from the file, dropping a torn final record."""
+        size = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        offset = 0
+        while offset + _HEADER.size <= size:
+            (length,) = _LENGTH.unpack_from(data, offset)
+            if offset + length > size:
+                break
+            self.note(_record_id(data, offset), offset, length)
+            offset += length
+        if isinstance(data, mmap.mmap):
+            data.close()
+        if offset < size:
+            os.truncate(self.path, offset)
+
+    def note(self, post_id: str, offset: int, length: int) -> None:
+        """Account for a record appended at an offset."""
+        if self.count % INDEX_EVERY == 0:
+            self.ids.append(post_id)
+            self.offsets.append(offset)
+        self.count += 1
+        self.size = offset + length
+        self.last_id = post_id
+
+    def view(self) -> mmap.mmap:
+        """Read-only map of the segment, remapped if it has grown."""
+        if self._map is None or len(self._map) < self.size:
+            if self._map is not None:
+                self._map.close()
+            with open(self.path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _block_end(self, index: int) -> int:
+        return self.offsets[index + 1] if index + 1 < len(self.offsets) else self.size
+
+    def block(self, index: int) -> list[int]:
+        """Record offsets in a block."""
+        data = self.view()
+        end = self._block_end(index)
+        offsets = []
+        offset = self.offsets[index]
+        while offset < end:
+            offsets.append(offset)
+            offset += _LENGTH.unpack_from(data, offset)[0]
+        return offsets
+
+    def find(self, post_id: str) -> int | None:
+        """Offset of the record with an ID, if present."""
+        index = bisect.bisect_right(self.ids, post_id) - 1
+        if index < 0:
+            return None
+        data = self.view()
+        offset, end = self.offsets[index], self._block_end(index)
+        while offset < end:
+            record_id = _record_id(data, offset)
+            if record_id == post_id:
+                return offset
+            if record_id > post_id:
+                return None
+            offset += _LENGTH.unpack_from(data, offset)[0]
+        return None
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class ColdStore:
+    """
+    Append-only, segmented on-disk tier for posts.
+
+    Posts are appended as fixed-layout binary records (a packed header of
+    numbers and field lengths, then the UTF-8 fields) to the newest
+    segment file, which rolls over at SEGMENT_BYTES. Segments are read
+    through mmap, so resident memory is only the pages being read plus a
+    sparse index of one ID per INDEX_EVERY records. Post IDs are ULIDs and
+    arrive in time order, so each segment, and the segments in sequence,
+    are sorted by ID: lookups and ID-cursor range reads bisect the
+    segments and their sparse indexes.
+    """
+
+    def __init__(self, directory: str | Path, segment_bytes: int = SEGMENT_BYTES):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._segments: list[_Segment] = []
+        for path in sorted(self.directory.glob("*.seg")):
+            segment = _Segment(path)
+            segment.load()
+            if segment.count:
+                self._segments.append(segment)
+            else:
+                segment.path.unlink()
+        self._file: BinaryIO | None = None
+
+    def __len__(self) -> int:
+        return sum(segment.count for segment in self._segments)
+
+    def append(self, post: StoredPost) -> None:
+        """
+        Append a post (its ID must not sort before the last appended ID).
+
+        Raises:
+            ValueError: if the post cannot be encoded (nothing is written)
+        """
+        record = encode_post(post)
+        segment = self._segments[-1] if self._segments else None
+        if segment is None or (segment.count and segment.size + len(record) > self.segment_bytes):
+            segment = self._roll()
+        file = self._file
+        if file is None:  # closed since the last append
+            file = self._file = open(segment.path, "ab")
+        file.write(record)
+        segment.note(post.id, segment.size, len(record))
+
+    def _roll(self) -> _Segment:
+        """Start a new segment file."""
+        if self._file is not None:
+            self._file.close()
+        number = int(self._segments[-1].path.stem) + 1 if self._segments else 0
+        segment = _Segment(self.directory / f"{number:08d}.seg")
+        self._file = open(segment.path, "ab")
+        self._segments.append(segment)
+        return segment
+
+    def _sync(self) -> None:
+        """Make buffered appends visible to the mmap readers."""
+        if self._file is not None:
+            self._file.flush()
+
+    def get_post(self, post_id: str) -> StoredPost | None:
+        """Get a post by ID."""
+        self._sync()
+        firsts = [segment.ids[0] for segment in self._segments]
+        index = bisect.bisect_right(firsts, post_id) - 1
+        if index < 0:
+            return None
+        segment = self._segments[index]
+        offset = segment.find(post_id)
+        return decode_post(segment.view(), offset) if offset is not None else None
+
+    def get_posts_before(
+        self, before: str | None = None, limit: int = 50
+    ) -> list[StoredPost]:
+        """
+        Page backwards by post ID.
+
+        Args:
+            before: exclusive ID cursor (None starts from the newest post)
+            limit: maximum posts to return
+
+        Returns:
+            posts with IDs below the cursor, newest first
+        """
+        self._sync()
+        posts: list[StoredPost] = []
+        for segment in reversed(self._segments):
+            if before is not None and segment.ids[0] >= before:
+                continue
+            data = segment.view()
+            last = len(segment.ids) - 1
+            if before is not None:
+                last = bisect.bisect_left(segment.ids, before) - 1
+            for block in range(last, -1, -1):
+                for offset in reversed(segment.block(block)):
+                    if before is not None and _record_id(data, offset) >= before:
+                        continue
+                    posts.append(decode_post(data, offset))
+                    if len(posts) >= limit:
+                        return posts
+        return posts
+
+    def has_posts_before(self, post_id: str) -> bool:
+        """Whether any stored post has an ID below post_id."""
+        return bool(self._segments) and self._segments[0].ids[0] < post_id
+
+    def clear(self) -> None:
+        """Delete every segment."""
+        self.close()
+        for segment in self._segments:
+            segment.path.unlink(missing_ok=True)
+        self._segments = []
+
+    def close(self) -> None:
+        """Flush appends and release file handles and maps."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for segment in self._segments:
+            segment.close()
@@ -1,61 +1,284 @@
 #!/usr/bin/env python
 """In-memory post storage with sliding window."""
 
+import bisect
+import logging
 from collections import deque
+from collections.abc import Callable
+from itertools import islice
 from typing import Any
 
+from app.config import settings
 from app.schemas import Post
+from app.store.cold import ColdStore
+from app.store.records import StoredPost
+
+logger = logging.getLogger(__name__)
 
 
 class MemoryStore:
-    """In-memory store for posts with sliding window."""
+    """
+    In-memory store for posts with sliding window.
+
+    Besides the window itself, post IDs are indexed per persona and per
+    topic in insertion order. The window evicts the globally oldest post,
+    which is therefore also the oldest entry of each of its index deques,
+    so eviction pops from the left and every index stays in step with the
+    window without scanning.
+
+    Post IDs are ULIDs, which sort by creation time, so a sorted list of
+    the window's IDs supports cursor pagination by bisection. IDs normally
+    arrive in order (see app.services.ids), making upkeep an append plus
+    advancing a head offset on eviction; out-of-order IDs fall back to an
+    O(window) insort and delete.
 
-    def __init__(self, max_size: int = 10000):
+    With a cold tier, evicted posts are appended to it instead of being
+    dropped (unless the record format cannot hold them, which is logged),
+    and get_post and cursor pages fall through to it once the window runs out.
+
+    Posts are held as compact StoredPost records, and reads return
+    records; routers materialize Post models with to_post(). The window
+    evicts when it reaches max_size posts or, if max_bytes is set, when
+    the records' approximate memory would exceed it.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        cold: ColdStore | None = None,
+        max_bytes: int | None = None,
+    ):
         self.max_size = max_size
-        self._posts: deque[Post] = deque(maxlen=max_size)
-        self._index: dict[str, Post] = {}
+        self.max_bytes = max_bytes
+        self.cold = cold
+        self.nbytes = 0  # approximate memory of the records in the window
+        self._posts: deque[StoredPost] = deque()
+        self._index: dict[str, StoredPost] = {}
+        self._children: dict[str, deque[str]] = {}  # parent ID -> reply/quote IDs, oldest first
+        self._by_persona: dict[str, deque[str]] = {}  # persona ID -> post IDs, oldest first
+        self._by_topic: dict[str, deque[str]] = {}  # topic ID -> post IDs, oldest first
+        self._ids: list[str] = []  # window IDs, sorted from _ids_head on
+        self._ids_head = 0  # evicted prefix of _ids, compacted lazily
+        self._listeners: list[Callable[[Post], None]] = []
+
+    def subscribe(self, listener: Callable[[Post], None]) -> None:
+        """Call listener with every post as it is added."""
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[Post], None]) -> None:
+        """Stop calling a subscribed listener."""
+        self._listeners.remove(listener)
 
     def add_post(self, post: Post) -> None:
-        """Add a post to the store."""
-        # If at capacity, remove oldest from index
-        if len(self._posts) >= self.max_size and self._posts:
-            oldest = self._posts[0]
-            self._index.pop(oldest.id, None)
+        """Add a post to the store (listeners receive the Post as given)."""
+        record = StoredPost.from_post(post)
+        nbytes = record.nbytes
+
+        # Evict oldest posts until the new one fits
+        while self._posts and (
+            len(self._posts) >= self.max_size
+            or (self.max_bytes is not None and self.nbytes + nbytes > self.max_bytes)
+        ):
+            self._evict_oldest()
+
+        self._posts.append(record)
+        self.nbytes += nbytes
+        self._index[record.id] = record
+        self._link_thread(record)
+        self._by_persona.setdefault(record.persona_id, deque()).append(record.id)
+        for topic_id in dict.fromkeys(record.topics):
+            self._by_topic.setdefault(topic_id, deque()).append(record.id)
+        if len(self._ids) == self._ids_head or record.id >= self._ids[-1]:
+            self._ids.append(record.id)
+        else:
+            bisect.insort(self._ids, record.id, lo=self._ids_head)
+        for listener in self._listeners:
+            listener(post)
+
+    def _evict_oldest(self) -> None:
+        """Drop the oldest post from the window and every index (spilling it if tiered)."""
+        oldest = self._posts.popleft()
+        self.nbytes -= oldest.nbytes
+        self._index.pop(oldest.id, None)
+        self._unlink_thread(oldest)
+        self._unlink_lookups(oldest)
+        self._unlink_id(oldest.id)
+        if self.cold is not None:
+            try:
+                self.cold.append(oldest)
+            except ValueError:
+                # The post has already left the window; failing here would lose the new one too
+                logger.exception("Dropped post %s instead of moving it to the cold tier", oldest.id)
+
+    def _link_thread(self, post: StoredPost) -> None:
+        """Index a reply/quote under its parent and count it on the parent."""
+        parent = self._index.get(post.parent_id) if post.parent_id else None
+        if parent is None:
+            return
+        self._children.setdefault(parent.id, deque()).append(post.id)
+        if post.kind == "reply":
+            parent.replies += 1
+        elif post.kind == "quote":
+            parent.quotes += 1
+
+    def _unlink_thread(self, post: StoredPost) -> None:
+        """Drop an evicted post from the thread index (its children become roots)."""
+        self._children.pop(post.id, None)
+        siblings = self._children.get(post.parent_id) if post.parent_id else None
+        if siblings:
+            # Eviction is oldest first, so this is almost always the head
+            if siblings[0] == post.id:
+                siblings.popleft()
+            elif post.id in siblings:
+                siblings.remove(post.id)
+            if not siblings and post.parent_id is not None:
+                del self._children[post.parent_id]
 
-        self._posts.append(post)
-        self._index[post.id] = post
+    @staticmethod
+    def _pop_oldest(index: dict[str, deque[str]], key: str) -> None:
+        """Drop the oldest post ID under a key, and the key once it is empty."""
+        ids = index.get(key)
+        if ids:
+            ids.popleft()
+            if not ids:
+                del index[key]
 
-    def get_post(self, post_id: str) -> Post | None:
-        """Get a post by ID."""
-        return self._index.get(post_id)
+    def _unlink_lookups(self, post: StoredPost) -> None:
+        """Drop an evicted post from the persona and topic indexes."""
+        self._pop_oldest(self._by_persona, post.persona_id)
+        for topic_id in dict.fromkeys(post.topics):
+            self._pop_oldest(self._by_topic, topic_id)
 
-    def get_recent_posts(self, limit: int = 100) -> list[Post]:
-        """Get the most recent posts."""
-        return list(self._posts)[-limit:]
+    def _unlink_id(self, post_id: str) -> None:
+        """Drop an evicted post from the sorted ID list."""
+        ids, head = self._ids, self._ids_head
+        i = bisect.bisect_left(ids, post_id, lo=head)
+        if i == len(ids) or ids[i] != post_id:
+            return
+        if i > head:
+            del ids[i]
+            return
+        head += 1
+        if head > len(ids) // 2:
+            del ids[:head]
+            head = 0
+        self._ids_head = head
 
-    def get_all_posts(self) -> list[Post]:
+    def _latest(self, ids: deque[str] | None, limit: int) -> list[StoredPost]:
+        """Posts for the last limit IDs of an index deque, oldest first."""
+        if not ids or limit <= 0:
+            return []
+        latest = [self._index[post_id] for post_id in islice(reversed(ids), limit)]
+        latest.reverse()
+        return latest
+
+    def get_thread(self, post_id: str) -> list[StoredPost] | None:
+        """
+        Get the whole thread containing a post.
+
+        Walks parent links up to the oldest stored ancestor, then the
+        children index down, so the cost is the size of the thread.
+
+        Returns:
+            posts depth-first from the root (parents before children,
+            siblings oldest first), or None if the post is not stored
+        """
+        post = self._index.get(post_id)
+        if post is None:
+            return None
+        while post.parent_id in self._index:
+            post = self._index[post.parent_id]
+
+        thread = []
+        stack = [post.id]
+        while stack:
+            current = stack.pop()
+            thread.append(self._index[current])
+            stack.extend(reversed(self._children.get(current, ())))
+        return thread
+
+    def get_post(self, post_id: str) -> StoredPost | None:
+        """Get a post by ID (from the cold tier if it has left the window)."""
+        post = self._index.get(post_id)
+        if post is None and self.cold is not None:
+            post = self.cold.get_post(post_id)
+        return post
+
+    def get_recent_posts(self, limit: int = 100) -> list[StoredPost]:
+        """Get the most recent posts, oldest first (reads only the last limit)."""
+        if limit <= 0:
+            return []
+        recent = list(islice(reversed(self._posts), limit))
+        recent.reverse()
+        return recent
+
+    def get_posts_before(
+        self, before: str | None = None, limit: int = 50
+    ) -> list[StoredPost]:
+        """
+        Page backwards through the window, then the cold tier, by post ID.
+
+        Args:
+            before: exclusive ULID cursor (None starts from the newest post)
+            limit: maximum posts to return
+
+        Returns:
+            posts with IDs below the cursor, newest first
+        """
+        ids, head = self._ids, self._ids_head
+        end = len(ids) if before is None else bisect.bisect_left(ids, before, lo=head)
+        start = max(head, end - limit)
+        posts = [self._index[post_id] for post_id in reversed(ids[start:end])]
+        if len(posts) < limit and self.cold is not None:
+            cursor = posts[-1].id if posts else before
+            posts += self.cold.get_posts_before(cursor, limit - len(posts))
+        return posts
+
+    def has_posts_before(self, post_id: str) -> bool:
+        """Whether the window or cold tier holds any post with an ID below post_id."""
+        head = self._ids_head
+        if bisect.bisect_left(self._ids, post_id, lo=head) > head:
+            return True
+        return self.cold is not None and self.cold.has_posts_before(post_id)
+
+    def get_all_posts(self) -> list[StoredPost]:
         """Get all stored posts."""
         return list(self._posts)
 
-    def get_posts_by_persona(self, persona_id: str, limit: int = 50) -> list[Post]:
+    def get_posts_by_persona(self, persona_id: str, limit: int = 50) -> list[StoredPost]:
         """Get recent posts by a persona."""
-        persona_posts = [p for p in self._posts if p.persona_id == persona_id]
-        return persona_posts[-limit:]
+        return self._latest(self._by_persona.get(persona_id), limit)
 
-    def get_posts_by_topic(self, topic_id: str, limit: int = 50) -> list[Post]:
+    def get_posts_by_topic(self, topic_id: str, limit: int = 50) -> list[StoredPost]:
         """Get recent posts about a topic."""
-        topic_posts = [p for p in self._posts if topic_id in p.topics]
-        return topic_posts[-limit:]
+        return self._latest(self._by_topic.get(topic_id), limit)
 
     def count(self) -> int:
         """Count total posts in store."""
         return len(self._posts)
 
+    def close(self) -> None:
+        """Flush and close the cold tier, if any."""
+        if self.cold is not None:
+            self.cold.close()
+
     def clear(self) -> None:
-        """Clear all posts."""
+        """Clear all posts (including the cold tier)."""
         self._posts.clear()
+        self.nbytes = 0
         self._index.clear()
+        self._children.clear()
+        self._by_persona.clear()
+        self._by_topic.clear()
+        self._ids.clear()
+        self._ids_head = 0
+        if self.cold is not None:
+            self.cold.clear()
 
 
 # Global memory store instance
-memory_store = MemoryStore()
+memory_store = MemoryStore(
+    max_size=settings.store_max_posts,
+    cold=ColdStore(settings.cold_store_dir) if settings.cold_store_dir else None,
+    max_bytes=settings.store_max_bytes or None,
+)
@@ -1,33 +1,317 @@
 #!/usr/bin/env python
-"""Optional SQLite persistence (placeholder for future implementation)."""
+"""Optional SQLite persistence with batched write-behind."""
 
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.config import settings
+from app.responses import dumps
 from app.schemas import Post
 
+logger = logging.getLogger(__name__)
+
+# Posts written per transaction at most
+WRITE_BATCH_SIZE = 4096
+
+# Posts waiting to be written at most; add_post blocks beyond this
+MAX_PENDING = 16 * WRITE_BATCH_SIZE
+
+# seq is the insertion order; secondary indexes and post_topics refer to it
+# instead of the 26-character ID to keep their keys small
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    persona_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    parent_id TEXT,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_created_at ON posts (created_at);
+CREATE INDEX IF NOT EXISTS posts_persona ON posts (persona_id, seq);
+CREATE TABLE IF NOT EXISTS post_topics (
+    topic_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (topic_id, seq)
+) WITHOUT ROWID;
+"""
+
+# seq is left to SQLite, which assigns MAX(seq) + 1 per row
+_INSERT_POST = (
+    "INSERT INTO posts (id, persona_id, created_at, kind, parent_id, body) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_NEXT_SEQ = "SELECT COALESCE(MAX(seq), 0) + 1 FROM posts"
+_INSERT_TOPIC = "INSERT OR IGNORE INTO post_topics (topic_id, seq) VALUES (?, ?)"
+
+_STOP = object()
+
 
 class SQLiteStore:
-    """SQLite-based persistent store (placeholder)."""
+    """
+    SQLite-based persistent store.
+
+    add_post only enqueues the post; a writer thread drains the queue,
+    encodes whatever has accumulated (up to WRITE_BATCH_SIZE posts) and a
+    committer thread inserts it in one transaction with executemany, so
+    each statement is prepared once per batch and callers never wait on
+    disk unless max_pending posts are already waiting. Encoding the next
+    batch overlaps with committing the last. The database runs in WAL mode
+    with synchronous=NORMAL, so reads proceed alongside the writer and a
+    commit does not fsync.
 
-    def __init__(self, db_path: str = "hurl.db"):
+    A batch that violates a constraint (e.g. a post ID already stored) is
+    retried row by row, skipping only the offending posts. Other write
+    errors are logged and raised from the next flush().
+
+    Posts are stored as their JSON body plus indexed columns (ID, which as
+    a ULID is also time order; persona; created_at; topics in a side
+    table). Reads see posts once their batch has committed; call flush()
+    to wait for that.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "hurl.db",
+        batch_size: int = WRITE_BATCH_SIZE,
+        max_pending: int = MAX_PENDING,
+    ):
         self.db_path = db_path
-        # In production with SQLModel:
-        # from sqlmodel import create_engine, Session
-        # self.engine = create_engine(f"sqlite:///{db_path}")
-        # SQLModel.metadata.create_all(self.engine)
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.error: Exception | None = None
+
+        self._reader = self._connect()
+        self._reader.executescript(_SCHEMA)
+        self._read_lock = threading.Lock()
+
+        self._conn = self._connect()  # used only on the committer thread
+        self._committer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-commit")
+        # SimpleQueue has no maxsize, but a bounded queue.Queue costs more per
+        # post than the insert budget allows; add_post waits on _drained instead
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._drained = threading.Condition()
+        self._writer = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection in WAL mode."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA page_size=16384")  # only takes effect on a new database
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")  # KiB
+        conn.execute("PRAGMA wal_autocheckpoint=4096")  # pages
+        return conn
+
+    def _run(self) -> None:
+        """Writer thread: encode queued posts in batches and hand them to the committer."""
+        pending: Future | None = None
+        stopping = False
+        while not stopping:
+            posts: list[Post] = []
+            waiters: list[threading.Event] = []
+            item = self._queue.get()
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    posts.append(item)
+                if len(posts) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            with self._drained:
+                self._drained.notify_all()
+
+            try:
+                rows, topics = self._encode_batch(posts)
+            except Exception as exc:
+                logger.exception("Failed to encode %d posts for SQLite", len(posts))
+                self.error = exc
+                rows, topics = [], []  # the commit below still releases the waiters
+            # Encoding holds the GIL but SQLite releases it, so the next batch
+            # is encoded while this one commits
+            if pending is not None:
+                pending.result()
+            pending = self._committer.submit(self._commit, rows, topics, waiters)
+
+        if pending is not None:
+            pending.result()
+        self._committer.submit(self._conn.close).result()
+        self._committer.shutdown()
+
+    @staticmethod
+    def _encode_batch(posts: list[Post]) -> tuple[list[tuple], list[tuple]]:
+        """
+        Parameter rows for the posts and post_topics inserts.
+
+        Returns:
+            (post rows, (topic ID, position in batch) rows)
+        """
+        rows = [
+            (
+                post.id,
+                post.persona_id,
+                post.created_at.timestamp(),
+                post.kind,
+                post.parent_id,
+                dumps(post),
+            )
+            for post in posts
+        ]
+        topics = [
+            (topic_id, i) for i, post in enumerate(posts) for topic_id in set(post.topics)
+        ]
+        return rows, topics
+
+    def _commit(
+        self, rows: list[tuple], topics: list[tuple], waiters: list[threading.Event]
+    ) -> None:
+        """Committer thread: insert a batch in one transaction, then release its flushers."""
+        try:
+            if rows:
+                try:
+                    self._insert(rows, topics)
+                except sqlite3.IntegrityError:
+                    self._insert_each(rows, topics)
+        except Exception as exc:
+            logger.exception("Failed to write %d posts to SQLite", len(rows))
+            self.error = exc
+        finally:
+            for waiter in waiters:
+                waiter.set()
+
+    def _insert(self, rows: list[tuple], topics: list[tuple]) -> None:
+        """Insert a batch in one transaction with executemany."""
+        conn = self._conn
+        # The write lock is held from BEGIN IMMEDIATE, so the batch gets seqs
+        # first..first + len(rows) - 1 even with other processes writing to the file
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            first = conn.execute(_NEXT_SEQ).fetchone()[0]
+            conn.executemany(_INSERT_POST, rows)
+            conn.executemany(_INSERT_TOPIC, [(topic, first + i) for topic, i in topics])
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _insert_each(self, rows: list[tuple], topics: list[tuple]) -> None:
+        """Insert a batch one row at a time in one transaction, skipping rows that conflict."""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            seqs: list[int | None] = []
+            for row in rows:
+                try:
+                    seqs.append(conn.execute(_INSERT_POST, row).lastrowid)
+                except sqlite3.IntegrityError:
+                    seqs.append(None)
+            conn.executemany(
+                _INSERT_TOPIC, [(topic, seqs[i]) for topic, i in topics if seqs[i] is not None]
+            )
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        skipped = [row[0] for row, seq in zip(rows, seqs) if seq is None]
+        logger.warning("Skipped %d posts violating constraints: %s", len(skipped), skipped[:10])
 
     def add_post(self, post: Post) -> None:
-        """Add a post to persistent storage."""
-        # Placeholder
-        pass
+        """Queue a post for persistence (waits only while max_pending posts are queued)."""
+        if self._queue.qsize() >= self.max_pending:
+            with self._drained:
+                self._drained.wait_for(lambda: self._queue.qsize() < self.max_pending)
+        self._queue.put(post)
+
+    def flush(self) -> None:
+        """
+        Wait until every post queued so far is committed.
+
+        Raises:
+            Exception: the last error a batch failed with since the previous flush
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """Flush, stop the writer and close the database."""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._reader.close()
+
+    def _query(self, sql: str, params: tuple) -> list[Post]:
+        """Posts for a query selecting bodies."""
+        with self._read_lock:
+            rows = self._reader.execute(sql, params).fetchall()
+        return [Post.model_validate_json(body) for (body,) in rows]
 
     def get_post(self, post_id: str) -> Post | None:
         """Get a post by ID."""
-        # Placeholder
-        return None
+        posts = self._query("SELECT body FROM posts WHERE id = ?", (post_id,))
+        return posts[0] if posts else None
 
     def get_recent_posts(self, limit: int = 100) -> list[Post]:
-        """Get recent posts."""
-        # Placeholder
-        return []
+        """Get the most recent posts, oldest first."""
+        posts = self._query("SELECT body FROM posts ORDER BY seq DESC LIMIT ?", (limit,))
+        posts.reverse()
+        return posts
+
+    def get_posts_before(self, before: str | None = None, limit: int = 50) -> list[Post]:
+        """Get posts with IDs below a ULID cursor, newest first."""
+        if before is None:
+            return self._query("SELECT body FROM posts ORDER BY id DESC LIMIT ?", (limit,))
+        return self._query(
+            "SELECT body FROM posts WHERE id < ? ORDER BY id DESC LIMIT ?", (before, limit)
+        )
+
+    def get_posts_by_persona(self, persona_id: str, limit: int = 50) -> list[Post]:
+        """Get recent posts by a persona, oldest first."""
+        posts = self._query(
+            "SELECT body FROM posts WHERE persona_id = ? ORDER BY seq DESC LIMIT ?",
+            (persona_id, limit),
+        )
+        posts.reverse()
+        return posts
+
+    def get_posts_by_topic(self, topic_id: str, limit: int = 50) -> list[Post]:
+        """Get recent posts about a topic, oldest first."""
+        posts = self._query(
+            "SELECT p.body FROM post_topics t JOIN posts p ON p.seq = t.seq "
+            "WHERE t.topic_id = ? ORDER BY t.seq DESC LIMIT ?",
+            (topic_id, limit),
+        )
+        posts.reverse()
+        return posts
+
+    def get_posts_between(self, start: float, end: float, limit: int = 1000) -> list[Post]:
+        """Get posts created in [start, end) (epoch seconds), oldest first."""
+        return self._query(
+            "SELECT body FROM posts WHERE created_at >= ? AND created_at < ? "
+            "ORDER BY created_at LIMIT ?",
+            (start, end, limit),
+        )
+
+    def count(self) -> int:
+        """Count committed posts."""
+        with self._read_lock:
+            (count,) = self._reader.execute("SELECT COUNT(*) FROM posts").fetchone()
+        return int(count)
 
 
 # Global SQLite store instance (lazy init)
@@ -38,5 +322,5 @@ def get_sqlite_store() -> SQLiteStore:
     """Get or create SQLite store instance."""
     global _sqlite_store
     if _sqlite_store is None:
-        _sqlite_store = SQLiteStore()
+        _sqlite_store = SQLiteStore(settings.sqlite_path)
     return _sqlite_store
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""CLI tool for benchmarking post construction and response serialization."""
+
+import argparse
+import asyncio
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from rich.console import Console
+
+# Add the backend directory (parent of scripts/) to the path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.main import app
+from app.responses import ModelResponse
+from app.schemas import GenerateResponse, Post, PostLineage, PostMetrics, StyleMetrics, trusted
+from app.services.generator.batch import batch_generator
+
+console = Console(stderr=True)
+
+
+def best_of(repeat: int, fn: Callable[[], object]) -> float:
+    """Fastest of several timed runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def validated(fields: list[dict]) -> list[Post]:
+    """Posts built through full validation, as the routes used to."""
+    return [
+        Post(
+            **dict(
+                post,
+                style=StyleMetrics(**style),
+                lineage=PostLineage(**lineage),
+                metrics=PostMetrics(**metrics),
+            )
+        )
+        for post, style, lineage, metrics in fields
+    ]
+
+
+def constructed(fields: list[dict]) -> list[Post]:
+    """Posts built with trusted(), as the generators do now."""
+    return [
+        trusted(
+            Post,
+            # dict() keeps the nested models in their declared positions
+            **dict(
+                post,
+                style=trusted(StyleMetrics, **style),
+                lineage=trusted(PostLineage, **lineage),
+                metrics=trusted(PostMetrics, **metrics),
+            ),
+        )
+        for post, style, lineage, metrics in fields
+    ]
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Hurl - Measure per-post construction and /v1/generate serialization cost"
+    )
+    parser.add_argument(
+        "--count",
+        "-n",
+        type=int,
+        default=1000,
+        help="Posts per batch (default: 1000)",
+    )
+    parser.add_argument(
+        "--repeat",
+        "-r",
+        type=int,
+        default=20,
+        help="Timed runs per measurement, best is reported (default: 20)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Seed for the generated batch (default: 42)",
+    )
+
+    args = parser.parse_args()
+
+    console.print(
+        f"[bold blue]Hurl[/bold blue] - Benchmarking {args.count}-post batches "
+        f"(best of {args.repeat})...\n"
+    )
+
+    posts = asyncio.run(
+        batch_generator.generate(
+            count=args.count,
+            mode="emergent",
+            topic_filter=[],
+            persona_ids=[],
+            language_filter=[],
+            toxicity_max=1.0,
+            seed=args.seed,
+        )
+    )
+    fields = []
+    for post in posts:
+        fields.append(
+            (
+                post.__dict__,
+                post.style.__dict__,
+                post.lineage.__dict__,
+                post.metrics.__dict__,
+            )
+        )
+    n = len(posts)
+
+    # What FastAPI does with a returned GenerateResponse and response_model set:
+    # dump, validate again, serialize, then json.dumps
+    route = next(r for r in app.routes if getattr(r, "path", None) == "/v1/generate")
+
+    def fastapi_body(posts: list[Post]) -> bytes:
+        content = asyncio.run(
+            serialize_response(
+                field=route.response_field,
+                response_content=GenerateResponse(posts=posts, count=len(posts), seed=0),
+            )
+        )
+        return JSONResponse(content).body
+
+    def direct_body(posts: list[Post]) -> bytes:
+        return ModelResponse(
+            GenerateResponse.model_construct(posts=posts, count=len(posts), seed=0)
+        ).body
+
+    ref = validated(fields)
+    fast = constructed(fields)
+    if fastapi_body(ref) != direct_body(fast):
+        console.print("[red]Response bodies differ[/red]")
+        sys.exit(1)
+
+    rows = [
+        (
+            "Build posts",
+            best_of(args.repeat, lambda: validated(fields)),
+            best_of(args.repeat, lambda: constructed(fields)),
+        ),
+        (
+            "Serialize response",
+            best_of(args.repeat, lambda: fastapi_body(ref)),
+            best_of(args.repeat, lambda: direct_body(fast)),
+        ),
+    ]
+    rows.append(("Total", sum(r[1] for r in rows), sum(r[2] for r in rows)))
+
+    for name, before, after in rows:
+        console.print(
+            f"  [dim]{name}:[/dim] {before / n * 1e6:.2f} -> {after / n * 1e6:.2f} µs/post "
+            f"({before / after:.1f}x, {(before - after) / n * 1e6:.2f} µs/post saved)"
+        )
+    console.print("\n[green]Response bodies are byte-identical[/green]")
+
+
+if __name__ == "__main__":
+    main()
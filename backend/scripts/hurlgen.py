@@ -4,6 +4,7 @@
 import argparse
 import asyncio
 import sys
+from datetime import datetime
 
 import orjson
 from rich.console import Console
@@ -12,8 +13,10 @@ from rich.progress import track
 # Add parent directory to path for imports
 sys.path.insert(0, "/home/user/hurl.lol")
 
-from app.schemas import GenerateRequest
-from app.routers.posts import generate_single_post
+from app.config import settings
+from app.services.generator.batch import batch_generator
+from app.services.personas import persona_registry
+from app.services.scheduler import PostingScheduler
 
 console = Console()
 
@@ -66,6 +69,13 @@ async def main():
         default=None,
         help="Random seed for reproducibility",
     )
+    parser.add_argument(
+        "--start",
+        type=datetime.fromisoformat,
+        default=None,
+        help="Simulate posting from this ISO 8601 time: personas post at their own "
+        "rates and posts carry simulated timestamps",
+    )
     parser.add_argument(
         "--output",
         choices=["ndjson", "json", "text"],
@@ -80,24 +90,27 @@ async def main():
         f"[bold blue]Hurl[/bold blue] - Generating {args.count} posts in {args.mode} mode...\n"
     )
 
-    posts = []
-    for i in track(range(args.count), description="Generating..."):
-        post_seed = (args.seed + i) if args.seed is not None else None
-
-        persona_id = None
-        if args.personas:
-            # Simple round-robin if multiple personas specified
-            persona_id = args.personas[i % len(args.personas)]
+    scheduler = None
+    if args.start is not None:
+        scheduler = PostingScheduler.for_table(
+            persona_registry.table, start=args.start.timestamp(), seed=args.seed
+        )
 
-        post = await generate_single_post(
-            persona_id=persona_id,
+    posts = []
+    for start in track(
+        range(0, args.count, settings.max_batch_size), description="Generating..."
+    ):
+        batch = await batch_generator.generate(
+            count=min(settings.max_batch_size, args.count - start),
             mode=args.mode,
             topic_filter=args.topics or [],
+            persona_ids=args.personas or [],
             language_filter=args.languages,
             toxicity_max=args.toxicity_max,
-            seed=post_seed,
+            seed=args.seed + start if args.seed is not None else None,
+            scheduler=scheduler,
         )
-        posts.append(post)
+        posts.extend(batch)
 
     # Output
     if args.output == "ndjson":
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""CLI tool for training Markov models on large text corpora."""
+
+import argparse
+import sys
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+from rich.console import Console
+
+# Add the backend directory (parent of scripts/) to the path for imports
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.generator.markov import DEFAULT_CHUNK_TOKENS, MarkovChain
+
+console = Console(stderr=True)
+
+
+def stream_lines(paths: list[str]) -> Iterator[str]:
+    """Yield lines from each file in turn ("-" reads stdin)."""
+    for path in paths:
+        if path == "-":
+            yield from sys.stdin
+            continue
+
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield from f
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description="Hurl - Train a Markov model and write it as a memory-mappable file"
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Text files to train on, one text per line (- for stdin)",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        required=True,
+        help="Model file to write (load with HURL_MARKOV_MODEL)",
+    )
+    parser.add_argument(
+        "--order",
+        type=int,
+        default=4,
+        help="Longest context length (default: 4)",
+    )
+    parser.add_argument(
+        "--min-order",
+        type=int,
+        default=1,
+        help="Shortest context length to back off to (default: 1)",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=DEFAULT_CHUNK_TOKENS,
+        help=f"Tokens buffered between count merges (default: {DEFAULT_CHUNK_TOKENS})",
+    )
+
+    args = parser.parse_args()
+
+    console.print(
+        f"[bold blue]Hurl[/bold blue] - Training order {args.min_order}-{args.order} Markov model "
+        f"on {len(args.inputs)} input(s)...\n"
+    )
+
+    start = time.perf_counter()
+    chain = MarkovChain(order=args.order, min_order=args.min_order)
+    chain.train(stream_lines(args.inputs), chunk_tokens=args.chunk_tokens)
+    chain.save(args.output)
+
+    console.print(
+        f"  [dim]Vocabulary:[/dim] {len(chain.vocab)}\n"
+        f"  [dim]States:[/dim] {chain.num_states}\n"
+        f"  [dim]Transitions:[/dim] {len(chain.successors)}\n"
+        f"  [dim]Elapsed:[/dim] {time.perf_counter() - start:.1f}s\n"
+        f"\n[green]Wrote {args.output}[/green]"
+    )
+
+
+if __name__ == "__main__":
+    main()
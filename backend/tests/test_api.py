@@ -5,6 +5,7 @@ import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.schemas import GenerateResponse, PostPageResponse
 
 
 @pytest.fixture
@@ -22,6 +23,18 @@ def test_health_check(client):
     assert "version" in data
 
 
+def test_lifespan_reentry(monkeypatch):
+    """Test the app keeps serving after its lifespan has already run once in this process."""
+    from app.services.topics import topic_graph
+
+    monkeypatch.setattr(topic_graph, "resolution_s", 0.0)  # every read schedules an advance
+    for _ in range(2):
+        with TestClient(app) as client:
+            assert client.get("/v1/topics").status_code == 200
+            assert client.get("/v1/admin/trends").status_code == 200
+            assert client.post("/v1/generate", json={"count": 5, "seed": 1}).status_code == 200
+
+
 def test_list_topics(client):
     """Test topics listing."""
     response = client.get("/v1/topics")
@@ -96,6 +109,63 @@ def test_sample_endpoint(client):
     data = response.json()
     assert len(data["posts"]) == 3
 
+    # Unknown modes are rejected before any post is built
+    assert client.get("/v1/sample?mode=foo").status_code == 422
+    assert client.get("/v1/stream?mode=foo").status_code == 422
+
+
+def test_post_thread(client):
+    """Test generated replies and quotes can be fetched as a thread."""
+    posts = []
+    for seed in (7, 8):
+        response = client.post("/v1/generate", json={"count": 50, "mode": "emergent", "seed": seed})
+        posts += response.json()["posts"]
+    child = next(p for p in posts if p["parent_id"])
+    assert child["kind"] in ("reply", "quote")
+
+    response = client.get(f"/v1/posts/{child['id']}/thread")
+    assert response.status_code == 200
+    data = response.json()
+    ids = [p["id"] for p in data["posts"]]
+    assert data["count"] == len(ids)
+    assert ids[0] == data["root_id"]
+    assert data["posts"][0]["parent_id"] not in ids
+    assert ids.index(child["parent_id"]) < ids.index(child["id"])
+
+    assert client.get("/v1/posts/missing/thread").status_code == 404
+
+
+def test_list_posts_pagination(client):
+    """Test paging backwards through stored posts with a ULID cursor."""
+    client.post("/v1/generate", json={"count": 20, "mode": "pure_random", "seed": 11})
+
+    first = client.get("/v1/posts?limit=5").json()
+    assert first["count"] == 5
+    ids = [p["id"] for p in first["posts"]]
+    assert ids == sorted(ids, reverse=True)
+
+    second = client.get(f"/v1/posts?before={first['next_before']}&limit=5").json()
+    assert second["posts"][0]["id"] < ids[-1]
+    assert not set(ids) & {p["id"] for p in second["posts"]}
+
+    # Cursors are case-insensitive; anything but a ULID is rejected
+    lower = client.get(f"/v1/posts?before={first['next_before'].lower()}&limit=5").json()
+    assert lower == second
+    for cursor in ["abc", "I" * 26, "8" + "0" * 25, first["next_before"] + "0"]:
+        assert client.get(f"/v1/posts?before={cursor}").status_code == 422
+
+
+def test_post_responses_match_schema(client):
+    """Test that directly serialized post bodies are exactly what the response models produce."""
+    response = client.post("/v1/generate", json={"count": 50, "seed": 13})
+    assert response.headers["content-type"] == "application/json"
+    expected = GenerateResponse.model_validate_json(response.content).model_dump_json()
+    assert response.content == expected.encode()
+
+    response = client.get("/v1/posts?limit=10")
+    expected = PostPageResponse.model_validate_json(response.content).model_dump_json()
+    assert response.content == expected.encode()
+
 
 def test_create_persona(client):
     """Test custom persona creation."""
@@ -129,6 +199,33 @@ def test_inject_shock(client):
     assert "message" in data
 
 
+def test_inject_shocks_bulk(client):
+    """Test bulk shock injection."""
+    response = client.post(
+        "/v1/admin/shocks",
+        json={
+            "shocks": [
+                {"topic_id": "ai", "magnitude": 2.0, "half_life_s": 60.0},
+                {"topic_id": "crypto", "magnitude": 1.0},
+            ]
+        },
+    )
+    assert response.status_code == 201
+    assert response.json()["injected"] == 2
+
+    # Unknown topics reject the whole batch
+    response = client.post(
+        "/v1/admin/shocks",
+        json={
+            "shocks": [
+                {"topic_id": "ai", "magnitude": 1.0},
+                {"topic_id": "nope", "magnitude": 1.0},
+            ]
+        },
+    )
+    assert response.status_code == 404
+
+
 def test_get_trends(client):
     """Test trends snapshot."""
     response = client.get("/v1/admin/trends")
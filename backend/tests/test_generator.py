@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """Generator tests."""
 
+import numpy as np
 import pytest
 
 from app.schemas import PersonaStyle
@@ -20,6 +21,18 @@ def test_rng_determinism():
     assert value1 == value2
 
 
+def test_rng_stream_determinism():
+    """Test per-post RNG streams are reproducible and independent."""
+    first = rng_manager.stream(42, 0).random(4)
+    again = rng_manager.stream(42, 0).random(4)
+    other = rng_manager.stream(42, 1).random(4)
+
+    assert (first == again).all()
+    assert not (first == other).all()
+    # Successive draws from one stream differ
+    assert len(set(first.tolist())) == 4
+
+
 def test_text_generation():
     """Test basic text generation."""
     persona = persona_registry.get_random_personas(1, seed=42)[0]
@@ -74,6 +87,28 @@ def test_persona_creation():
     assert len(all_personas) >= 100  # Should have 100+ seed personas
 
 
+def test_persona_table():
+    """Test columnar persona table mirrors the registry."""
+    from app.services.personas import PersonaTable
+
+    all_personas = persona_registry.get_all_personas()
+    table = PersonaTable(capacity=4)  # forces several grows
+    for persona in all_personas:
+        table.add(persona)
+
+    assert len(table) == len(all_personas)
+    rows = np.arange(len(table))
+    persona = all_personas[-1]
+    assert table.ids[-1] == persona.id
+    assert table.column("toxicity")[-1] == np.float32(persona.toxicity)
+    assert table.column("reading_level")[-1] == persona.style.reading_level
+
+    interests = table.interest_matrix(rows, ["ai", "not_a_topic"])
+    expected = [p.interests.get("ai", 0.0) for p in all_personas]
+    assert np.allclose(interests[:, 0], expected)
+    assert not interests[:, 1].any()
+
+
 def test_markov_chain():
     """Test Markov chain generation."""
     from app.services.generator.core import MarkovChain
@@ -92,6 +127,76 @@ def test_markov_chain():
     assert len(result.split()) >= 2
 
 
+def test_markov_chain_weighted_sampling():
+    """Test alias-table sampling follows successor counts."""
+    from app.services.generator.core import MarkovChain
+    from app.services.rng import rng_manager
+
+    chain = MarkovChain(order=2)
+    chain.train(["a b c"] * 3 + ["a b d"])
+
+    row = chain.find_state((chain.token_ids["a"], chain.token_ids["b"]))
+    assert row >= 0
+    assert chain.find_state((chain.token_ids["b"], chain.token_ids["a"])) == -1
+
+    rng = rng_manager.stream(42)
+    draws = [chain.vocab[chain.sample_successor(row, rng)] for _ in range(4000)]
+    assert set(draws) == {"c", "d"}
+    assert 0.7 < draws.count("c") / len(draws) < 0.8
+
+
+def test_markov_chain_backoff():
+    """Test variable-order chain backs off to shorter contexts."""
+    from app.services.generator.markov import MarkovChain
+
+    chain = MarkovChain(order=3, min_order=1)
+    chain.train(["the quick brown fox jumps", "a lazy dog sleeps"])
+
+    # Full order-3 context
+    assert chain.generate(["the", "quick", "brown"], max_length=5, rng_seed=1) == (
+        "the quick brown fox jumps"
+    )
+    # Unknown leading words back off to the known suffix
+    assert chain.generate(["Hot", "take:", "lazy"], max_length=5, rng_seed=1) == (
+        "Hot take: lazy dog sleeps"
+    )
+    # Seed words are matched case-insensitively without punctuation
+    assert chain.generate(["Lazy!"], max_length=3, rng_seed=1) == "Lazy! dog sleeps"
+
+
+def test_markov_chain_save_load(tmp_path):
+    """Test streaming training and memory-mapped model round trip."""
+    from app.services.generator.markov import MappedVocab, MarkovChain
+
+    corpus = ["the quick brown fox", "the quick red fox", "the slow brown dog"] * 20
+    chain = MarkovChain(order=2)
+    chain.train(iter(corpus), chunk_tokens=10)
+
+    # Chunked counting merges to the same model as one pass
+    whole = MarkovChain(order=2)
+    whole.train(corpus)
+    assert np.array_equal(chain.successors, whole.successors)
+    assert np.array_equal(chain._counts, whole._counts)
+
+    path = tmp_path / "model.hmk"
+    chain.save(path)
+    loaded = MarkovChain.load(path)
+
+    assert isinstance(loaded.vocab, MappedVocab)
+    assert loaded.num_states == chain.num_states
+    assert loaded.token_ids.get("quick") == chain.token_ids["quick"]
+    assert loaded.token_ids.get("missing", -1) == -1
+
+    result1 = chain.generate(["the", "quick"], max_length=5, rng_seed=42)
+    result2 = loaded.generate(["the", "quick"], max_length=5, rng_seed=42)
+    assert result1 == result2
+
+    with pytest.raises(RuntimeError):
+        loaded.train(corpus)
+    with pytest.raises(RuntimeError):
+        loaded.intern("new")
+
+
 def test_template_filling():
     """Test template filling."""
     result = text_generator.fill_template(
@@ -102,6 +207,45 @@ def test_template_filling():
     assert "Hot take:" in result
 
 
+def test_compiled_template():
+    """Test templates are parsed into segments and slots."""
+    from app.services.generator.core import CompiledTemplate
+
+    template = CompiledTemplate("{topic}? More like {negative_prefix}{topic}")
+
+    assert template.fields == ("topic", "negative_prefix")
+    assert template.render({"topic": "AI", "negative_prefix": "un-"}) == "AI? More like un-AI"
+
+    with pytest.raises(ValueError):
+        CompiledTemplate("{topic} is {nonexistent}")
+
+
+def test_template_pack_loading(tmp_path):
+    """Test loading an external template pack."""
+    from app.services.generator.core import SLOT_VOCABULARY, TextGenerator
+
+    pack = tmp_path / "pack.json"
+    pack.write_text('{"hot_take": ["Pack take: {topic} is {adjective}"]}')
+
+    generator = TextGenerator()
+    before = len(generator.templates["hot_take"])
+
+    assert generator.load_template_pack(pack) == 1
+    assert len(generator.templates["hot_take"]) == before + 1
+    assert generator.templates["hot_take"][-1].fields == ("topic", "adjective")
+
+    # Batch slot draws are sized by the widest template, packs included
+    wide = tmp_path / "wide.json"
+    wide.write_text('{"hot_take": ["{topic} %s"]}' % " ".join(f"{{{f}}}" for f in SLOT_VOCABULARY))
+    generator.load_template_pack(wide)
+    assert generator.max_fields == len(SLOT_VOCABULARY) + 1
+
+    bad = tmp_path / "bad.json"
+    bad.write_text('{"not_a_category": ["{topic}"]}')
+    with pytest.raises(ValueError):
+        generator.load_template_pack(bad)
+
+
 def test_toxicity_sanitization():
     """Test toxicity filtering."""
     from app.schemas import Persona, PersonaBehavior, PersonaStances
@@ -122,3 +266,744 @@ def test_toxicity_sanitization():
 
     # Should be masked
     assert "d*mn" in sanitized or "damn" not in sanitized
+
+
+@pytest.mark.asyncio
+async def test_batch_generation():
+    """Test vectorized batch generation."""
+    from app.services.generator.batch import batch_generator
+
+    posts = await batch_generator.generate(
+        count=50,
+        mode="emergent",
+        topic_filter=["ai", "crypto"],
+        persona_ids=[],
+        language_filter=["en"],
+        toxicity_max=1.0,
+        seed=42,
+    )
+
+    assert len(posts) == 50
+    for post in posts:
+        assert post.text
+        assert 1 <= len(post.topics) <= 2
+        assert set(post.topics) <= {"ai", "crypto"}
+
+
+@pytest.mark.asyncio
+async def test_batch_generation_determinism():
+    """Test batch generation determinism in pure_random mode."""
+    from app.services.generator.batch import batch_generator
+
+    args = dict(
+        count=20,
+        mode="pure_random",
+        topic_filter=[],
+        persona_ids=[],
+        language_filter=["en"],
+        toxicity_max=1.0,
+        seed=7,
+    )
+    texts1 = [p.text for p in await batch_generator.generate(**args)]
+    texts2 = [p.text for p in await batch_generator.generate(**args)]
+
+    assert texts1 == texts2
+
+
+@pytest.mark.asyncio
+async def test_batch_generation_simulated():
+    """Test batches continuing a posting simulation carry simulated timestamps."""
+    from app.services.generator.batch import batch_generator
+    from app.services.scheduler import PostingScheduler
+
+    start = 1_700_000_000.0
+    scheduler = PostingScheduler.for_table(persona_registry.table, start=start, seed=42)
+    args = dict(
+        count=20,
+        mode="pure_random",
+        topic_filter=[],
+        persona_ids=[],
+        language_filter=["en"],
+        toxicity_max=1.0,
+        scheduler=scheduler,
+    )
+    first = await batch_generator.generate(seed=1, **args)
+    second = await batch_generator.generate(seed=2, **args)
+
+    stamps = [p.created_at.timestamp() for p in first + second]
+    assert stamps == sorted(stamps) and stamps[0] > start
+    assert stamps[-1] == pytest.approx(scheduler.now)
+
+
+@pytest.mark.asyncio
+async def test_batch_generation_late_personas():
+    """Test a persistent scheduler skips personas created after it was built."""
+    from app.schemas import CreatePersonaRequest
+    from app.services.generator.batch import batch_generator
+    from app.services.scheduler import PostingScheduler
+
+    persona_registry.create_persona(
+        CreatePersonaRequest(display_name="Toxic", handle="toxic", toxicity=0.9)
+    )
+    scheduler = PostingScheduler.for_table(persona_registry.table, seed=42)
+    late = persona_registry.create_persona(
+        CreatePersonaRequest(display_name="Late", handle="late", toxicity=0.0)
+    )
+
+    posts = await batch_generator.generate(
+        count=20,
+        mode="pure_random",
+        topic_filter=[],
+        persona_ids=[],
+        language_filter=["en"],
+        toxicity_max=0.5,
+        seed=3,
+        scheduler=scheduler,
+    )
+    assert len(posts) == 20
+    assert late.id not in {post.persona_id for post in posts}
+
+
+@pytest.mark.asyncio
+async def test_batch_generation_drops_unfillable_posts():
+    """Test posts that stay over toxicity_max are dropped instead of returned."""
+    from app.services.generator.batch import batch_generator
+
+    table = persona_registry.table
+    row = int(np.argmax(table.column("toxicity")))
+    toxic = table.ids[row]
+    toxicity_max = float(table.column("toxicity")[row]) - 0.01
+    args = dict(
+        count=20,
+        mode="pure_random",
+        topic_filter=[],
+        language_filter=["en"],
+        toxicity_max=toxicity_max,
+        seed=5,
+    )
+
+    assert await batch_generator.generate(persona_ids=[toxic], **args) == []
+    posts = await batch_generator.generate(persona_ids=[], **args)
+    assert len(posts) == 20
+    assert all(post.toxicity <= toxicity_max for post in posts)
+
+
+def test_batch_metrics_topic_boost():
+    """Test batch metrics give the topic boost only to posts with topics, like single posts."""
+    from app.services.generator.metrics import metrics_simulator
+
+    influence = np.full(200, 0.5)
+    words = np.full(200, 10.0)
+    has_topics = np.arange(200) % 2 == 0
+
+    def impressions(mask):
+        rng = np.random.default_rng(3)
+        return metrics_simulator.simulate_batch(influence, words, mask, rng)["impressions"]
+
+    boosted = impressions(np.ones(200, dtype=bool))
+    mixed = impressions(has_topics)
+    assert (mixed[has_topics] == boosted[has_topics]).all()
+    assert (mixed[~has_topics] <= boosted[~has_topics]).all()
+    assert (mixed[~has_topics] < boosted[~has_topics]).any()
+
+
+def test_posting_scheduler():
+    """Test scheduled posts follow persona rates, with bursts when bursty."""
+    from app.services.scheduler import PostingScheduler
+
+    hours = 400
+    counts = {}
+    for burstiness in (0.0, 1.0):
+        scheduler = PostingScheduler(
+            np.array([2.0] * 50 + [0.0]), np.full(51, burstiness), seed=42
+        )
+        times, rows = zip(*scheduler.run(hours * 3600.0))
+        assert list(times) == sorted(times)
+        assert 50 not in rows  # zero rate never posts
+        hourly = np.histogram2d(
+            rows, times, bins=(50, hours), range=((0, 50), (0, hours * 3600))
+        )[0]
+        assert hourly.mean() == pytest.approx(2.0, rel=0.05)
+        counts[burstiness] = hourly.var() / hourly.mean()
+
+    assert counts[0.0] == pytest.approx(1.0, abs=0.1)  # Poisson
+    assert counts[1.0] > 5.0  # self-exciting bursts
+
+    eligible = np.arange(51) % 2 == 0
+    times, rows = scheduler.take(100, eligible)
+    assert eligible[rows].all() and (np.diff(times) >= 0).all()
+
+    with pytest.raises(IndexError):
+        PostingScheduler(np.zeros(3), np.zeros(3), seed=1).pop()
+
+
+def test_topic_adoption_vector():
+    """Test vectorized adoption matches the per-topic formula."""
+    import math
+
+    from scipy.special import expit
+
+    from app.services.topics import topic_graph
+    from app.services.trends import trend_engine
+
+    interests = {"ai": 0.9, "crypto": 0.3, "not_a_topic": 1.0}
+    peer = {"ai": 0.2, "music": 0.1}
+    recent = ["crypto", "ai", "crypto"]
+
+    probs = trend_engine.compute_topic_adoption_prob(interests, peer, recent)
+    assert list(probs) == topic_graph.topic_ids
+
+    for topic_id, prob in probs.items():
+        recency = math.exp(-recent.index(topic_id) / 3.0) if topic_id in recent else 0.0
+        expected = expit(
+            trend_engine.alpha * topic_graph.get_trend_score(topic_id)
+            + trend_engine.beta * peer.get(topic_id, 0.0)
+            + trend_engine.gamma * interests.get(topic_id, 0.0)
+            - trend_engine.delta * recency
+        )
+        assert prob == pytest.approx(expected)
+
+
+def test_topic_graph_tick():
+    """Test lazy trend evolution is independent of advance cadence."""
+    from app.services.topics import BASELINE_SCORE, TopicGraph
+
+    topics = [{"id": tid, "name": tid.upper(), "tags": []} for tid in ("a", "b", "c")]
+    edges = [("a", "c", 1.0), ("b", "c", 0.5)]
+    coarse, fine = TopicGraph(topics, edges), TopicGraph(topics, edges)
+    start = 1000.0
+    for graph in (coarse, fine):
+        graph.now = lambda: start
+        graph._state.publish(np.array([2.0, 4.0, 0.0]), np.zeros(3), start)
+        graph.inject_shocks(["a"], [3.0], [20.0])
+
+    # One 60s advance matches sixty 1s advances
+    coarse.advance(start + 60)
+    for step in range(1, 61):
+        fine.advance(start + step)
+    assert coarse.snapshot().scores == pytest.approx(fine.snapshot().scores, rel=1e-9)
+    assert coarse.get_trend_score("missing") == 0.0
+
+    # Far past the horizon the state settles on the fixed point of the tick update
+    coarse.advance(start + 1e6)
+    scores = coarse.snapshot().scores
+    d, w = coarse.recency_decay, coarse._neighbor_weights
+    settled = d * (coarse.alpha * scores + coarse.beta * (w @ scores))
+    assert scores == pytest.approx(settled + (1 - d) * BASELINE_SCORE)
+    assert scores[2] > scores[0]  # c is fed by its in-edges
+
+
+def test_gumbel_top_k_sampling():
+    """Test Gumbel top-k samples without replacement in proportion to weight."""
+    from app.services.sampling import gumbel_top_k
+
+    rng = rng_manager.stream(42)
+    weights = np.array([0.0, 1.0, 3.0, 6.0])
+    top, valid = gumbel_top_k(np.tile(weights, (20000, 1)), 2, rng)
+
+    assert top.shape == (20000, 2) and valid.all()
+    assert (top[:, 0] != top[:, 1]).all()
+    assert not (top == 0).any()  # zero weight is never drawn
+    first = np.bincount(top[:, 0], minlength=4) / len(top)
+    assert first[1:] == pytest.approx([0.1, 0.3, 0.6], abs=0.02)
+
+    # Asking for more than the non-zero entries marks the rest invalid
+    _, valid = gumbel_top_k(np.array([0.0, 2.0, 0.0]), 3, rng)
+    assert valid.tolist() == [True, False, False]
+
+
+def test_alias_table_sampling():
+    """Test alias tables reproduce a fixed distribution."""
+    from app.services.sampling import AliasTable
+
+    table = AliasTable.from_dict({"en": 0.7, "es": 0.2, "fr": 0.1})
+    rng = rng_manager.stream(42)
+
+    draws = table.sample(rng, size=20000)
+    assert np.bincount(draws, minlength=3) / len(draws) == pytest.approx([0.7, 0.2, 0.1], abs=0.02)
+    assert table.sample_label(rng) in {"en", "es", "fr"}
+
+    unlabeled = AliasTable(np.array([1.0, 3.0]))
+    assert unlabeled.sample(rng) in {0, 1}
+    with pytest.raises(ValueError):
+        unlabeled.sample_label(rng)
+
+
+def test_adoption_cache():
+    """Test adoption inputs are memoized per trend epoch."""
+    from app.services.topics import topic_graph
+    from app.services.trends import trend_engine
+
+    persona = persona_registry.get_random_personas(1, seed=42)[0]
+    cache = trend_engine.adoption_cache
+
+    candidates, base = trend_engine.adoption_base(persona, ["crypto", "ai"])
+    again = trend_engine.adoption_base(persona, ["ai", "crypto"])
+    assert again[1] is base  # filter order does not matter
+    assert [topic_graph.topic_ids[i] for i in candidates] == ["ai", "crypto"]
+
+    # Same probabilities as the uncached path
+    peer = np.array([0.1, 0.2])
+    probs = trend_engine.compute_candidate_adoption(candidates, base, peer, ["crypto"])
+    expected = trend_engine.compute_topic_adoption_prob(
+        persona.interests, {"ai": 0.1, "crypto": 0.2}, ["crypto"]
+    )
+    assert probs.tolist() == pytest.approx([expected["ai"], expected["crypto"]])
+
+    # Shocks (and ticks) move the epoch and invalidate the cache
+    topic_graph.inject_shock("ai", 1.0, 60.0)
+    assert trend_engine.adoption_base(persona, ["ai", "crypto"])[1] is not base
+    assert len(cache) == 1
+
+
+def test_topic_snapshot():
+    """Test topic snapshots are versioned per tick and cache their JSON."""
+    import orjson
+
+    from app.services.topics import TopicGraph
+
+    graph = TopicGraph()
+    snapshot = graph.snapshot()
+
+    assert snapshot.name("ai") == "Artificial Intelligence"
+    assert snapshot.name("unknown") == "unknown"
+    assert snapshot.topic("crypto").related == ["web3", "stocks", "privacy"]
+    assert snapshot.list_json() is snapshot.list_json()
+    assert orjson.loads(snapshot.list_json())["count"] == len(graph.topic_ids)
+    with pytest.raises(ValueError):
+        snapshot.scores[0] = 1.0
+
+    graph.inject_shock("ai", 5.0, 60.0)
+    graph.fast_forward(30.0)
+    assert graph.snapshot().version > snapshot.version
+    assert graph.snapshot().topic("ai").trend_score > snapshot.topic("ai").trend_score
+
+
+def test_background_advance():
+    """Test stale reads are served the current snapshot while a worker advances."""
+    from app.services.topics import TopicGraph, trend_swap_lag
+
+    graph = TopicGraph()
+    graph.inject_shock("ai", 5.0, 60.0)
+    stale = graph.snapshot()
+    lag_total = trend_swap_lag._sum.get()
+
+    graph._state.time_offset += 30.0
+    graph.snapshot()  # schedules an advance on the worker, does not run it
+    graph.wait()
+
+    fresh = graph.snapshot()
+    assert fresh.version == stale.version + 1
+    assert fresh.topic("ai").trend_score != stale.topic("ai").trend_score
+    assert len(fresh.velocities) == len(fresh.scores)
+    assert trend_swap_lag._sum.get() > lag_total
+    graph.shutdown()
+
+
+def test_shared_trend_state():
+    """Test graphs attached to one shared segment see each other's shocks."""
+    import os
+
+    from app.services.topics import TopicGraph
+
+    name = f"hurl_test_trends_{os.getpid()}"
+    first = TopicGraph(shm_name=name)
+    second = TopicGraph(shm_name=name)
+    try:
+        first.inject_shock("ai", 5.0, 60.0)
+        first.fast_forward(30.0)
+
+        # Clock, shocks, epoch and scores are all shared
+        assert second.now() == pytest.approx(first.now(), abs=1.0)
+        assert len(second._state.shocks) == 1
+        assert second.epoch == first.epoch
+        assert second.snapshot().version == first.snapshot().version
+        assert second.get_trend_score("ai") == first.get_trend_score("ai") > 0.1
+
+        with pytest.raises(ValueError):
+            TopicGraph(topics=[{"id": "a", "name": "A", "tags": []}], edges=[], shm_name=name)
+
+        # A shut-down graph restarts its worker and reattaches on next use
+        second.shutdown()
+        second.resolution_s = 0.0
+        second.refresh()
+        second.wait()
+        assert len(second._state.shocks) == 1
+    finally:
+        second.shutdown()
+        first.shutdown()
+        first._state.unlink()
+
+
+def test_follower_graph(monkeypatch):
+    """Test the follower graph is power-law and posts reach followers' exposure."""
+    from scipy import sparse
+
+    from app.services import social
+    from app.services.social import FollowerGraph
+
+    rng = rng_manager.stream(42)
+    graph = FollowerGraph.generate(rng.random(2000), 4, mean_degree=10, rng=rng)
+    in_degree = np.diff(graph.followers.indptr)
+    assert graph.followers.diagonal().sum() == 0  # nobody follows themselves
+    assert in_degree.max() > 20 * np.median(in_degree)
+
+    author = int(np.argmax(in_degree))
+    followers = graph.followers_of(author)
+    assert (graph.exposure(followers) == 0.0).all()
+
+    # Decay follows post timestamps, however far they are from the wall clock
+    start = 1_000_000_000.0
+    graph.observe(author, [1, 3], at=start)
+    exposure = graph.exposure(followers)
+    assert (exposure[:, [1, 3]] == 1.0).all() and (exposure[:, [0, 2]] == 0.0).all()
+    half_life = social.EXPOSURE_HALF_LIFE_S
+    assert graph.exposure(followers[0], at=start + half_life)[1] == pytest.approx(0.5)
+    graph.observe(author, [1], at=start + 100 * half_life)  # rebases the matrix
+    assert graph.exposure(followers[0])[[1, 3]] == pytest.approx([1.0, 0.0])
+    assert (graph.peer_influence([2000, followers[0]])[0] == 0.0).all()  # unknown row
+
+    # Hubs are pulled by readers instead of pushed, with the same result
+    monkeypatch.setattr(social, "FANOUT_LIMIT", 1)
+    followers = sparse.csr_matrix(np.array([[0, 1, 1], [0, 0, 1], [0, 0, 0]], dtype=np.int8))
+    hubbed = FollowerGraph(followers, 2)
+    assert hubbed.hubs.tolist() == [0]
+    hubbed.observe(0, [1])
+    hubbed.observe(1, [0])
+    assert hubbed.exposure([1, 2]) == pytest.approx(np.array([[0.0, 1.0], [1.0, 1.0]]), rel=1e-4)
+    assert hubbed.exposure(2) == pytest.approx([1.0, 1.0], rel=1e-4)
+
+
+def test_stored_posts_drive_peer_influence():
+    """Test posts added to the store raise peer influence for the author's followers."""
+    from datetime import datetime, timezone
+
+    from app.schemas import Post, PostLineage, PostMetrics, StyleMetrics
+    from app.services.topics import topic_graph
+    from app.store.memory import memory_store
+
+    followers_of = persona_registry.followers.followers_of
+    author = next(r for r in range(len(persona_registry.table)) if len(followers_of(r)))
+    follower = int(followers_of(author)[0])
+    before = persona_registry.peer_influence(follower)
+
+    memory_store.add_post(
+        Post(
+            id="01PEERINFLUENCETEST0000000",
+            text="hello",
+            persona_id=persona_registry.table.ids[author],
+            created_at=datetime.now(timezone.utc),
+            mode="emergent",
+            topics=["ai"],
+            language="en",
+            style=StyleMetrics(),
+            lineage=PostLineage(template="t"),
+            metrics=PostMetrics(),
+            toxicity=0.0,
+        )
+    )
+
+    ai = topic_graph.topic_index["ai"]
+    assert persona_registry.peer_influence(follower)[ai] > before[ai]
+
+
+def test_thread_index():
+    """Test the store's thread index follows replies and quotes and survives eviction."""
+    from datetime import datetime, timezone
+
+    from app.schemas import Post
+    from app.store.memory import MemoryStore
+
+    def post(post_id, kind="post", parent_id=None):
+        return Post(
+            id=post_id,
+            text=post_id,
+            persona_id="p",
+            created_at=datetime.now(timezone.utc),
+            mode="emergent",
+            topics=["ai"],
+            language="en",
+            kind=kind,
+            parent_id=parent_id,
+        )
+
+    store = MemoryStore(max_size=5)
+    store.add_post(post("root"))
+    store.add_post(post("a", "reply", "root"))
+    store.add_post(post("b", "quote", "root"))
+    store.add_post(post("a1", "reply", "a"))
+    store.add_post(post("other"))
+
+    # Depth-first from the root, siblings oldest first, from any member
+    thread = [p.id for p in store.get_thread("a1")]
+    assert thread == ["root", "a", "a1", "b"]
+    assert store.get_post("root").replies == 1
+    assert store.get_post("root").quotes == 1
+    assert [p.id for p in store.get_thread("other")] == ["other"]
+    assert store.get_thread("missing") is None
+
+    # Evicting the root splits the thread; evicting a child unlinks it
+    store.add_post(post("x"))
+    assert [p.id for p in store.get_thread("a1")] == ["a", "a1"]
+    assert [p.id for p in store.get_thread("b")] == ["b"]
+    store.add_post(post("y"))
+    assert [p.id for p in store.get_thread("a1")] == ["a1"]
+    assert "a" not in store._children
+
+
+def test_store_lookup_indexes():
+    """Test persona and topic lookups match a scan of the window after evictions."""
+    from datetime import datetime, timezone
+
+    from app.schemas import Post
+    from app.store.memory import MemoryStore
+
+    rng = np.random.default_rng(3)
+    store = MemoryStore(max_size=50)
+    for i in range(200):
+        store.add_post(
+            Post(
+                id=f"{i:026d}",
+                text="x",
+                persona_id=f"p{rng.integers(0, 5)}",
+                created_at=datetime.now(timezone.utc),
+                mode="pure_random",
+                topics=[f"t{j}" for j in rng.integers(0, 4, size=2)],  # may repeat
+                language="en",
+            )
+        )
+
+    window = store.get_all_posts()
+    for key in range(5):
+        scan = [p.id for p in window if p.persona_id == f"p{key}"]
+        assert [p.id for p in store.get_posts_by_persona(f"p{key}", limit=7)] == scan[-7:]
+        scan = [p.id for p in window if f"t{key}" in p.topics]
+        assert [p.id for p in store.get_posts_by_topic(f"t{key}", limit=100)] == scan
+    assert sum(len(ids) for ids in store._by_persona.values()) == 50
+    assert store.get_posts_by_persona("nobody") == []
+
+
+def test_store_cursor_pagination():
+    """Test ULID cursor pages and recent reads cover the window after evictions."""
+    from datetime import datetime, timezone
+
+    from app.schemas import Post
+    from app.services.ids import post_ids
+    from app.store.memory import MemoryStore
+
+    store = MemoryStore(max_size=30)
+    ids = [post_ids.new_id() for _ in range(100)]
+    assert ids == sorted(ids)
+    order = list(range(100))
+    order[40], order[41] = order[41], order[40]  # one out-of-order arrival
+    for i in order:
+        store.add_post(
+            Post(
+                id=ids[i],
+                text="x",
+                persona_id="p",
+                created_at=datetime.now(timezone.utc),
+                mode="pure_random",
+                language="en",
+            )
+        )
+
+    window = [p.id for p in store.get_all_posts()]
+    assert [p.id for p in store.get_recent_posts(limit=5)] == window[-5:]
+
+    paged, cursor = [], None
+    while True:
+        page = store.get_posts_before(cursor, limit=7)
+        paged += [p.id for p in page]
+        if not page or not store.has_posts_before(page[-1].id):
+            break
+        cursor = page[-1].id
+    assert paged == sorted(window, reverse=True)
+    assert store.get_posts_before(ids[85], limit=3)[0].id == ids[84]
+
+
+def test_sqlite_store(tmp_path):
+    """Test write-behind SQLite persistence round-trips posts and survives reopening."""
+    from datetime import datetime, timezone
+
+    from app.schemas import Post
+    from app.services.ids import post_ids
+    from app.store.sqlite import SQLiteStore
+
+    path = str(tmp_path / "hurl.db")
+    store = SQLiteStore(path, batch_size=16, max_pending=32)  # add_post has to wait
+    posts = [
+        Post(
+            id=post_ids.new_id(),
+            text=f"post {i}",
+            persona_id=f"p{i % 3}",
+            created_at=datetime.fromtimestamp(1000 + i, timezone.utc),
+            mode="emergent",
+            topics=["ai", "crypto"] if i % 2 else ["ai"],
+            language="en",
+        )
+        for i in range(100)
+    ]
+    posts[5] = posts[5].model_copy(update={"kind": "reply", "parent_id": posts[4].id})
+    for post in posts:
+        store.add_post(post)
+    store.flush()
+
+    assert store.count() == 100
+    assert store.get_post(posts[5].id) == posts[5]
+    assert store.get_recent_posts(limit=3) == posts[-3:]
+    assert store.get_posts_by_persona("p1", limit=2) == [posts[94], posts[97]]
+    assert store.get_posts_by_topic("crypto", limit=2) == [posts[97], posts[99]]
+    assert store.get_posts_before(posts[10].id, limit=2) == [posts[9], posts[8]]
+    assert store.get_posts_between(1010, 1013) == posts[10:13]
+    store.close()
+
+    # A post already stored is skipped without losing the rest of its batch
+    reopened = SQLiteStore(path)
+    reopened.add_post(posts[1])
+    reopened.add_post(posts[0].model_copy(update={"id": post_ids.new_id()}))
+    reopened.flush()
+    assert reopened.count() == 101
+    assert reopened.get_posts_by_topic("ai", limit=1)[0].text == "post 0"
+    assert reopened.get_posts_by_topic("crypto", limit=1) == [posts[99]]
+
+    # Any write error reaches flush() and the writer keeps going
+    reopened.add_post(None)
+    with pytest.raises(AttributeError):
+        reopened.flush()
+    reopened.add_post(posts[2].model_copy(update={"id": post_ids.new_id()}))
+    reopened.flush()
+    assert reopened.count() == 102
+    reopened.close()
+
+
+def test_cold_tier(tmp_path):
+    """Test evicted posts spill to mmap segments and reads fall through to them."""
+    from datetime import datetime, timezone
+
+    from app.schemas import Post, PostLineage
+    from app.services.ids import post_ids
+    from app.store.cold import ColdStore, encode_post
+    from app.store.memory import MemoryStore
+    from app.store.records import StoredPost
+
+    posts = [
+        Post(
+            id=post_ids.new_id(),
+            text=f"post {i} ✨",
+            persona_id=f"p{i % 3}",
+            created_at=datetime.now(timezone.utc),
+            mode="emergent",
+            topics=["ai", "crypto"][: i % 3],
+            language="en",
+            lineage=PostLineage(template="t" if i % 2 else None, influences=["a", "b"][: i % 3]),
+            toxicity=i / 300,
+        )
+        for i in range(300)
+    ]
+    store = MemoryStore(max_size=20, cold=ColdStore(tmp_path, segment_bytes=4096))
+    for post in posts:
+        store.add_post(post)
+
+    assert store.count() == 20
+    assert len(store.cold) == 280
+    assert len(list(tmp_path.glob("*.seg"))) > 1
+    assert store.get_post(posts[3].id).to_post() == posts[3]
+    assert store.get_post(posts[250].id).to_post() == posts[250]
+    assert store.get_post("missing") is None
+
+    paged, cursor = [], None
+    while True:
+        page = store.get_posts_before(cursor, limit=33)
+        paged += page
+        if not page or not store.has_posts_before(page[-1].id):
+            break
+        cursor = page[-1].id
+    assert [post.to_post() for post in paged] == posts[::-1]
+    store.close()
+
+    reopened = ColdStore(tmp_path, segment_bytes=4096)
+    assert len(reopened) == 280
+    assert reopened.get_post(posts[100].id).to_post() == posts[100]
+    reopened.close()
+
+    # Fields past 64 KiB round-trip; a post the format cannot hold is rejected
+    long = posts[0].model_copy(update={"id": post_ids.new_id(), "text": "x" * 70_000})
+    bogus = posts[0].model_copy(update={"id": post_ids.new_id(), "mode": "bogus"})
+    with pytest.raises(ValueError, match="bogus"):
+        encode_post(StoredPost.from_post(bogus))
+    store = MemoryStore(max_size=1, cold=ColdStore(tmp_path / "more"))
+    for post in [long, bogus, posts[1]]:
+        store.add_post(post)
+    assert store.get_post(long.id).to_post() == long
+    assert store.get_post(bogus.id) is None  # dropped on eviction
+    assert store.count() == 1
+    store.close()
+
+
+def test_store_memory_budget():
+    """Test stored records round-trip and the byte budget evicts oldest first."""
+    from datetime import datetime, timezone
+
+    from app.schemas import Post, PostLineage, StyleMetrics
+    from app.services.ids import post_ids
+    from app.store.memory import MemoryStore
+    from app.store.records import StoredPost
+
+    posts = [
+        Post(
+            id=post_ids.new_id(),
+            text="x" * (10 + i % 50),
+            persona_id=f"p{i % 3}",
+            created_at=datetime.now(timezone.utc),
+            mode="emergent",
+            topics=["ai"],
+            language="en",
+            style=StyleMetrics(emojis=i % 4, caps=0.25),
+            lineage=PostLineage(template="hot_take_v1", influences=["01A"]),
+            toxicity=0.1,
+        )
+        for i in range(200)
+    ]
+    record = StoredPost.from_post(posts[7])
+    assert record.to_post() == posts[7]
+    assert record.persona_id is StoredPost.from_post(posts[10]).persona_id  # interned
+
+    budget = 50 * record.nbytes
+    store = MemoryStore(max_size=1000, max_bytes=budget)
+    for post in posts:
+        store.add_post(post)
+        assert store.nbytes <= budget
+    window = store.get_all_posts()
+    assert 30 < len(window) < 200
+    assert [p.id for p in window] == [p.id for p in posts[-len(window) :]]
+    assert store.nbytes == sum(p.nbytes for p in window)
+
+
+@pytest.mark.asyncio
+async def test_trusted_posts_match_validation():
+    """Test that posts built without validation equal their validated, serialized twins."""
+    from app.responses import dumps
+    from app.routers.posts import generate_single_post
+    from app.schemas import Post
+    from app.services.generator.batch import batch_generator
+    from app.store.memory import memory_store
+
+    posts = await batch_generator.generate(
+        count=200,
+        mode="emergent",
+        topic_filter=[],
+        persona_ids=[],
+        language_filter=[],
+        toxicity_max=1.0,
+        seed=17,
+    )
+    for i in range(20):
+        posts.append(await generate_single_post(None, "pure_random", [], [], 1.0, 17, i))
+    posts += [record.to_post() for record in memory_store.get_recent_posts(limit=50)]
+    assert any(post.kind != "post" for post in posts)
+
+    for post in posts:
+        validated = Post.model_validate_json(post.model_dump_json())
+        assert validated == post
+        assert dumps(post) == validated.model_dump_json().encode()